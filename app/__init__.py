@@ -1,32 +1,45 @@
 from flask import Flask
-import boto3
-from botocore.exceptions import ClientError
-import json
 import os
+import time
 from dotenv import load_dotenv
 
+# Startup timing: when this process began loading the app. A forked gunicorn
+# worker restarts the clock, so its log line shows its own time to first request.
+_started = time.perf_counter()
+_served_first_request = False
+
 load_dotenv()  # Load environment variables from .env file
 
-def get_secret():
-    secret_name = os.getenv('FLASK_SECRET_NAME')  # Get the secret name from the environment variable
-    region_name = os.getenv('AWS_REGION', 'us-west-2')  # Get the AWS region from the environment variable
+from .secret_provider import SecretProvider  # noqa: E402 (reads settings from .env)
+
+# Largest request body accepted, i.e. a poster upload plus the form (default: 20 MB)
+MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', str(20 * 1024 * 1024)))
+
+# Shared by create_app() and app.py, so the secret is fetched once per process
+# (and once per gunicorn master with preload_app)
+secret_provider = SecretProvider(os.getenv('AWS_REGION', 'us-west-2'))
+
+
+def _restart_clock():
+    global _started, _served_first_request
+    _started = time.perf_counter()
+    _served_first_request = False
 
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
 
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        raise e
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_clock)
 
-    secret = get_secret_value_response['SecretString']
-    secret_dict = json.loads(secret)
-    return secret_dict['SECRET_KEY']
+
+def _log_first_request():
+    global _served_first_request
+    if not _served_first_request:
+        _served_first_request = True
+        print(f"First request in process {os.getpid()}, {(time.perf_counter() - _started) * 1000:.0f}ms after start")
+
+
+def get_secret():
+    secret_name = os.getenv('FLASK_SECRET_NAME')  # Get the secret name from the environment variable
+    return secret_provider.get_json(secret_name)['SECRET_KEY']
 
 def create_app():
     app = Flask(__name__, template_folder='templates', static_folder='static')
@@ -37,10 +50,15 @@ def create_app():
     # Load other configuration from environment variables
     app.config['S3_BUCKET'] = os.getenv('S3_BUCKET')
     app.config['DYNAMODB_TABLE'] = os.getenv('DYNAMODB_TABLE')
+    # Bounds the memory and spool file used by each upload
+    app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE
 
     from .app import main as main_blueprint
     app.register_blueprint(main_blueprint)
 
+    app.before_request(_log_first_request)
+    print(f"App loaded in {(time.perf_counter() - _started) * 1000:.0f}ms")
+
     return app
 
 app = create_app()
@@ -11,20 +11,40 @@ RECENT CHANGES - S3 PreSignURL Date Format Issue Fix:
 - Implemented graceful error handling to maintain application stability
 
 Configuration:
+- CATALOG_CACHE_TTL: Seconds the movie list is served from memory before a rescan (default: 60, 0 disables)
+- CATALOG_GENERATION_FILE: File used to signal catalog changes between workers (default: /tmp/cinedb-catalog.generation)
+- CATALOG_VERSION_TABLE: DynamoDB table of the catalog version counter behind the home page ETag (e.g. cinedb-meta; the ETag and cross-instance catalog reloads are off while it is unset)
+- SCAN_SEGMENTS: Number of parallel scan segments for the movie list pages (default: 4)
 - DEFAULT_EXPIRATION: Default URL expiration time (default: 3600 seconds / 1 hour)
 - MIN_EXPIRATION: Minimum allowed expiration time (default: 60 seconds)
 - MAX_EXPIRATION: Maximum allowed expiration time (default: 604800 seconds / 7 days)
+- PRESIGN_REUSE_FRACTION: Share of a URL's lifetime it is reused for (default: 0.5)
+- PRESIGN_CACHE_SIZE: Maximum number of cached presigned URLs per worker (default: 4096)
+- UPLOAD_MULTIPART_THRESHOLD: Poster size from which uploads to S3 are split into parts (default: 8388608 bytes / 8 MB)
+- UPLOAD_MULTIPART_CHUNKSIZE: Size of each part (default: 8388608 bytes / 8 MB)
+- UPLOAD_MAX_CONCURRENCY: Parts of one poster uploaded at once (default: 2)
+- AWS_MAX_POOL_CONNECTIONS: HTTP connections kept per AWS client, at least the threads per worker plus SCAN_SEGMENTS (default: 10, set by gunicorn.conf.py)
+- AWS_CONNECT_TIMEOUT / AWS_READ_TIMEOUT: AWS request timeouts in seconds (default: 5 / 60)
+- AWS_TCP_KEEPALIVE: TCP keep-alive on pooled AWS connections (default: true)
 """
 
-from flask import Flask, Blueprint, render_template, request, redirect, url_for, flash, jsonify
-import boto3
+from flask import Flask, Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response, session, current_app
+from boto3.s3.transfer import TransferConfig
+from werkzeug.exceptions import RequestEntityTooLarge
 import re
 import uuid
 import json
 import os
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from dotenv import load_dotenv
+from cinedb_common.aws_clients import lazy_client, lazy_resource, lazy_table
+from cinedb_common.catalog_version import CatalogVersion
+from cinedb_common.movie_index import catalog_key, index_keys, parse_rating
+from cinedb_common.parallel_scan import scan_all
+from cinedb_common.poster_variants import build_srcset, variant_keys
+from cinedb_common.presign_cache import PresignedUrlCache
 from . import get_secret  # Import the get_secret function
+from .catalog_cache import CatalogCache
 
 load_dotenv()
 
@@ -44,9 +64,33 @@ DEFAULT_EXPIRATION = int(os.getenv('DEFAULT_EXPIRATION', '3600'))  # Default: 1
 MIN_EXPIRATION = int(os.getenv('MIN_EXPIRATION', '60'))  # Minimum: 1 minute
 MAX_EXPIRATION = int(os.getenv('MAX_EXPIRATION', '604800'))  # Maximum: 7 days
 
-# Initialize the DynamoDB and S3 clients with environment variable for region
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+# Posters are uploaded from the request's spooled file with upload_fileobj.
+# Memory per upload is bounded by chunk size x concurrency; small posters
+# go up in a single PUT.
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=int(os.getenv('UPLOAD_MULTIPART_THRESHOLD', str(8 * 1024 * 1024))),
+    multipart_chunksize=int(os.getenv('UPLOAD_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024))),
+    max_concurrency=int(os.getenv('UPLOAD_MAX_CONCURRENCY', '2'))
+)
+# Parts read into memory ahead of the uploads (s3transfer's default is 10)
+TRANSFER_CONFIG.max_in_memory_upload_chunks = TRANSFER_CONFIG.max_request_concurrency
+
+# One set of AWS clients per worker process, shared by all its threads
+# (see aws_clients: pool size, keep-alive, and rebuilding them after fork)
+dynamodb = lazy_resource('dynamodb', AWS_REGION)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+
+# Presigned poster URLs are signed locally and reused until PRESIGN_REUSE_FRACTION
+# of their lifetime has passed, so each page view does not re-sign every poster
+presign_cache = PresignedUrlCache(s3_client, expires_in=DEFAULT_EXPIRATION)
+
+# The movie list pages are served from an in-process snapshot of the catalog.
+# Write routes patch it and bump a generation counter shared by all workers.
+catalog_cache = CatalogCache(lambda: scan_all(table))
+
+# Catalog version counter shared with the Lambda API; every write bumps it
+catalog_version = CatalogVersion(dynamodb)
 
 # Regular expression to parse the key from the full URL
 url_pattern = re.compile(r'https://[^/]+/([^?]+)')
@@ -95,29 +139,13 @@ def generate_presigned_url(movie, expiration=None):
     else:
         expiration = validate_expiration_time(expiration)
     
-    # Calculate expiration datetime for logging (UTC timezone)
-    expiration_datetime = datetime.now(timezone.utc) + timedelta(seconds=expiration)
-    
     try:
         match = url_pattern.match(movie['poster'])
         if match:
             key = match.group(1)
             
-            # Generate presigned URL with validated expiration
-            presigned_url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': S3_BUCKET, 'Key': key},
-                ExpiresIn=expiration
-            )
-            
-            # Update movie poster with presigned URL
-            movie['poster'] = presigned_url
-            
-            # Enhanced logging with proper date formatting
-            print(f"Generated presigned URL for key '{key}' - "
-                  f"Expires: {expiration_datetime.strftime('%Y-%m-%d %H:%M:%S UTC')} "
-                  f"({expiration} seconds from now)")
-            print(f"Presigned URL: {presigned_url}")
+            # Reuse a cached presigned URL or sign a new one with the validated expiration
+            movie['poster'] = presign_cache.get_url(S3_BUCKET, key, expiration)
             
         else:
             # Log parsing failure with timestamp
@@ -134,32 +162,107 @@ def generate_presigned_url(movie, expiration=None):
         # Keep original URL on error to maintain functionality
         # This ensures the application doesn't break if S3 is temporarily unavailable
 
+def presign_posters(movies):
+    """
+    Replace the poster URL of every movie with a presigned URL, in one batch
+    
+    All posters on a page are signed with the same timestamp and signing key,
+    and URLs already in the cache are reused as-is. Movies whose poster has
+    resized variants (posterVariants, written by the process_poster Lambda)
+    also get `poster_thumbnail` and `poster_srcset` for the templates.
+    
+    Args:
+        movies (list): Movie objects from DynamoDB
+    
+    Returns:
+        None: Modifies the movie objects in place
+    """
+    keys = {}
+    for movie in movies:
+        match = url_pattern.match(movie.get('poster') or '')
+        if match:
+            keys[id(movie)] = match.group(1)
+    if not keys:
+        return
+    
+    variant_keys_to_sign = [
+        key
+        for movie in movies if id(movie) in keys and movie.get('posterVariants')
+        for _, _, key in variant_keys(movie['posterVariants'])
+    ]
+    
+    try:
+        urls = presign_cache.sign_many(S3_BUCKET, list(keys.values()) + variant_keys_to_sign)
+    except Exception as e:
+        # Keep original URLs on error to maintain functionality
+        current_time = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+        print(f"[{current_time}] Error generating presigned URLs for {len(keys)} posters: {str(e)}")
+        return
+    
+    for movie in movies:
+        if id(movie) in keys:
+            movie['poster'] = urls[keys[id(movie)]]
+            if movie.get('posterVariants'):
+                movie['poster_srcset'], movie['poster_thumbnail'] = build_srcset(movie['posterVariants'], urls)
+
+def index_etag(version):
+    """
+    ETag of the movie list page
+    
+    The page changes with the catalog, with the presign window of its poster
+    URLs and with the instance it is rendered on (shown in the footer).
+    
+    Args:
+        version (int): Catalog version, or None if it could not be read
+    
+    Returns:
+        str: The (unquoted) ETag, or None when the page must not be cached
+    """
+    # Flashed messages are shown once; a page carrying them is never reused
+    if version is None or session.get('_flashes'):
+        return None
+    return f"{version}.{presign_cache.signing_window()}.{INSTANCE_ID or ''}"
+
 @main.route('/')
 def index():
-    table = dynamodb.Table(DYNAMODB_TABLE)
+    # Conditional GET: one small get_item decides whether the browser's copy
+    # is current, before the catalog is loaded or any poster is signed
+    version = catalog_version.current()
+    etag = index_etag(version)
+    if etag and request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+    
     try:
-        response = table.scan()
-        movies = response.get('Items', [])
-        # Generate signed URLs for the images
-        for movie in movies:
-            generate_presigned_url(movie)
+        # Served from the catalog cache; reloads use a parallel segmented scan
+        # (also when another writer has bumped the catalog version)
+        movies = catalog_cache.get_movies(version)
+        # Generate signed URLs for the images in one cached batch
+        presign_posters(movies)
     except dynamodb.meta.client.exceptions.ResourceNotFoundException:
         movies = []
+        etag = None
         print("Table not found.")
     except Exception as e:
         print(f"An error occurred: {e}")
         movies = []
-    return render_template('index.html', movies=movies, instance_id=INSTANCE_ID, availability_zone=AVAILABILITY_ZONE)
+        etag = None
+    response = make_response(render_template('index.html', movies=movies, instance_id=INSTANCE_ID, availability_zone=AVAILABILITY_ZONE))
+    if etag:
+        response.set_etag(etag)
+        # Browsers and CDNs may keep the page but must revalidate it
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @main.route('/admin')
 def admin_dashboard():
-    table = dynamodb.Table(DYNAMODB_TABLE)
     try:
-        response = table.scan()
-        movies = response.get('Items', [])
-        # Generate signed URLs for the images
-        for movie in movies:
-            generate_presigned_url(movie)
+        # Served from the catalog cache, which reloads when another instance
+        # changed the catalog; reloads use a parallel segmented scan
+        movies = catalog_cache.get_movies(catalog_version.current())
+        # Generate signed URLs for the images in one cached batch
+        presign_posters(movies)
     except dynamodb.meta.client.exceptions.ResourceNotFoundException:
         movies = []
         print("Table not found.")
@@ -169,45 +272,97 @@ def admin_dashboard():
     return render_template('admin.html', movies=movies, instance_id=INSTANCE_ID, availability_zone=AVAILABILITY_ZONE)
 
 
+def new_poster_key(movie_id, filename):
+    """
+    Build the S3 key for an uploaded poster
+
+    Uses the posters/<movie id>/<random>.<ext> scheme of the serverless
+    backend, so the process_poster Lambda renders its thumbnails.
+
+    Returns:
+        str: A new, unique poster key
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if not re.match(r'^\.[a-z0-9]{1,8}$', extension):
+        extension = '.img'
+    return f"posters/{movie_id}/{uuid.uuid4().hex}{extension}"
+
+
+def upload_poster(file, poster_key):
+    """
+    Upload a poster from the request straight to S3
+
+    Werkzeug has already spooled the file part: in memory for small files,
+    otherwise in an anonymous temporary file that is removed when the request
+    ends. Nothing is written under /tmp by the app, and the size of a request
+    is capped by MAX_UPLOAD_SIZE.
+
+    Args:
+        file (FileStorage): The uploaded poster
+        poster_key (str): Destination key in S3_BUCKET
+
+    Returns:
+        str: The poster URL to store on the movie
+    """
+    extra_args = {}
+    if file.mimetype and file.mimetype.startswith('image/'):
+        extra_args['ContentType'] = file.mimetype
+    file.stream.seek(0)
+    s3_client.upload_fileobj(file.stream, S3_BUCKET, poster_key, ExtraArgs=extra_args, Config=TRANSFER_CONFIG)
+    return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{poster_key}"
+
+
 @main.route('/edit/<movie_id>', methods=['GET', 'POST'])
 def edit_movie(movie_id):
-    table = dynamodb.Table(DYNAMODB_TABLE)
     if request.method == 'POST':
         title = request.form['title']
-        rating = request.form['rating']
+        rating = parse_rating(request.form['rating'])
         synopsis = request.form['synopsis']
         poster_url = None
 
+        if rating is None:
+            flash('Rating must be a number.', 'danger')
+            return redirect(request.url)
+
         if 'poster' in request.files:
             file = request.files['poster']
             if file.filename != '':
-                filename = f"{movie_id}_{file.filename}"
-                file_path = os.path.join('/tmp', filename)
-                file.save(file_path)
+                poster_key = new_poster_key(movie_id, file.filename)
                 try:
-                    s3_client.upload_file(file_path, S3_BUCKET, filename)
-                    poster_url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{filename}"
+                    poster_url = upload_poster(file, poster_key)
                 except Exception as e:
                     flash(f"An error occurred while uploading to S3: {e}", 'danger')
                     return redirect(request.url)
 
-        update_expression = 'SET title = :title, rating = :rating, synopsis = :synopsis'
+        # Bump the movie's version like update_movie does, so API clients
+        # holding an older ETag see the change
+        update_expression = ('SET title = :title, rating = :rating, synopsis = :synopsis, catalogKey = :catalogKey, '
+                             '#version = if_not_exists(#version, :zero) + :one')
         expression_attribute_values = {
             ':title': title,
             ':rating': rating,
-            ':synopsis': synopsis
+            ':synopsis': synopsis,
+            ':catalogKey': catalog_key(movie_id),
+            ':zero': 0,
+            ':one': 1
         }
 
         if poster_url:
             update_expression += ', poster = :poster'
             expression_attribute_values[':poster'] = poster_url
+            # The old poster's variants no longer apply; the process_poster
+            # Lambda attaches the new ones once they are rendered
+            update_expression += ' REMOVE posterVariants'
 
         try:
-            table.update_item(
+            response = table.update_item(
                 Key={'id': movie_id},
                 UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_attribute_values
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues=expression_attribute_values,
+                ReturnValues='ALL_NEW'
             )
+            catalog_cache.upsert(response['Attributes'], catalog_version.bump())
             flash('Movie updated successfully!', 'success')
             return redirect(url_for('main.admin_dashboard'))
         except Exception as e:
@@ -224,25 +379,25 @@ def edit_movie(movie_id):
 
 @main.route('/add', methods=['GET', 'POST'])
 def add_movie():
-    table = dynamodb.Table(DYNAMODB_TABLE)
     if request.method == 'POST':
         movie_id = str(uuid.uuid4())
         title = request.form['title']
-        rating = request.form['rating']
+        rating = parse_rating(request.form['rating'])
         synopsis = request.form['synopsis']
         
+        if rating is None:
+            flash('Rating must be a number.', 'danger')
+            return redirect(request.url)
+        
         poster_url = None
         
         if 'poster' in request.files:
             file = request.files['poster']
             if file and file.filename != '':
-                filename = f"{movie_id}_{file.filename}"
-                file_path = os.path.join('/tmp', filename)
-                file.save(file_path)
+                poster_key = new_poster_key(movie_id, file.filename)
                 
                 try:
-                    s3_client.upload_file(file_path, S3_BUCKET, filename)
-                    poster_url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{filename}"
+                    poster_url = upload_poster(file, poster_key)
                 except Exception as e:
                     flash(f"An error occurred while uploading to S3: {e}", 'danger')
                     return redirect(request.url)
@@ -251,14 +406,19 @@ def add_movie():
             'id': movie_id,
             'title': title,
             'rating': rating,
-            'synopsis': synopsis
+            'synopsis': synopsis,
+            'version': 1
         }
         
         if poster_url:
             item['poster'] = poster_url
         
+        # Key attributes for the browsing indexes
+        item.update(index_keys(item))
+        
         try:
             table.put_item(Item=item)
+            catalog_cache.upsert(item, catalog_version.bump())
             flash('Movie added successfully!', 'success')
             return redirect(url_for('main.admin_dashboard'))
         except Exception as e:
@@ -266,11 +426,17 @@ def add_movie():
     
     return render_template('add_movie.html')
 
+@main.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    limit_mb = current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    flash(f"The poster is too large (the limit is {limit_mb} MB).", 'danger')
+    return redirect(request.url)
+
 @main.route('/delete/<movie_id>', methods=['POST'])
 def delete_movie(movie_id):
-    table = dynamodb.Table(DYNAMODB_TABLE)
     try:
         table.delete_item(Key={'id': movie_id})
+        catalog_cache.remove(movie_id, catalog_version.bump())
         flash('Movie deleted successfully!', 'success')
     except Exception as e:
         flash(f"An error occurred: {e}", 'danger')
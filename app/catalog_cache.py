@@ -0,0 +1,160 @@
+"""
+Read-through catalog cache for the Flask app
+
+The movie list pages used to scan the whole DynamoDB table on every request,
+even though writes are rare. CatalogCache keeps a snapshot of the catalog in
+each worker process and only reloads it when:
+
+- the snapshot is older than CATALOG_CACHE_TTL seconds, or
+- another worker has changed the catalog.
+
+Workers signal changes through a generation counter stored in a small file
+(CATALOG_GENERATION_FILE). A write route patches its own snapshot in place and
+bumps the counter; every other gunicorn worker on the host sees the new
+generation on its next request and reloads. The TTL still bounds staleness for
+writes made elsewhere (other instances, the Lambda API).
+
+Callers that read the catalog version counter (see catalog_version) pass it
+to get_movies, which then also reloads when any writer anywhere has bumped
+it, so a page tagged with a version never shows an older snapshot.
+"""
+
+import fcntl
+import os
+import threading
+import time
+
+# Seconds a snapshot may be served before it is reloaded (0 disables caching)
+CATALOG_CACHE_TTL = float(os.getenv('CATALOG_CACHE_TTL', '60'))
+
+# File shared by all workers on the host to signal catalog changes
+CATALOG_GENERATION_FILE = os.getenv('CATALOG_GENERATION_FILE', '/tmp/cinedb-catalog.generation')
+
+
+class CatalogCache:
+    """
+    In-process snapshot of the movie catalog with cross-worker invalidation
+
+    Args:
+        loader (callable): Returns the full list of movies (e.g. a table scan)
+        ttl (float): Maximum snapshot age in seconds
+        generation_file (str): Path of the shared generation counter
+        clock (callable): Monotonic clock, overridable for tests
+    """
+
+    def __init__(self, loader, ttl=CATALOG_CACHE_TTL, generation_file=CATALOG_GENERATION_FILE,
+                 clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.generation_file = generation_file
+        self.clock = clock
+
+        self._movies = None
+        self._loaded_at = 0.0
+        self._generation = None
+        self._catalog_version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.reloads = 0
+
+    def get_movies(self, catalog_version=None):
+        """
+        Return the catalog, reloading it if it is stale
+
+        Args:
+            catalog_version (int): Current catalog version, read before this
+                                   call; the snapshot is reloaded unless it was
+                                   loaded at this version
+
+        Returns:
+            list: Copies of the movie items; callers may modify them freely
+        """
+        generation = self._read_generation()
+        with self._lock:
+            if not self._is_fresh(generation) or (
+                    catalog_version is not None and catalog_version != self._catalog_version):
+                # Record the generation and version seen *before* loading, so a
+                # write that lands during the scan triggers another reload
+                self._movies = {movie['id']: movie for movie in self.loader()}
+                self._loaded_at = self.clock()
+                self._generation = generation
+                self._catalog_version = catalog_version
+                self.reloads += 1
+            else:
+                self.hits += 1
+            return [dict(movie) for movie in self._movies.values()]
+
+    def upsert(self, movie, catalog_version=None):
+        """
+        Insert or replace one movie after a successful write
+
+        Args:
+            movie (dict): The complete movie item as stored in DynamoDB
+            catalog_version (int): Catalog version the write bumped to, if any
+        """
+        self._apply(lambda movies: movies.__setitem__(movie['id'], dict(movie)), catalog_version)
+
+    def remove(self, movie_id, catalog_version=None):
+        """
+        Drop one movie after a successful delete
+
+        Args:
+            movie_id (str): ID of the deleted movie
+            catalog_version (int): Catalog version the delete bumped to, if any
+        """
+        self._apply(lambda movies: movies.pop(movie_id, None), catalog_version)
+
+    def invalidate(self):
+        """Force every worker, including this one, to reload on the next request"""
+        self._bump_generation()
+        with self._lock:
+            self._movies = None
+
+    def _apply(self, change, catalog_version=None):
+        with self._lock:
+            previous = self._generation
+            generation = self._bump_generation()
+            if self._movies is not None and previous == generation - 1:
+                # Nobody else wrote since our snapshot: patch it in place
+                change(self._movies)
+                self._generation = generation
+                # Likewise for the catalog version: this write was the only one
+                if (catalog_version is not None and self._catalog_version is not None
+                        and catalog_version == self._catalog_version + 1):
+                    self._catalog_version = catalog_version
+            else:
+                self._movies = None
+
+    def _is_fresh(self, generation):
+        return (
+            self._movies is not None
+            and self.ttl > 0
+            and generation == self._generation
+            and self.clock() - self._loaded_at < self.ttl
+        )
+
+    def _read_generation(self):
+        try:
+            with open(self.generation_file) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _bump_generation(self):
+        """Atomically increment the shared counter and return the new value"""
+        try:
+            with open(f'{self.generation_file}.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                generation = self._read_generation() + 1
+                # Write a new file and rename it over the old one so readers
+                # never see a partially written counter
+                tmp_path = f'{self.generation_file}.{os.getpid()}.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.write(str(generation))
+                os.replace(tmp_path, self.generation_file)
+                return generation
+        except OSError as e:
+            # Without a shared counter, fall back to the TTL for other workers
+            print(f"Could not update catalog generation file: {e}")
+            return (self._generation or 0) + 1
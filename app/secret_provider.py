@@ -0,0 +1,145 @@
+"""
+Secrets Manager lookups cached in memory and, optionally, on disk
+
+get_secret() used to call Secrets Manager from a new boto3 session each
+time, and it ran twice while the app was imported (create_app() and
+app.py), so every process start waited on two round trips before it could
+serve anything.
+
+SecretProvider keeps each secret for SECRET_CACHE_TTL seconds. With
+gunicorn's preload_app the master fetches it once while importing the app,
+and the forked workers inherit the cached value instead of fetching it
+again.
+
+SECRET_CACHE_FILE additionally keeps the secrets across restarts in a file
+encrypted with SECRET_CACHE_KEY (a Fernet key, e.g. from
+`python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"`).
+The file is only read while it is younger than SECRET_CACHE_TTL. It needs the
+cryptography package, which is imported lazily; without it or without a key
+the file cache is disabled.
+
+If Secrets Manager cannot be reached and an expired value is cached, the
+expired value is returned (and logged) rather than failing the start.
+"""
+
+import json
+import os
+import threading
+import time
+
+from cinedb_common.aws_clients import get_client
+
+# Seconds a secret is used before it is fetched again
+SECRET_CACHE_TTL = int(os.getenv('SECRET_CACHE_TTL', '3600'))
+
+# Encrypted cache for restarts (empty disables it)
+SECRET_CACHE_FILE = os.getenv('SECRET_CACHE_FILE', '')
+
+# Fernet key for SECRET_CACHE_FILE
+SECRET_CACHE_KEY = os.getenv('SECRET_CACHE_KEY', '')
+
+
+class SecretProvider:
+    """
+    Fetch secret strings from Secrets Manager through a TTL cache
+
+    Args:
+        region_name (str): AWS region of the secrets
+        ttl (int): Seconds a fetched secret is used (default: SECRET_CACHE_TTL)
+        cache_file (str): Encrypted cache file, or None (default: SECRET_CACHE_FILE)
+        cache_key (str): Fernet key of the cache file (default: SECRET_CACHE_KEY)
+        clock (callable): Returns the current time in seconds
+    """
+
+    def __init__(self, region_name, ttl=SECRET_CACHE_TTL, cache_file=SECRET_CACHE_FILE,
+                 cache_key=SECRET_CACHE_KEY, clock=time.time):
+        self.region_name = region_name
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        # name -> (secret string, time fetched)
+        self._cache = {}
+        self._fernet = self._load_fernet(cache_key) if cache_file else None
+        self.cache_file = cache_file if self._fernet else None
+        if self.cache_file:
+            self._cache.update(self._read_cache_file())
+
+    @staticmethod
+    def _load_fernet(cache_key):
+        if not cache_key:
+            print("SECRET_CACHE_FILE is set without SECRET_CACHE_KEY; not caching secrets on disk")
+            return None
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            print("cryptography is not installed; not caching secrets on disk")
+            return None
+        return Fernet(cache_key.encode('utf-8'))
+
+    def _read_cache_file(self):
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self.cache_file, 'rb') as f:
+                # Fernet tokens carry their creation time; ttl rejects stale files
+                data = self._fernet.decrypt(f.read(), ttl=self.ttl)
+        except FileNotFoundError:
+            return {}
+        except (OSError, InvalidToken) as e:
+            print(f"Ignoring secret cache {self.cache_file}: {type(e).__name__} {e}")
+            return {}
+        return {name: tuple(entry) for name, entry in json.loads(data).items()}
+
+    def _write_cache_file(self):
+        token = self._fernet.encrypt(json.dumps(self._cache).encode('utf-8'))
+        temp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(token)
+            os.replace(temp_path, self.cache_file)
+        except OSError as e:
+            print(f"Could not write secret cache {self.cache_file}: {e}")
+
+    def get(self, secret_name):
+        """
+        Return a secret string, from the cache while it is fresh
+
+        Args:
+            secret_name (str): Secret name or ARN
+
+        Returns:
+            str: The SecretString
+        """
+        cached = self._cache.get(secret_name)
+        if cached and self.clock() - cached[1] < self.ttl:
+            return cached[0]
+
+        with self._lock:
+            cached = self._cache.get(secret_name)
+            if cached and self.clock() - cached[1] < self.ttl:
+                return cached[0]
+            try:
+                client = get_client('secretsmanager', self.region_name)
+                value = client.get_secret_value(SecretId=secret_name)['SecretString']
+            except Exception as e:
+                if not cached:
+                    raise
+                print(f"Using expired secret {secret_name}, refresh failed: {e}")
+                return cached[0]
+            self._cache[secret_name] = (value, self.clock())
+            if self.cache_file:
+                self._write_cache_file()
+            return value
+
+    def get_json(self, secret_name):
+        """
+        Return a secret whose SecretString is a JSON object
+
+        Args:
+            secret_name (str): Secret name or ARN
+
+        Returns:
+            dict: The parsed secret
+        """
+        return json.loads(self.get(secret_name))
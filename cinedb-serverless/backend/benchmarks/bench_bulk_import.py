@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading movies one put_item at a time vs concurrent BatchWriteItem
+
+put_item - what seeding through add_movie amounts to: validate each row
+           and write it with its own PutItem request
+batch    - cinedb_common.bulk_import.BulkImporter: 25-item BatchWriteItem
+           requests sent by a pool of workers
+
+Both read the same NDJSON file through iter_rows and validate every row with
+build_movie_item, so parsing and validation are part of the time. The table
+is an in-process FakeTable with its default simulated latency. The last run
+gives the table a write capacity, so part of every request comes back as
+UnprocessedItems and has to be re-sent through AdaptiveBackoff.
+
+Needs botocore (installed with boto3).
+
+Usage:
+    python bench_bulk_import.py [--items 20000] [--workers 1 8 16 32]
+                                [--capacity 10000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.bulk_import import BulkImporter, iter_rows, open_text  # noqa: E402
+from cinedb_common.movie_record import build_movie_item  # noqa: E402
+from fake_dynamodb import FakeTable, make_movie  # noqa: E402
+
+# put_item at ~8ms per row would take minutes for the full file
+PUT_ITEM_ROWS = 2000
+
+
+def write_ndjson(path, count):
+    with open(path, 'w') as f:
+        for index in range(count):
+            movie = make_movie(index)
+            movie['year'] = int(movie['year'])
+            movie['duration'] = int(movie['duration'])
+            movie['rating'] = float(movie['rating'])
+            f.write(json.dumps(movie) + '\n')
+
+
+def run_put_item(path, count):
+    table = FakeTable()
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        for row_number, row, _ in iter_rows(open_text(f, path), 'ndjson'):
+            if row_number > count:
+                break
+            table.put_item(Item=build_movie_item(row, row['id']))
+    return time.perf_counter() - start, len(table.items), 0
+
+
+def run_batch(path, count, workers, capacity=None):
+    table = FakeTable(write_capacity=capacity)
+    importer = BulkImporter(table, os.path.basename(path), workers=workers)
+    with open(path, 'rb') as f:
+        report = importer.run(iter_rows(open_text(f, path), 'ndjson'))
+    if report['written'] != count or len(table.items) != count:
+        raise SystemExit(f'Batch import wrote {len(table.items)} of {count} items')
+    return report['seconds'], report['written'], table.meta.client.unprocessed_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16, 32])
+    parser.add_argument('--capacity', type=int, default=10000,
+                        help='Writes per second for the throttled run (0 to skip it)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'movies.ndjson')
+        write_ndjson(path, args.items)
+
+        print('Bulk import benchmark (in-process FakeTable, 8ms round trip)')
+        header = f"{'method':>10} {'workers':>8} {'items':>8} {'time':>9} {'items/s':>9} {'1M items':>9} {'re-sent':>8}"
+        print(header)
+        print('-' * len(header))
+
+        runs = [('put_item', 1, None)] + [('batch', workers, None) for workers in args.workers]
+        if args.capacity:
+            runs.append((f'batch@{args.capacity // 1000}k', max(args.workers), args.capacity))
+
+        for method, workers, capacity in runs:
+            if method == 'put_item':
+                elapsed, written, resent = run_put_item(path, min(PUT_ITEM_ROWS, args.items))
+            else:
+                elapsed, written, resent = run_batch(path, args.items, workers, capacity)
+            rate = written / elapsed
+            print(f'{method:>10} {workers:>8} {written:>8} {elapsed * 1000:>7.0f}ms {rate:>9.0f} '
+                  f'{1000000 / rate / 60:>7.1f}min {resent:>8}')
+
+
+if __name__ == '__main__':
+    main()
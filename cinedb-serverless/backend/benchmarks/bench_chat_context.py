@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chat context from the first scanned movies vs ranked retrieval
+
+Builds the chat_bedrock context for the same conversations two ways:
+
+first-N  - the first MAX_CONTEXT_MOVIES movies of a scan as a JSON list, as
+           chat_bedrock did before ranking
+ranked   - cinedb_common.chat_retrieval.MovieRetriever: BM25 over the whole
+           catalog, best matches as table rows up to CHAT_CONTEXT_TOKENS
+
+Conversations ask about one movie of the synthetic catalog (bench_search's
+Zipf-vocabulary movies): by words of its title, by its director, or by
+synopsis words, with an unrelated first turn. Reported per catalog size:
+
+- tokens   estimated input tokens of the movie context
+- recall   share of conversations whose movie is in the context
+- build    time to index the scanned catalog (once per catalog version)
+- select   p50/p95 time to rank and pack one turn
+
+A second table follows one long conversation and reports the estimated
+input tokens of a Bedrock call at different lengths: with the whole history
+and first-N context (before), and packed by cinedb_common.chat_prompt with
+the ranked context (after).
+
+Bedrock latency is not measured here; it grows with the input tokens.
+
+Usage:
+    python bench_chat_context.py [--items 1000 10000 50000] [--conversations 300]
+                                 [--turns 1 10 25 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_search import make_catalog  # noqa: E402
+from cinedb_common import chat_retrieval  # noqa: E402
+from cinedb_common.chat_prompt import pack_history  # noqa: E402
+from cinedb_common.chat_retrieval import MovieRetriever, estimate_tokens  # noqa: E402
+
+# Same fields and rendering as chat_bedrock
+CONTEXT_FIELDS = ('title', 'year', 'genre', 'rating', 'director', 'synopsis')
+MAX_CONTEXT_MOVIES = 50
+INSTRUCTIONS_TOKENS = 100
+
+
+def render_json(movie):
+    """A context entry as chat_bedrock rendered it before"""
+    return json.dumps({field: movie.get(field) for field in CONTEXT_FIELDS},
+                      default=lambda value: float(value) if value % 1 else int(value))
+
+
+def render_row(movie):
+    """A context row as chat_bedrock renders it now"""
+    return '|'.join(' '.join(str(movie.get(field, '')).split()).replace('|', '/') for field in CONTEXT_FIELDS)
+
+
+def make_conversations(movies, count, rng):
+    """(target position, user message, earlier user messages)"""
+    conversations = []
+    for _ in range(count):
+        position = rng.randrange(len(movies))
+        movie = movies[position]
+        kind = rng.choice(('title', 'director', 'synopsis'))
+        if kind == 'title':
+            message = f"Have you got anything like {movie['title']}?"
+        elif kind == 'director':
+            message = f"What did {movie['director']} direct? I like {movie['genre'].lower()} movies"
+        else:
+            words = rng.sample(movie['synopsis'].split(), 4)
+            message = f"I want a movie about {' '.join(words)}"
+        conversations.append((position, message, ['Hi! Can you recommend me something tonight?']))
+    return conversations
+
+
+def make_history(movies, turns, rng):
+    """A conversation of `turns` questions and answers of typical length"""
+    history = []
+    for _ in range(turns):
+        asked, answer = rng.sample(movies, 2)
+        history.append({'role': 'user', 'content': (
+            f"I liked {asked['title']}. Is there anything similar, maybe by {asked['director']}? "
+            f"Something {asked['genre'].lower()} and not too long.")})
+        history.append({'role': 'assistant', 'content': (
+            f"You might enjoy {answer['title']} ({answer['year']}), a {answer['genre'].lower()} movie "
+            f"rated {answer['rating']} and directed by {answer['director']}. {answer['synopsis']} "
+            "Let me know if you want something older or a different genre!")})
+    return history
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--conversations', type=int, default=300)
+    parser.add_argument('--turns', type=int, nargs='+', default=[1, 10, 25, 50])
+    args = parser.parse_args()
+
+    if chat_retrieval._load_numpy() is None:
+        raise SystemExit('NumPy is required for this benchmark (pip install numpy)')
+
+    header = (f"{'movies':>8} {'context':>8} {'tokens':>8} {'rows':>6} {'recall':>8} "
+              f"{'build':>9} {'select p50':>11} {'p95':>8}")
+    print(header)
+    print('-' * len(header))
+    for items in args.items:
+        movies, _, _ = make_catalog(items)
+        conversations = make_conversations(movies, args.conversations, random.Random(3))
+
+        first_rows = [render_json(movie) for movie in movies[:MAX_CONTEXT_MOVIES]]
+        first_tokens = estimate_tokens('[' + ','.join(first_rows) + ']')
+        first_recall = sum(position < MAX_CONTEXT_MOVIES for position, _, _ in conversations) / len(conversations)
+        print(f"{items:>8} {'first-N':>8} {first_tokens:>8} {len(first_rows):>6} {first_recall:>7.1%} "
+              f"{'-':>9} {'-':>11} {'-':>8}")
+
+        start = time.perf_counter()
+        retriever = MovieRetriever(movies, render_row, MAX_CONTEXT_MOVIES)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        tokens, rows, hits, timings = [], [], 0, []
+        for position, message, history in conversations:
+            start = time.perf_counter()
+            selected, stats = retriever.select(message, history)
+            timings.append((time.perf_counter() - start) * 1000)
+            tokens.append(stats['contextTokens'])
+            rows.append(stats['movies'])
+            hits += retriever.rows[position] in selected
+        print(f"{items:>8} {'ranked':>8} {statistics.mean(tokens):>8.0f} {statistics.mean(rows):>6.1f} "
+              f"{hits / len(conversations):>7.1%} {build_ms:>7.0f}ms {percentile(timings, 50):>9.2f}ms "
+              f"{percentile(timings, 95):>6.2f}ms")
+
+    print()
+    header = f"{'turns':>6} {'before':>8} {'after':>8} {'verbatim':>9} {'summarized':>11} {'dropped':>8}"
+    print(header)
+    print('-' * len(header))
+    history = make_history(movies, max(args.turns), random.Random(5))
+    message = 'Something older, please?'
+    first_tokens = estimate_tokens('[' + ','.join(first_rows) + ']')
+    for turns in args.turns:
+        turn_history = history[:2 * (turns - 1)]
+        fixed_tokens = INSTRUCTIONS_TOKENS + estimate_tokens(message)
+        before = fixed_tokens + first_tokens + sum(estimate_tokens(msg['content']) for msg in turn_history)
+        recent, summary, context_budget, stats = pack_history(turn_history, fixed_tokens)
+        user_turns = [msg['content'] for msg in turn_history if msg['role'] == 'user']
+        _, retrieval = retriever.select(message, user_turns, context_budget)
+        after = fixed_tokens + retrieval['contextTokens'] + stats['packedHistoryTokens']
+        print(f"{turns:>6} {before:>8} {after:>8} {stats['verbatim']:>9} {stats['summarized']:>11} "
+              f"{stats['dropped']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark: buffered chat replies vs the streaming endpoint
+
+Answers the same chat message two ways, with fake_bedrock.FakeBedrock in
+place of Bedrock and a FakeTable catalog:
+
+buffered  - chat_bedrock's lambda_handler, which calls converse and returns
+            the whole reply
+streamed  - chat_bedrock's stream_server over a local HTTP connection, which
+            calls converse_stream and sends Server-Sent Events as the reply
+            is generated
+
+For each reply length it reports when the client sees the first text and
+the whole reply, and checks that the streamed text and usage block match
+the buffered ones. A last run closes the connection after the first event
+and checks that the server stops reading the Bedrock stream.
+
+Network time to Bedrock and to the client is not simulated. Needs botocore.
+
+Usage:
+    python bench_chat_stream.py [--tokens 100 300 1000] [--movies 2000]
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+CHAT_DIR = os.path.join(BACKEND_DIR, 'lambda_functions', 'chat_bedrock')
+sys.path[:0] = [BACKEND_DIR, CHAT_DIR]
+
+import lambda_function  # noqa: E402
+import stream_server  # noqa: E402
+from fake_bedrock import FakeBedrock  # noqa: E402
+from fake_dynamodb import FakeTable, make_movies  # noqa: E402
+
+MESSAGE = {'message': 'Any thriller from the nineties?', 'history': [
+    {'role': 'user', 'content': 'Hi! Can you recommend me something tonight?'},
+    {'role': 'assistant', 'content': 'Of course! What are you in the mood for?'}
+]}
+
+
+class QuietHandler(stream_server.ChatStreamHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def read_events(response):
+    """Yield (event, data) pairs from a text/event-stream response"""
+    name, data = None, []
+    while True:
+        line = response.readline()
+        if not line:
+            return
+        line = line.decode().rstrip('\n')
+        if line.startswith('event: '):
+            name = line[len('event: '):]
+        elif line.startswith('data: '):
+            data.append(line[len('data: '):])
+        elif not line and name:
+            yield name, json.loads('\n'.join(data))
+            name, data = None, []
+
+
+def post_stream(port):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('POST', '/chat/stream', json.dumps(MESSAGE), {'Content-Type': 'application/json'})
+    return connection, connection.getresponse()
+
+
+def run_buffered():
+    start = time.perf_counter()
+    result = lambda_function.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(MESSAGE)}, None)
+    return (time.perf_counter() - start) * 1000, json.loads(result['body'])
+
+
+def run_streamed(port):
+    start = time.perf_counter()
+    connection, response = post_stream(port)
+    first_ms, text, done = None, [], None
+    for name, data in read_events(response):
+        if name == 'delta':
+            if first_ms is None:
+                first_ms = (time.perf_counter() - start) * 1000
+            text.append(data['text'])
+        elif name == 'done':
+            done = data
+        elif name == 'error':
+            raise RuntimeError(data['error'])
+    total_ms = (time.perf_counter() - start) * 1000
+    connection.close()
+    return first_ms, total_ms, ''.join(text), done
+
+
+def same_usage(buffered, streamed):
+    keys = ('inputTokens', 'outputTokens')
+    return all(buffered[key] == streamed[key] for key in keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, nargs='+', default=[100, 300, 1000])
+    parser.add_argument('--movies', type=int, default=2000)
+    args = parser.parse_args()
+
+    table = FakeTable(make_movies(args.movies))
+    lambda_function.dynamodb = SimpleNamespace(Table=lambda name: table)
+    lambda_function.retriever_cache.version_reader = lambda: 1
+    # Build the retrieval index before timing anything
+    lambda_function.retriever_cache.get()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    header = (f"{'tokens':>7} {'buffered':>10} {'first text':>11} {'streamed':>10} "
+              f"{'same text':>10} {'same usage':>11}")
+    print(header)
+    print('-' * len(header))
+    for tokens in args.tokens:
+        lambda_function.bedrock = FakeBedrock(output_tokens=tokens)
+        # The handlers log every request's prompt packing
+        with contextlib.redirect_stdout(io.StringIO()):
+            buffered_ms, buffered = run_buffered()
+            first_ms, streamed_ms, text, done = run_streamed(port)
+        print(f"{tokens:>7} {buffered_ms:>8.0f}ms {first_ms:>9.0f}ms {streamed_ms:>8.0f}ms "
+              f"{str(text == buffered['message']):>10} {str(same_usage(buffered['usage'], done['usage'])):>11}")
+
+    # Client goes away after the first event
+    fake = lambda_function.bedrock = FakeBedrock(output_tokens=1000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        connection, response = post_stream(port)
+        next(read_events(response))
+        connection.sock.close()
+        connection.close()
+        deadline = time.time() + 5
+        while not (fake.streams and fake.streams[0].closed) and time.time() < deadline:
+            time.sleep(0.05)
+    stream = fake.streams[0]
+    print(f"\nClient disconnected after the first event: Bedrock stream closed={stream.closed}, "
+          f"{stream.delivered} of {len(stream._events)} events read")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark: init duration of every Lambda handler
+
+Each lambda_functions/<name>/lambda_function.py is imported in a fresh
+interpreter, the way the Lambda runtime does during the init phase, with
+python -X importtime. The time is measured around the import only, so
+interpreter startup is excluded. A handler counts as importing boto3 if
+boto3 is in sys.modules afterwards, which means it builds AWS clients (or
+imports boto3) at import time instead of on first use.
+
+Results are written to cold_start_report.json, which is checked in. With
+--check the run fails when a handler's median init time exceeds the budget
+or a handler loads boto3 during init, so cold start regressions show up in
+review instead of in p99 latency.
+
+boto3 is not bundled with the functions (the Lambda runtime provides it), so
+it has to be importable here. Credentials and a region are set to dummy
+values in the child processes; nothing talks to AWS.
+
+Usage:
+    python bench_cold_start.py [--runs 5] [--functions add_movie ...]
+                               [--budget-ms 60] [--check] [--no-report]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+FUNCTIONS_DIR = os.path.join(BACKEND_DIR, 'lambda_functions')
+REPORT_PATH = os.path.join(BENCHMARKS_DIR, 'cold_start_report.json')
+
+# Median init time allowed per handler (override with --budget-ms)
+DEFAULT_BUDGET_MS = 60
+
+# Environment of the child processes: dummy credentials, no metadata lookups
+CHILD_ENV = {
+    'AWS_REGION': 'us-east-1',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_EC2_METADATA_DISABLED': 'true',
+    'S3_BUCKET_NAME': 'cinedb-benchmark',
+}
+
+
+def list_functions():
+    return sorted(
+        name for name in os.listdir(FUNCTIONS_DIR)
+        if os.path.isfile(os.path.join(FUNCTIONS_DIR, name, 'lambda_function.py'))
+    )
+
+
+# Runs in the child interpreter; imports nothing else before the handler
+CHILD_CODE = """
+import time
+start = time.perf_counter()
+import lambda_function
+elapsed = time.perf_counter() - start
+import json, sys
+print(json.dumps({'init_ms': elapsed * 1000, 'boto3_loaded': 'boto3' in sys.modules,
+                  'modules': len(sys.modules)}))
+"""
+
+
+def heaviest_imports(importtime_output, limit=3):
+    """Return the handler's direct imports with the largest cumulative time"""
+    # -X importtime prints a module after everything it imported, indented
+    # two spaces per level, so the handler's imports are the depth 1 lines
+    # between the previous top-level line and lambda_function's own line
+    children = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == 'lambda_function':
+                break
+            children = []
+    children.sort(reverse=True)
+    return [{'module': name, 'ms': round(us / 1000, 1)} for us, name in children[:limit]]
+
+
+def measure(function, runs):
+    function_dir = os.path.join(FUNCTIONS_DIR, function)
+    env = dict(os.environ, **CHILD_ENV)
+    env['PYTHONPATH'] = os.pathsep.join(
+        path for path in (function_dir, BACKEND_DIR, os.environ.get('PYTHONPATH')) if path
+    )
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_CODE],
+            cwd=function_dir, env=env, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise SystemExit(f"{function}: import failed\n{completed.stderr[-2000:]}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result['heaviest'] = heaviest_imports(completed.stderr)
+        samples.append(result)
+
+    # The first run also compiles bytecode; it is not what Lambda sees
+    if len(samples) > 1:
+        samples = samples[1:]
+    samples.sort(key=lambda sample: sample['init_ms'])
+    median = samples[len(samples) // 2]
+    return {
+        'init_ms': round(statistics.median(sample['init_ms'] for sample in samples), 1),
+        'max_ms': round(samples[-1]['init_ms'], 1),
+        'boto3_at_init': median['boto3_loaded'],
+        'modules': median['modules'],
+        'heaviest_imports': median['heaviest']
+    }
+
+
+def boto3_version():
+    try:
+        import boto3
+    except ImportError:
+        return None
+    return boto3.__version__
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Imports per function (first one is discarded)')
+    parser.add_argument('--functions', nargs='+', help='Functions to measure (default: all)')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='Median init time allowed')
+    parser.add_argument('--check', action='store_true', help='Exit 1 if a function is over budget')
+    parser.add_argument('--no-report', action='store_true', help=f'Do not write {os.path.basename(REPORT_PATH)}')
+    args = parser.parse_args()
+
+    if boto3_version() is None:
+        raise SystemExit('boto3 must be importable to measure handler init (pip install boto3)')
+
+    functions = args.functions or list_functions()
+    print(f'Lambda handler init (median of {max(args.runs - 1, 1)} fresh imports, budget {args.budget_ms:.0f}ms)')
+    header = f"{'function':<24} {'init':>9} {'max':>9} {'modules':>8} {'boto3':>6}  heaviest import"
+    print(header)
+    print('-' * (len(header) + 16))
+
+    results = {}
+    over_budget = []
+    for function in functions:
+        result = results[function] = measure(function, args.runs)
+        heaviest = result['heaviest_imports'][0] if result['heaviest_imports'] else None
+        heaviest = f"{heaviest['module']} ({heaviest['ms']:.0f}ms)" if heaviest else ''
+        print(f"{function:<24} {result['init_ms']:>7.1f}ms {result['max_ms']:>7.1f}ms "
+              f"{result['modules']:>8} {'yes' if result['boto3_at_init'] else 'no':>6}  {heaviest}")
+        if result['init_ms'] > args.budget_ms or result['boto3_at_init']:
+            over_budget.append(function)
+
+    if not args.no_report:
+        report = {
+            'python': platform.python_version(),
+            'boto3': boto3_version(),
+            'aws_client_init': os.environ.get('AWS_CLIENT_INIT', 'lazy'),
+            'budget_ms': args.budget_ms,
+            'functions': results
+        }
+        with open(REPORT_PATH, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nReport written to {os.path.relpath(REPORT_PATH)}')
+
+    if over_budget:
+        print(f"\nOver budget or loading boto3 during init: {', '.join(over_budget)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
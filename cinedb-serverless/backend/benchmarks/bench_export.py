@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark: catalog export, buffered vs streaming to S3
+
+buffered  - what exporting through get_all_movies amounts to: scan every
+            item into a list, json.dumps the whole list, gzip the string
+            and upload it with one PutObject
+streaming - cinedb_common.catalog_export.export_catalog: one worker per
+            Scan segment, rows encoded page by page into gzip/Parquet and
+            sent in 8MB multipart upload parts
+
+Each case runs in a fresh subprocess. The table is an in-process FakeTable
+with its default simulated latency; the S3 stand-in counts the bytes it
+receives, sleeps 20ms plus 10ms per MB per request and keeps nothing, so
+peak RSS (growth over the RSS after the table was loaded) is what the export
+itself holds. Parquet cases are skipped without pyarrow.
+
+Usage:
+    python bench_export.py [--items 100000] [--segments 1 4 8]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.catalog_export import load_pyarrow, export_catalog, export_row  # noqa: E402
+from cinedb_common.json_stream import encode_value  # noqa: E402
+from cinedb_common.parallel_scan import scan_all  # noqa: E402
+from fake_dynamodb import FakeTable, make_movies  # noqa: E402
+
+
+class CountingS3:
+    """S3 client stand-in that only counts what it receives"""
+
+    def __init__(self):
+        self.bytes = 0
+        self.requests = 0
+
+    def _request(self, nbytes=0):
+        self.requests += 1
+        self.bytes += nbytes
+        time.sleep(0.020 + 0.010 * nbytes / (1024 * 1024))
+
+    def put_object(self, Body, **kwargs):
+        self._request(len(Body))
+
+    def create_multipart_upload(self, **kwargs):
+        self._request()
+        return {'UploadId': str(self.requests)}
+
+    def upload_part(self, Body, PartNumber, **kwargs):
+        self._request(len(Body))
+        return {'ETag': str(PartNumber)}
+
+    def complete_multipart_upload(self, **kwargs):
+        self._request()
+
+    def abort_multipart_upload(self, **kwargs):
+        self._request()
+
+    def generate_presigned_url(self, *args, **kwargs):
+        return 'https://example.com/manifest.json'
+
+
+def buffered(table, s3_client, segments):
+    movies = scan_all(table, total_segments=segments)
+    body = '\n'.join(encode_value(export_row(movie)) for movie in movies)
+    s3_client.put_object(Bucket='bench', Key='export.ndjson.gz', Body=gzip.compress(body.encode('utf-8'), 1))
+    return len(movies)
+
+
+def streaming(file_format):
+    def run(table, s3_client, segments):
+        return export_catalog(table, s3_client, 'bench', file_format, total_segments=segments)['rows']
+    return run
+
+
+PIPELINES = {
+    'buffered': buffered,
+    'ndjson': streaming('ndjson'),
+    'csv': streaming('csv'),
+    'parquet': streaming('parquet')
+}
+
+
+def max_rss_mb():
+    # ru_maxrss is reported in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(pipeline, count, segments):
+    table = FakeTable(make_movies(count))
+    s3_client = CountingS3()
+    if pipeline == 'parquet':
+        # Count the export, not loading the pyarrow library
+        load_pyarrow()
+    baseline = max_rss_mb()
+
+    start = time.perf_counter()
+    rows = PIPELINES[pipeline](table, s3_client, segments)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'seconds': elapsed,
+        'rows': rows,
+        'peak_rss_mb': max_rss_mb() - baseline,
+        'output_mb': s3_client.bytes / (1024 * 1024)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--child', nargs=3, metavar=('PIPELINE', 'COUNT', 'SEGMENTS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]), int(args.child[2]))
+        return
+
+    try:
+        import pyarrow  # noqa: F401
+        formats = ('ndjson', 'csv', 'parquet')
+    except ImportError:
+        formats = ('ndjson', 'csv')
+
+    most = max(args.segments)
+    cases = [('buffered', most)] + [('ndjson', segments) for segments in args.segments]
+    cases += [(file_format, most) for file_format in formats if file_format != 'ndjson']
+
+    print(f'Catalog export of {args.items} movies (in-process FakeTable and S3 stand-in)')
+    header = f"{'pipeline':>10} {'segments':>9} {'time':>9} {'rows/s':>9} {'peak RSS':>10} {'output':>9}"
+    print(header)
+    print('-' * len(header))
+    for pipeline, segments in cases:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', pipeline, str(args.items), str(segments)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output)
+        if result['rows'] != args.items:
+            raise SystemExit(f"{pipeline} exported {result['rows']} of {args.items} movies")
+        print(f"{pipeline:>10} {segments:>9} {result['seconds'] * 1000:>7.0f}ms "
+              f"{args.items / result['seconds']:>9.0f} {result['peak_rss_mb']:>8.1f}MB "
+              f"{result['output_mb']:>7.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
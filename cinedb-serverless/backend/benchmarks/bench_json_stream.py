@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: get_all_movies response encoding, buffered vs streaming
+
+buffered  - the original pipeline: collect every scan item into a list, build
+            a second list of projected dicts, then json.dumps(...,
+            cls=DecimalEncoder)
+streaming - cinedb_common.json_stream: scan page -> project (numbers
+            converted) -> encode each batch -> append to the output buffer
+
+Each (pipeline, item count) pair runs in a fresh subprocess so the peak RSS
+figure is not polluted by earlier runs. The table is an in-process FakeTable
+with latency disabled, so the numbers isolate CPU and memory spent building
+the response body. Peak RSS is reported as the growth over the RSS after the
+table was loaded.
+
+Usage:
+    python bench_json_stream.py [--items 1000 10000 100000]
+"""
+
+import argparse
+import decimal
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.json_stream import encode_list_response, to_number  # noqa: E402
+from cinedb_common.parallel_scan import parallel_scan  # noqa: E402
+from fake_dynamodb import FakeTable, make_movies  # noqa: E402
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """The encoder get_all_movies used before streaming"""
+
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            if o % 1 == 0:
+                return int(o)
+            return float(o)
+        return super(DecimalEncoder, self).default(o)
+
+
+def to_api_movie(movie):
+    return {
+        'id': movie['id'],
+        'title': movie['title'],
+        'year': movie.get('year', None),
+        'duration': movie.get('duration', None),
+        'synopsis': movie.get('synopsis', ''),
+        'rating': movie.get('rating', 0),
+        'poster': movie.get('poster', '')
+    }
+
+
+def to_api_movie_streaming(movie):
+    # Same projection as get_all_movies.to_api_movie, numbers converted up front
+    return {
+        'id': movie['id'],
+        'title': movie['title'],
+        'year': to_number(movie.get('year', None)),
+        'duration': to_number(movie.get('duration', None)),
+        'synopsis': movie.get('synopsis', ''),
+        'rating': to_number(movie.get('rating', 0)),
+        'poster': movie.get('poster', '')
+    }
+
+
+def buffered(table):
+    movies = list(parallel_scan(table, total_segments=1))
+    api_movies = [to_api_movie(movie) for movie in movies]
+    return json.dumps({'movies': api_movies}, cls=DecimalEncoder)
+
+
+def streaming(table):
+    movies = parallel_scan(table, total_segments=1)
+    return encode_list_response('movies', (to_api_movie_streaming(movie) for movie in movies))
+
+
+PIPELINES = {'buffered': buffered, 'streaming': streaming}
+
+
+def max_rss_mb():
+    # ru_maxrss is reported in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(pipeline, count):
+    table = FakeTable(make_movies(count), round_trip_ms=0, ms_per_kb=0)
+    baseline = max_rss_mb()
+
+    start = time.perf_counter()
+    body = PIPELINES[pipeline](table)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'seconds': elapsed,
+        'peak_rss_mb': max_rss_mb() - baseline,
+        'body_mb': len(body) / (1024 * 1024),
+        'movies': len(json.loads(body)['movies'])
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--child', nargs=2, metavar=('PIPELINE', 'COUNT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    print('get_all_movies response encoding (in-process FakeTable, no latency)')
+    header = f"{'items':>8} {'pipeline':>10} {'time':>10} {'peak RSS':>10} {'body':>9}"
+    print(header)
+    print('-' * len(header))
+    for count in args.items:
+        for pipeline in PIPELINES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', pipeline, str(count)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output)
+            if result['movies'] != count:
+                raise SystemExit(f"{pipeline} returned {result['movies']} of {count} movies")
+            print(f"{count:>8} {pipeline:>10} {result['seconds'] * 1000:>8.0f}ms "
+                  f"{result['peak_rss_mb']:>8.1f}MB {result['body_mb']:>7.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
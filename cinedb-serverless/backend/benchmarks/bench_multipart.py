@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark: multipart poster upload parsing, legacy vs cinedb_common.multipart
+
+legacy     - what add_movie/update_movie did before: base64-decode the whole
+             body, then parse_multipart_data (split on the boundary, split
+             each part on the header separator, strip the content)
+in-place   - base64-decode the whole body, then parse_multipart, which
+             returns the poster as a zero-copy slice of the decoded body
+streaming  - parse_multipart_event: decode the base64 body in chunks into
+             MultipartParser, which spools the poster to a temporary file
+             (in memory up to 1MB, then /tmp)
+
+The input is an API Gateway event with isBase64Encoded set, a few text fields
+and a random (incompressible) poster. Each (pipeline, size) pair runs in a
+fresh subprocess. Peak memory is the tracemalloc peak of one parse, on top of
+the event itself (building the event already pushes RSS past any parse, so
+ru_maxrss cannot see the difference); bytes spooled to /tmp are not counted.
+Time is the median of several parses with tracing off.
+
+Usage:
+    python bench_multipart.py [--sizes 1 5 10] [--repeat 5]
+"""
+
+import argparse
+import base64
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.multipart import parse_multipart, parse_multipart_event  # noqa: E402
+
+BOUNDARY = '----WebKitFormBoundary7MA4YWxkTrZu0gW'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+
+
+def parse_multipart_data(content_type, body):
+    """The parser add_movie and update_movie used before (unchanged logic)"""
+    boundary = re.search(r'boundary=([^;]+)', content_type).group(1)
+    if isinstance(body, str):
+        try:
+            body = base64.b64decode(body)
+        except Exception:
+            body = body.encode('utf-8')
+    parts = body.split(f'--{boundary}'.encode('utf-8'))
+    result = {'fields': {}, 'files': {}}
+    for part in parts:
+        if b'\r\n\r\n' not in part:
+            continue
+        headers_raw, content = part.split(b'\r\n\r\n', 1)
+        headers = {}
+        for header_line in headers_raw.split(b'\r\n'):
+            if b':' in header_line:
+                header_name, header_value = header_line.split(b':', 1)
+                headers[header_name.strip().decode('utf-8').lower()] = header_value.strip().decode('utf-8')
+        if content.endswith(b'\r\n'):
+            content = content[:-2]
+        if 'content-disposition' in headers:
+            cd_parts = headers['content-disposition'].split(';')
+            field_name = None
+            for cd_part in cd_parts:
+                if 'name=' in cd_part:
+                    field_name = cd_part.split('=', 1)[1].strip('"\'')
+                    break
+            if not field_name:
+                continue
+            filename = None
+            for cd_part in cd_parts:
+                if 'filename=' in cd_part:
+                    filename = cd_part.split('=', 1)[1].strip('"\'')
+                    break
+            if filename:
+                result['files'][field_name] = {
+                    'filename': filename,
+                    'content_type': headers.get('content-type', 'application/octet-stream'),
+                    'content': content
+                }
+            else:
+                result['fields'][field_name] = content.decode('utf-8')
+    return result
+
+
+def legacy(event):
+    return parse_multipart_data(CONTENT_TYPE, base64.b64decode(event['body']))
+
+
+def in_place(event):
+    return parse_multipart(CONTENT_TYPE, base64.b64decode(event['body']))
+
+
+def streaming(event):
+    return parse_multipart_event(event, CONTENT_TYPE)
+
+
+PIPELINES = {'legacy': legacy, 'in-place': in_place, 'streaming': streaming}
+
+
+def make_event(poster_mb):
+    fields = {'title': 'Benchmark Movie', 'year': '2024', 'rating': '8.5', 'synopsis': 'A movie. ' * 50}
+    body = bytearray()
+    for name, value in fields.items():
+        body += (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                 f'{value}\r\n').encode('utf-8')
+    body += (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="poster"; filename="poster.jpg"\r\n'
+             f'Content-Type: image/jpeg\r\n\r\n').encode('utf-8')
+    body += os.urandom(int(poster_mb * 1024 * 1024))
+    body += f'\r\n--{BOUNDARY}--\r\n'.encode('utf-8')
+    return {
+        'httpMethod': 'POST',
+        'headers': {'content-type': CONTENT_TYPE},
+        'body': base64.b64encode(body).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+
+def poster_size(form):
+    content = form['files']['poster']['content']
+    if isinstance(content, bytes):
+        return len(content)
+    content.seek(0, os.SEEK_END)
+    return content.tell()
+
+
+def run_child(pipeline, poster_mb, repeat):
+    event = make_event(poster_mb)
+    parse = PIPELINES[pipeline]
+
+    tracemalloc.start()
+    form = parse(event)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = poster_size(form)
+    del form
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        form = parse(event)
+        timings.append(time.perf_counter() - start)
+        del form
+
+    print(json.dumps({
+        'seconds': statistics.median(timings),
+        'peak_mb': peak / (1024 * 1024),
+        'poster_bytes': size
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 5, 10], help='Poster sizes in MB')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', nargs=2, metavar=('PIPELINE', 'MB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], float(args.child[1]), args.repeat)
+        return
+
+    print('Multipart poster parsing (base64 API Gateway event)')
+    header = f"{'poster':>8} {'pipeline':>10} {'time':>10} {'peak mem':>10}"
+    print(header)
+    print('-' * len(header))
+    for poster_mb in args.sizes:
+        for pipeline in PIPELINES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', pipeline, str(poster_mb),
+                 '--repeat', str(args.repeat)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output)
+            if result['poster_bytes'] != int(poster_mb * 1024 * 1024):
+                raise SystemExit(f"{pipeline} returned a {result['poster_bytes']} byte poster")
+            print(f"{poster_mb:>6g}MB {pipeline:>10} {result['seconds'] * 1000:>8.1f}ms "
+                  f"{result['peak_mb']:>8.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
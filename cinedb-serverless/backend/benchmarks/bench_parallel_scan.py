@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential vs parallel segmented Scan
+
+Measures wall-clock time to read the whole catalog with
+cinedb_common.parallel_scan for several item counts and segment counts.
+
+By default the scan runs against the in-process FakeTable, which simulates
+DynamoDB round-trip latency and 1MB pages. Pass --endpoint-url to run against
+DynamoDB Local instead (requires boto3):
+
+    docker run -p 8000:8000 amazon/dynamodb-local
+    python bench_parallel_scan.py --endpoint-url http://localhost:8000
+
+Usage:
+    python bench_parallel_scan.py [--items 1000 10000 50000] [--segments 1 2 4 8 16]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.parallel_scan import scan_all  # noqa: E402
+from fake_dynamodb import FakeTable, make_movies  # noqa: E402
+
+
+def dynamodb_local_table(endpoint_url, items):
+    """Create and seed a throwaway table in DynamoDB Local"""
+    import boto3
+
+    dynamodb = boto3.resource(
+        'dynamodb', endpoint_url=endpoint_url, region_name='us-east-1',
+        aws_access_key_id='local', aws_secret_access_key='local'
+    )
+    table_name = f'cinedb-bench-{len(items)}'
+    try:
+        dynamodb.Table(table_name).delete()
+        dynamodb.Table(table_name).wait_until_not_exists()
+    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+        pass
+
+    table = dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    table.wait_until_exists()
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+    return table
+
+
+def time_scan(table, segments, repeat):
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(scan_all(table, total_segments=segments))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per cell; the best time is reported')
+    parser.add_argument('--endpoint-url', help='Run against DynamoDB Local instead of the in-process fake')
+    args = parser.parse_args()
+
+    backend = args.endpoint_url or 'in-process FakeTable'
+    print(f'Parallel scan benchmark ({backend})')
+    header = f"{'items':>8} " + ' '.join(f"{f'{s} seg':>10}" for s in args.segments) + f" {'speedup':>8}"
+    print(header)
+    print('-' * len(header))
+
+    for count in args.items:
+        items = make_movies(count)
+        table = dynamodb_local_table(args.endpoint_url, items) if args.endpoint_url else FakeTable(items)
+
+        timings = []
+        for segments in args.segments:
+            elapsed, scanned = time_scan(table, segments, args.repeat)
+            if scanned != count:
+                raise SystemExit(f'Scan with {segments} segments returned {scanned} of {count} items')
+            timings.append(elapsed)
+
+        row = f'{count:>8} ' + ' '.join(f'{t * 1000:>8.0f}ms' for t in timings)
+        print(f'{row} {timings[0] / min(timings):>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
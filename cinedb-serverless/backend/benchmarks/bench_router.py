@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one function per route vs the single api_router function
+
+Replays the same request trace against two simulated Lambda deployments:
+
+per-function - every handler is its own function with its own containers
+router       - lambda_functions/api_router serves every route from one pool
+
+Lambda runs one request per container at a time. A request goes to the most
+recently used idle container of its function. If there is none, Lambda
+starts a new container, and the request pays a cold start. Containers idle
+for longer than --idle-minutes are reclaimed. A container also pays, on the
+first request that needs it:
+
+- importing the handler (at init per function, on the route's first request
+  for the router)
+- importing boto3 and building each AWS client (cinedb_common.aws_clients)
+- loading the search index artifact (first search)
+
+The router builds each of these once per container instead of once per
+function.
+
+Costs are measured, not assumed, where this machine can measure them:
+handler init comes from cold_start_report.json (bench_cold_start.py). The
+boto3 import and client construction are timed in a fresh interpreter when
+boto3 is installed. The search index load is timed on a synthetic catalog.
+The Lambda runtime bootstrap and the warm service time of each route cannot
+be measured locally and use the values in RUNTIME_INIT_MS and ROUTE_MIX.
+
+The default trace is 24 hours of bursty traffic at each --rate. Per-minute
+rates vary, and 10% of minutes are bursts at 5x the average. Requests follow
+ROUTE_MIX. --trace replays API Gateway access log lines (JSON with
+requestTimeEpoch, httpMethod and path) or lines of {"time", "method",
+"path"} instead.
+
+Usage:
+    python bench_router.py [--rate 2 10 60] [--hours 24] [--idle-minutes 10]
+                           [--trace access-log.jsonl] [--seed 1]
+"""
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from cinedb_common.search_index import SearchIndex  # noqa: E402
+from fake_dynamodb import make_movies  # noqa: E402
+
+REPORT_PATH = os.path.join(BENCHMARKS_DIR, 'cold_start_report.json')
+ROUTER_PATH = os.path.join(BACKEND_DIR, 'lambda_functions', 'api_router', 'lambda_function.py')
+
+# Python runtime bootstrap before the function's own init (not measurable locally)
+RUNTIME_INIT_MS = 120
+
+# (method, sample path, share of requests, median warm service time in ms)
+ROUTE_MIX = (
+    ('GET', '/movies', 0.34, 180),
+    ('GET', '/movies/{id}', 0.30, 25),
+    ('GET', '/movies/search', 0.12, 15),
+    ('POST', '/movies/batch', 0.05, 35),
+    ('GET', '/presigned/{key}', 0.06, 5),
+    ('POST', '/presigned', 0.03, 10),
+    ('POST', '/movies', 0.03, 70),
+    ('PUT', '/movies/{id}', 0.03, 60),
+    ('DELETE', '/movies/{id}', 0.01, 50),
+    ('POST', '/chat', 0.03, 1500),
+)
+
+# AWS clients each handler builds on its first request
+HANDLER_CLIENTS = {
+    'get_all_movies': ('dynamodb', 's3'),
+    'get_movie_by_id': ('dynamodb', 's3'),
+    'search_movies': ('s3',),
+    'get_movies_batch': ('dynamodb', 's3'),
+    'generate_presigned_url': ('s3',),
+    'add_movie': ('dynamodb', 's3'),
+    'update_movie': ('dynamodb', 's3'),
+    'delete_movie': ('dynamodb', 's3'),
+    'chat_bedrock': ('dynamodb', 'bedrock-runtime'),
+}
+
+# Used when boto3 is not installed (Python 3.11, boto3 1.43)
+DEFAULT_CLIENT_COSTS_MS = {'boto3': 190, 's3': 120, 'dynamodb': 25, 'bedrock-runtime': 15}
+
+# S3 GET of the search index artifact, on top of deserializing it
+SEARCH_INDEX_GET_MS = 30
+
+CLIENT_COST_CODE = """
+import json, time
+start = time.perf_counter(); import boto3; costs = {'boto3': time.perf_counter() - start}
+start = time.perf_counter(); boto3.client('s3', region_name='us-east-1'); costs['s3'] = time.perf_counter() - start
+start = time.perf_counter(); boto3.resource('dynamodb', region_name='us-east-1').Table('cinedb')
+costs['dynamodb'] = time.perf_counter() - start
+start = time.perf_counter(); boto3.client('bedrock-runtime', region_name='us-east-1')
+costs['bedrock-runtime'] = time.perf_counter() - start
+print(json.dumps({name: seconds * 1000 for name, seconds in costs.items()}))
+"""
+
+
+def load_router():
+    spec = importlib.util.spec_from_file_location('api_router', ROUTER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure_client_costs(runs=3):
+    """Median time to import boto3 and build each client, in a fresh interpreter"""
+    env = dict(os.environ, AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing',
+               AWS_EC2_METADATA_DISABLED='true')
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-c', CLIENT_COST_CODE], env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            return None
+        samples.append(json.loads(completed.stdout))
+    return {name: statistics.median(sample[name] for sample in samples) for name in samples[0]}
+
+
+def measure_search_index_load(catalog_size):
+    data = SearchIndex.build(make_movies(catalog_size)).to_bytes()
+    start = time.perf_counter()
+    SearchIndex.from_bytes(data)
+    return SEARCH_INDEX_GET_MS + (time.perf_counter() - start) * 1000
+
+
+def generate_trace(rate_per_minute, hours, rng):
+    """Return [(seconds, method, path)] of bursty Poisson traffic following ROUTE_MIX"""
+    weights = [share for _, _, share, _ in ROUTE_MIX]
+    quiet = (1 - 0.1 * 5) / 0.9
+    trace = []
+    for minute in range(int(hours * 60)):
+        rate = rate_per_minute * (5 if rng.random() < 0.1 else quiet) / 60
+        t = minute * 60.0
+        while True:
+            t += rng.expovariate(rate)
+            if t >= (minute + 1) * 60:
+                break
+            method, path, _, _ = rng.choices(ROUTE_MIX, weights)[0]
+            trace.append((t, method, path))
+    return trace
+
+
+def read_trace(path):
+    trace = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if 'requestTimeEpoch' in entry:
+                seconds = int(entry['requestTimeEpoch']) / 1000
+            else:
+                seconds = float(entry['time'])
+            request_path = entry['path']
+            stage = entry.get('stage')
+            if stage and request_path.startswith(f'/{stage}/'):
+                request_path = request_path[len(stage) + 1:]
+            trace.append((seconds, (entry.get('httpMethod') or entry['method']).upper(), request_path))
+    trace.sort()
+    start = trace[0][0] if trace else 0
+    return [(seconds - start, method, request_path) for seconds, method, request_path in trace]
+
+
+class Container:
+    def __init__(self):
+        self.busy_until = 0.0
+        self.handlers = set()
+        self.clients = set()
+        self.search_index = False
+
+    def first_use_ms(self, function, costs, load_handler):
+        """Cost of the lazy initialization this request triggers"""
+        ms = 0.0
+        if load_handler and function not in self.handlers:
+            ms += costs['init'][function]
+        self.handlers.add(function)
+        for client in HANDLER_CLIENTS[function]:
+            if client not in self.clients:
+                if not self.clients:
+                    ms += costs['clients']['boto3']
+                ms += costs['clients'][client]
+                self.clients.add(client)
+        if function == 'search_movies' and not self.search_index:
+            ms += costs['search_index']
+            self.search_index = True
+        return ms
+
+
+def simulate(requests, layout, costs, idle_timeout):
+    """
+    Replay requests against one deployment layout
+
+    Args:
+        requests (list): (seconds, function, warm service ms), sorted by time
+        layout (str): 'per-function' or 'router'
+        costs (dict): Measured init and first-use costs
+        idle_timeout (float): Seconds before an idle container is reclaimed
+
+    Returns:
+        dict: Request and cold start counts and latency percentiles
+    """
+    router = layout == 'router'
+    pools = {}
+    latencies = []
+    cold_starts = 0
+    for t, function, service_ms in requests:
+        pool = pools.setdefault('api_router' if router else function, [])
+        pool[:] = [container for container in pool if t - container.busy_until < idle_timeout]
+
+        idle = [container for container in pool if container.busy_until <= t]
+        latency = service_ms
+        if idle:
+            container = max(idle, key=lambda c: c.busy_until)
+        else:
+            container = Container()
+            pool.append(container)
+            cold_starts += 1
+            latency += RUNTIME_INIT_MS + costs['init']['api_router' if router else function]
+        latency += container.first_use_ms(function, costs, load_handler=router)
+
+        container.busy_until = t + latency / 1000
+        latencies.append(latency)
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(math.ceil(p / 100 * len(latencies))) - 1)]
+
+    return {
+        'requests': len(latencies),
+        'cold_starts': cold_starts,
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99)
+    }
+
+
+def to_requests(trace, router, rng):
+    """Resolve each traced request to its handler and draw its service time"""
+    medians = {
+        (method, router.match_route(method, sample_path)[0]): median
+        for method, sample_path, _, median in ROUTE_MIX
+    }
+    requests = []
+    for t, method, path in trace:
+        route = router.match_route(method, path.rstrip('/') or '/')
+        if route is None or route[0] not in HANDLER_CLIENTS:
+            continue
+        median = medians.get((method, route[0]), 50)
+        # Warm latency varies around the route's median
+        requests.append((t, route[0], median * rng.lognormvariate(0, 0.3)))
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, nargs='+', default=[2, 10, 60], help='Average requests per minute')
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--idle-minutes', type=float, default=10, help='Idle time before a container is reclaimed')
+    parser.add_argument('--trace', help='Replay an access log instead of generated traffic')
+    parser.add_argument('--catalog-size', type=int, default=5000, help='Movies in the search index')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with open(REPORT_PATH) as f:
+        report = json.load(f)
+    init = {function: result['init_ms'] for function, result in report['functions'].items()}
+    if 'api_router' not in init:
+        raise SystemExit('cold_start_report.json has no api_router entry; run bench_cold_start.py first')
+
+    clients = measure_client_costs()
+    source = 'measured' if clients else 'defaults (boto3 not installed)'
+    clients = clients or DEFAULT_CLIENT_COSTS_MS
+    costs = {'init': init, 'clients': clients, 'search_index': measure_search_index_load(args.catalog_size)}
+
+    router = load_router()
+    print(f"First-use costs ({source}): " + ', '.join(f'{name} {ms:.0f}ms' for name, ms in clients.items())
+          + f", search index {costs['search_index']:.0f}ms; runtime init {RUNTIME_INIT_MS}ms")
+    print(f'Idle containers reclaimed after {args.idle_minutes:g} minutes')
+    header = (f"{'traffic':>14} {'layout':>13} {'requests':>9} {'cold':>6} {'cold rate':>10} "
+              f"{'p50':>8} {'p95':>8} {'p99':>8}")
+    print(header)
+    print('-' * len(header))
+
+    if args.trace:
+        runs = [(os.path.basename(args.trace), read_trace(args.trace))]
+    else:
+        runs = [(f'{rate:g}/min', generate_trace(rate, args.hours, random.Random(args.seed))) for rate in args.rate]
+
+    for label, trace in runs:
+        requests = to_requests(trace, router, random.Random(args.seed))
+        for layout in ('per-function', 'router'):
+            result = simulate(requests, layout, costs, args.idle_minutes * 60)
+            print(f"{label:>14} {layout:>13} {result['requests']:>9} {result['cold_starts']:>6} "
+                  f"{result['cold_starts'] / max(result['requests'], 1):>9.2%} "
+                  f"{result['p50']:>6.0f}ms {result['p95']:>6.0f}ms {result['p99']:>6.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
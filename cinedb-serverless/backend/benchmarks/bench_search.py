@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-text search index size, load time and query latency
+
+Builds a cinedb_common.search_index.SearchIndex over synthetic movies whose
+titles, synopses, directors and casts are drawn from a Zipf-like vocabulary
+(so postings lists have realistic, skewed lengths), then reports:
+
+- build     time to index the catalog from scanned items
+- artifact  size of the compressed artifact stored in S3
+- load      time to deserialize the artifact (cold container)
+- update    one incremental write: load, add a movie, serialize
+- query     p50/p95 latency over a mix of one-word, multi-word and prefix
+            queries, answered from the in-memory index
+
+Usage:
+    python bench_search.py [--items 1000 10000 50000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.search_index import SearchIndex  # noqa: E402
+from fake_dynamodb import make_movie  # noqa: E402
+
+SYLLABLES = ['ka', 'ro', 'mi', 'ten', 'sa', 'lo', 'vin', 'dra', 'el', 'mor', 'ta', 'ne', 'shi', 'qu', 'ar', 'bel']
+
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_catalog(count, seed=7):
+    """Synthetic movies with a skewed vocabulary"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(20000, rng)
+    # Shuffle so word frequency is unrelated to spelling (and thus to prefixes)
+    rng.shuffle(vocabulary)
+    # Zipf-like weights: a few very common words and a long tail
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    people = [f'{rng.choice(vocabulary).title()} {rng.choice(vocabulary).title()}' for _ in range(5000)]
+
+    movies = []
+    for i in range(count):
+        movie = make_movie(i)
+        movie['title'] = ' '.join(rng.choices(vocabulary, weights, k=rng.randint(1, 4))).title()
+        movie['synopsis'] = ' '.join(rng.choices(vocabulary, weights, k=rng.randint(40, 90)))
+        movie['director'] = rng.choice(people)
+        movie['cast'] = rng.sample(people, 4)
+        movies.append(movie)
+    return movies, vocabulary, people
+
+
+def make_queries(movies, vocabulary, people, rng, count=300):
+    queries = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(rng.choice(vocabulary))
+        elif kind < 0.7:
+            queries.append(rng.choice(movies)['title'])
+        elif kind < 0.85:
+            queries.append(rng.choice(people))
+        else:
+            # Type-ahead: a title with its last word cut short
+            title = rng.choice(movies)['title']
+            queries.append(title[:max(2, len(title) - 3)])
+    return queries
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    print('Search index benchmark (synthetic catalog, Zipf vocabulary)')
+    header = (f"{'items':>8} {'build':>9} {'artifact':>9} {'load':>8} {'update':>8} "
+              f"{'query p50':>10} {'query p95':>10}")
+    print(header)
+    print('-' * len(header))
+
+    for count in args.items:
+        movies, vocabulary, people = make_catalog(count)
+        index, build_seconds = timed(SearchIndex.build, movies)
+        artifact = index.to_bytes()
+        _, load_seconds = timed(SearchIndex.from_bytes, artifact)
+
+        def incremental_update():
+            loaded = SearchIndex.from_bytes(artifact)
+            loaded.add(dict(movies[0], title='Updated Title'))
+            return loaded.to_bytes()
+        _, update_seconds = timed(incremental_update)
+
+        latencies = []
+        for query in make_queries(movies, vocabulary, people, random.Random(count)):
+            results, elapsed = timed(index.search, query)
+            latencies.append(elapsed)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)]
+
+        print(f'{count:>8} {build_seconds * 1000:>7.0f}ms {len(artifact) / 1024:>7.0f}KB '
+              f'{load_seconds * 1000:>6.0f}ms {update_seconds * 1000:>6.0f}ms '
+              f'{statistics.median(latencies) * 1000:>8.2f}ms {p95 * 1000:>8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+In-process Bedrock Runtime stand-in for the chat benchmarks
+
+FakeBedrock mimics converse and converse_stream of a boto3 bedrock-runtime
+client. The reply is a fixed text of the requested number of output tokens
+(about 4 characters each). Latency follows the shape of a hosted model: a
+time to first token, then a steady output rate. converse sleeps for the
+whole generation; converse_stream returns at once and its event stream
+sleeps before each delta, like the real EventStream blocks on the
+connection. Usage and metrics are reported in the same places as Bedrock's.
+"""
+
+import time
+
+# Claude 3.5 Haiku on Bedrock, roughly: first token after ~600ms, then ~60 tokens/s
+DEFAULT_FIRST_TOKEN_MS = 600.0
+DEFAULT_TOKENS_PER_SECOND = 60.0
+
+# Output tokens per contentBlockDelta event
+TOKENS_PER_DELTA = 3
+
+WORDS = ('You might enjoy this one, a thriller from the nineties with a twist '
+         'that still holds up, and a score that sets the mood from the first scene.').split()
+
+
+def make_reply(output_tokens):
+    """Reply text of about `output_tokens` tokens, as a list of per-token pieces"""
+    return [('' if position == 0 else ' ') + WORDS[position % len(WORDS)] for position in range(output_tokens)]
+
+
+def _input_tokens(request):
+    chars = sum(len(block.get('text', '')) for block in request.get('system', []))
+    chars += sum(len(block.get('text', '')) for msg in request.get('messages', []) for block in msg['content'])
+    return chars // 4
+
+
+class FakeEventStream:
+    """The `stream` of a converse_stream response: an iterable of event dicts"""
+
+    def __init__(self, events, delays):
+        self._events = events
+        self._delays = delays
+        self.closed = False
+        self.delivered = 0
+
+    def __iter__(self):
+        for event, delay in zip(self._events, self._delays):
+            if self.closed:
+                return
+            if delay:
+                time.sleep(delay)
+            self.delivered += 1
+            yield event
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBedrock:
+    """
+    Stand-in for a bedrock-runtime client
+
+    Args:
+        output_tokens (int): Length of every reply, in tokens
+        first_token_ms (float): Time to the first output token
+        tokens_per_second (float): Output rate after the first token
+    """
+
+    def __init__(self, output_tokens=300, first_token_ms=DEFAULT_FIRST_TOKEN_MS,
+                 tokens_per_second=DEFAULT_TOKENS_PER_SECOND):
+        self.output_tokens = output_tokens
+        self.first_token_ms = first_token_ms
+        self.tokens_per_second = tokens_per_second
+        self.requests = []
+        self.streams = []
+
+    def _usage(self, request):
+        input_tokens = _input_tokens(request)
+        return {'inputTokens': input_tokens, 'outputTokens': self.output_tokens,
+                'totalTokens': input_tokens + self.output_tokens}
+
+    def _generation_seconds(self):
+        return (self.first_token_ms + 1000 * (self.output_tokens - 1) / self.tokens_per_second) / 1000
+
+    def converse(self, **request):
+        self.requests.append(request)
+        time.sleep(self._generation_seconds())
+        return {
+            'output': {'message': {'role': 'assistant', 'content': [{'text': ''.join(make_reply(self.output_tokens))}]}},
+            'stopReason': 'end_turn',
+            'usage': self._usage(request),
+            'metrics': {'latencyMs': round(self._generation_seconds() * 1000)}
+        }
+
+    def converse_stream(self, **request):
+        self.requests.append(request)
+        pieces = make_reply(self.output_tokens)
+        events = [{'messageStart': {'role': 'assistant'}}]
+        delays = [0.0]
+        for index in range(0, len(pieces), TOKENS_PER_DELTA):
+            events.append({'contentBlockDelta': {'delta': {'text': ''.join(pieces[index:index + TOKENS_PER_DELTA])},
+                                                 'contentBlockIndex': 0}})
+            tokens = len(pieces[index:index + TOKENS_PER_DELTA])
+            if index == 0:
+                delays.append((self.first_token_ms + 1000 * (tokens - 1) / self.tokens_per_second) / 1000)
+            else:
+                delays.append(tokens / self.tokens_per_second)
+        events += [
+            {'contentBlockStop': {'contentBlockIndex': 0}},
+            {'messageStop': {'stopReason': 'end_turn'}},
+            {'metadata': {'usage': self._usage(request),
+                          'metrics': {'latencyMs': round(self._generation_seconds() * 1000)}}}
+        ]
+        delays += [0.0, 0.0, 0.0]
+        stream = FakeEventStream(events, delays)
+        self.streams.append(stream)
+        return {'stream': stream}
@@ -0,0 +1,215 @@
+"""
+In-process DynamoDB stand-in for the backend benchmarks
+
+FakeTable mimics the parts of a boto3 Table resource the Lambda functions use
+(scan, get_item, put_item, meta.client). Every request sleeps for a simulated
+network round trip plus a transfer cost proportional to the bytes returned,
+and Scan pages are capped at 1MB, so the benchmarks see the same shape of
+latency as a real table without needing AWS credentials. With write_capacity
+set, BatchWriteItem returns the items over that many writes per second as
+UnprocessedItems, like a provisioned table under throttling.
+"""
+
+import json
+import threading
+import time
+import uuid
+import zlib
+from decimal import Decimal
+
+# Simulated latency: fixed round trip plus a per-KB transfer cost
+DEFAULT_ROUND_TRIP_MS = 8.0
+DEFAULT_MS_PER_KB = 0.05
+
+# DynamoDB returns at most 1MB of data per Scan/Query page
+PAGE_SIZE_BYTES = 1024 * 1024
+
+GENRES = ['Drama', 'Comedy', 'Action', 'Sci-Fi', 'Horror', 'Romance', 'Thriller', 'Animation']
+
+
+def make_movie(index, synopsis_chars=600):
+    """Build a movie item shaped like the records add_movie writes"""
+    return {
+        'id': str(uuid.UUID(int=index + 1)),
+        'title': f'Movie {index:07d}',
+        'year': Decimal(1950 + index % 75),
+        'duration': Decimal(80 + index % 90),
+        'rating': Decimal(str(round(1 + (index * 37 % 90) / 10, 1))),
+        'genre': GENRES[index % len(GENRES)],
+        'director': f'Director {index % 997}',
+        'cast': [f'Actor {(index + n) % 5003}' for n in range(4)],
+        'synopsis': ('A story about ' + 'cinema ' * synopsis_chars)[:synopsis_chars],
+        'poster': f'https://cinedb-bucket-2025.s3.amazonaws.com/{index:07d}.jpg',
+        'createdAt': '2025-01-01T00:00:00',
+    }
+
+
+def make_movies(count, synopsis_chars=600):
+    return [make_movie(i, synopsis_chars) for i in range(count)]
+
+
+def _serialize(item):
+    def number(value):
+        return int(value) if value == int(value) else float(value)
+    return json.dumps(item, default=number)
+
+
+def _deserialize(raw):
+    # Like boto3, parse the wire format into fresh objects with Decimal numbers
+    return json.loads(raw, parse_int=Decimal, parse_float=Decimal)
+
+
+class FakeClient:
+    """Thread-safe stand-in for the low-level DynamoDB client"""
+
+    def __init__(self, table, round_trip_ms, ms_per_kb, write_capacity=None):
+        self._table = table
+        self.round_trip_ms = round_trip_ms
+        self.ms_per_kb = ms_per_kb
+        self.request_count = 0
+        self.write_capacity = write_capacity
+        self.unprocessed_count = 0
+        self._write_tokens = 0.0
+        self._tokens_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _simulate_latency(self, nbytes):
+        with self._lock:
+            self.request_count += 1
+        time.sleep((self.round_trip_ms + self.ms_per_kb * nbytes / 1024) / 1000)
+
+    def scan(self, TableName=None, Segment=None, TotalSegments=None, Limit=None,
+             ExclusiveStartKey=None, ProjectionExpression=None,
+             ExpressionAttributeNames=None, **kwargs):
+        keys, key_index = self._table.segment_keys(Segment or 0, TotalSegments or 1)
+        position = 0
+        if ExclusiveStartKey:
+            position = key_index[ExclusiveStartKey['id']] + 1
+
+        items = []
+        page_bytes = 0
+        last_key = None
+        while position < len(keys):
+            raw = self._table.items[keys[position]]
+            if items and page_bytes + len(raw) > PAGE_SIZE_BYTES:
+                break
+            page_bytes += len(raw)
+            items.append(_project(_deserialize(raw), ProjectionExpression, ExpressionAttributeNames))
+            last_key = keys[position]
+            position += 1
+            if Limit and len(items) >= Limit:
+                break
+
+        response = {'Items': items, 'Count': len(items), 'ScannedCount': len(items)}
+        if position < len(keys) and last_key is not None:
+            response['LastEvaluatedKey'] = {'id': last_key}
+        self._simulate_latency(page_bytes)
+        return response
+
+    def get_item(self, TableName=None, Key=None, ProjectionExpression=None,
+                 ExpressionAttributeNames=None, **kwargs):
+        raw = self._table.items.get(Key['id'])
+        self._simulate_latency(len(raw or ''))
+        if raw is None:
+            return {}
+        return {'Item': _project(_deserialize(raw), ProjectionExpression, ExpressionAttributeNames)}
+
+    def put_item(self, TableName=None, Item=None, **kwargs):
+        self._table.store(Item)
+        self._simulate_latency(len(_serialize(Item)))
+        return {}
+
+    def _take_write_tokens(self, wanted):
+        # Token bucket refilled at write_capacity per second, starting empty and holding at most one second's worth
+        if not self.write_capacity:
+            return wanted
+        with self._lock:
+            now = time.monotonic()
+            self._write_tokens = min(
+                float(self.write_capacity),
+                self._write_tokens + (now - self._tokens_at) * self.write_capacity
+            )
+            self._tokens_at = now
+            granted = min(wanted, int(self._write_tokens))
+            self._write_tokens -= granted
+            self.unprocessed_count += wanted - granted
+            return granted
+
+    def batch_write_item(self, RequestItems=None, **kwargs):
+        if len(RequestItems) != 1:
+            raise ValueError('FakeClient supports one table per request')
+        (table_name, requests), = RequestItems.items()
+        if len(requests) > 25:
+            raise ValueError('Too many items requested for the BatchWriteItem call')
+        ids = [request['PutRequest']['Item']['id'] for request in requests]
+        if len(set(ids)) != len(ids):
+            raise ValueError('Provided list of item keys contains duplicates')
+
+        granted = self._take_write_tokens(len(requests))
+        nbytes = 0
+        for request in requests[:granted]:
+            raw = _serialize(request['PutRequest']['Item'])
+            nbytes += len(raw)
+            self._table.items[request['PutRequest']['Item']['id']] = raw
+        self._table._reindex()
+        self._simulate_latency(nbytes)
+
+        response = {'UnprocessedItems': {}}
+        if granted < len(requests):
+            response['UnprocessedItems'][table_name] = requests[granted:]
+        return response
+
+
+def _project(item, projection_expression, attribute_names):
+    if not projection_expression:
+        return item
+    attribute_names = attribute_names or {}
+    fields = [attribute_names.get(name.strip(), name.strip()) for name in projection_expression.split(',')]
+    return {name: item[name] for name in fields if name in item}
+
+
+class _Meta:
+    def __init__(self, client):
+        self.client = client
+
+
+class FakeTable:
+    """Stand-in for a boto3 Table resource backed by an in-memory dict"""
+
+    def __init__(self, items=(), name='cinedb', round_trip_ms=DEFAULT_ROUND_TRIP_MS,
+                 ms_per_kb=DEFAULT_MS_PER_KB, write_capacity=None):
+        self.name = name
+        # Items are stored serialized, so every read builds fresh objects
+        self.items = {}
+        self._segments = {}
+        self.meta = _Meta(FakeClient(self, round_trip_ms, ms_per_kb, write_capacity))
+        for item in items:
+            self.items[item['id']] = _serialize(item)
+        self._reindex()
+
+    def _reindex(self):
+        self._segments = {}
+
+    def segment_keys(self, segment, total_segments):
+        """Return (sorted keys, key -> position) for one scan segment"""
+        if total_segments not in self._segments:
+            buckets = [[] for _ in range(total_segments)]
+            for key in sorted(self.items):
+                buckets[zlib.crc32(key.encode('utf-8')) % total_segments].append(key)
+            self._segments[total_segments] = [
+                (keys, {key: i for i, key in enumerate(keys)}) for keys in buckets
+            ]
+        return self._segments[total_segments][segment]
+
+    def store(self, item):
+        self.items[item['id']] = _serialize(item)
+        self._reindex()
+
+    def scan(self, **kwargs):
+        return self.meta.client.scan(TableName=self.name, **kwargs)
+
+    def get_item(self, **kwargs):
+        return self.meta.client.get_item(TableName=self.name, **kwargs)
+
+    def put_item(self, **kwargs):
+        return self.meta.client.put_item(TableName=self.name, **kwargs)
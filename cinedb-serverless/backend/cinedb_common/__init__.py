@@ -0,0 +1,10 @@
+"""
+Shared helpers for the CineDB Lambda functions
+
+Each Lambda function is deployed as its own zip file. Modules in this package
+are bundled next to lambda_function.py by backend/package-function.sh so that
+handlers can simply `from cinedb_common import ...`.
+
+The Flask app in app/ imports the package from this directory as well;
+gunicorn.conf.py puts it on the import path.
+"""
@@ -0,0 +1,125 @@
+"""
+Movies in the shape the list endpoints return them
+
+get_all_movies and get_movies_batch read movie items from DynamoDB, sign
+their posters in one batch and project each item onto the fields the client
+asked for. Both use these helpers, so a movie looks the same whichever
+endpoint returned it.
+"""
+
+from cinedb_common.json_stream import to_number
+from cinedb_common.poster_upload import key_from_url
+from cinedb_common.poster_variants import build_srcset, variant_keys
+
+# How each API field is read from a movie item, after presign_posters.
+# Numbers are converted from DynamoDB Decimals to int/float here
+_FIELD_VALUES = {
+    'id': lambda movie: movie['id'],
+    'title': lambda movie: movie.get('title', ''),
+    'year': lambda movie: to_number(movie.get('year', None)),
+    'duration': lambda movie: to_number(movie.get('duration', None)),
+    'synopsis': lambda movie: movie.get('synopsis', ''),
+    'rating': lambda movie: to_number(movie.get('rating', 0)),
+    'genre': lambda movie: movie.get('genre', ''),
+    'director': lambda movie: movie.get('director', ''),
+    'poster': lambda movie: movie.get('poster_url', '')  # The presigned URL
+}
+
+# Every field to_api_movie can return
+API_FIELDS = tuple(_FIELD_VALUES)
+
+
+def poster_key(poster):
+    """
+    Extract the S3 key from a poster value
+
+    Args:
+        poster (str): A full S3 URL or a bare object key
+
+    Returns:
+        str: The S3 object key
+    """
+    # If it's not a full URL, assume it's just the key
+    return key_from_url(poster) or poster
+
+
+def read_fields(fields):
+    """
+    List the attributes to read for the requested fields
+
+    Args:
+        fields (tuple): Fields requested by the client
+
+    Returns:
+        tuple: The fields, plus posterVariants when posters are requested
+    """
+    if 'poster' in fields:
+        return fields + ('posterVariants',)
+    return fields
+
+
+def presign_posters(movies, presign_cache, bucket):
+    """
+    Add a presigned 'poster_url' to every movie that has a poster
+
+    All posters, and the resized variants of those that have them, are
+    signed in one batch through the container-wide PresignedUrlCache, so
+    repeated requests reuse the same URLs until a share
+    (PRESIGN_REUSE_FRACTION) of their lifetime has passed. Movies with
+    variants also get 'poster_srcset' and 'poster_thumbnail' (see
+    build_srcset).
+
+    Args:
+        movies (list): Movie records from DynamoDB
+        presign_cache (PresignedUrlCache): The container's URL cache
+        bucket (str): Bucket holding the posters
+
+    Returns:
+        list: The same movie objects, updated in place
+    """
+    with_posters = [movie for movie in movies if movie.get('poster')]
+    if not with_posters:
+        return movies
+
+    try:
+        keys = [poster_key(movie['poster']) for movie in with_posters]
+        variant_keys_to_sign = [
+            key
+            for movie in with_posters if movie.get('posterVariants')
+            for _, _, key in variant_keys(movie['posterVariants'])
+        ]
+        urls = presign_cache.sign_many(bucket, keys + variant_keys_to_sign)
+        for movie, key in zip(with_posters, keys):
+            movie['poster_url'] = urls[key]
+            if movie.get('posterVariants'):
+                movie['poster_srcset'], movie['poster_thumbnail'] = build_srcset(movie['posterVariants'], urls)
+    except Exception as e:
+        # If there's an error generating the URLs, keep the original poster URLs
+        # This ensures the request doesn't fail if S3 access issues occur
+        for movie in with_posters:
+            movie['poster_url'] = movie['poster']
+        print(f"Error generating presigned URL: {str(e)}")
+
+    return movies
+
+
+def to_api_movie(movie, fields):
+    """
+    Project a DynamoDB movie record onto the fields returned by the API
+
+    Args:
+        movie (dict): A movie record from DynamoDB, after presign_posters
+        fields (tuple): Fields to return, in response order (from API_FIELDS)
+
+    Returns:
+        dict: A "clean" movie object for the API response, with DynamoDB
+              Decimals already converted to int/float. When the poster is
+              returned, `posterThumbnail` (a small rendition, or the poster
+              itself) and `posterSrcset` (srcset strings by MIME type, empty
+              until the variants exist) come with it.
+    """
+    api_movie = {field: _FIELD_VALUES[field](movie) for field in fields}
+    if 'poster' in api_movie:
+        api_movie['posterThumbnail'] = movie.get('poster_thumbnail') or api_movie['poster']
+        api_movie['posterSrcset'] = movie.get('poster_srcset', {})
+    return api_movie
@@ -0,0 +1,199 @@
+"""
+Shared boto3 clients, created on first use
+
+Importing boto3 and building a client or resource loads botocore's service
+models; together that is most of a handler's cold start (see
+benchmarks/bench_cold_start.py). Handlers used to do all of it at import
+time, also on invocations that never reach the service: CORS preflights,
+requests rejected by validation, 304 responses, and functions that only need
+one of the clients they built.
+
+lazy_client, lazy_resource and lazy_table return placeholders that stand in
+for the module-level globals handlers already had:
+
+    table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+    s3_client = lazy_client('s3', AWS_REGION)
+
+The real object is built on the first attribute access, once per process
+(thread-safe, so the parallel scan and batch workers can share it), and
+every later call goes straight to it. Clients are memoized per service and
+region, so two placeholders for the same client share one.
+
+AWS_CLIENT_INIT=eager builds everything at import time instead. Use it with
+provisioned concurrency or SnapStart, where init runs before traffic arrives
+and a warmed client is worth more than a short init.
+
+Clients are thread-safe and keep their HTTP connections alive in a pool of
+AWS_MAX_POOL_CONNECTIONS; size it to the number of threads that call AWS at
+once, or requests wait for a free connection. A forked child (gunicorn
+--preload, multiprocessing) starts with no clients and builds its own, since
+pooled sockets must not be shared between processes.
+"""
+
+import os
+import threading
+import weakref
+
+# 'lazy' (build clients on first use) or 'eager' (build them at import)
+AWS_CLIENT_INIT = os.environ.get('AWS_CLIENT_INIT', 'lazy').lower()
+
+# HTTP connections kept per client (botocore's default is 10)
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '10'))
+
+# Seconds to wait for a connection and for a response
+AWS_CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '5'))
+AWS_READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '60'))
+
+# TCP keep-alive probes on pooled connections, so idle ones are not silently dropped
+AWS_TCP_KEEPALIVE = os.environ.get('AWS_TCP_KEEPALIVE', 'true').lower() == 'true'
+
+_clients = {}
+_lock = threading.RLock()
+_placeholders = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    global _lock
+    _lock = threading.RLock()
+    _clients.clear()
+    for placeholder in list(_placeholders):
+        placeholder._target = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def client_config():
+    """
+    Return the botocore Config shared by all clients
+
+    Returns:
+        botocore.config.Config: Pool size, timeouts and TCP keep-alive
+    """
+    from botocore.config import Config
+
+    options = {
+        'max_pool_connections': AWS_MAX_POOL_CONNECTIONS,
+        'connect_timeout': AWS_CONNECT_TIMEOUT,
+        'read_timeout': AWS_READ_TIMEOUT
+    }
+    # tcp_keepalive needs botocore 1.27 or later
+    if 'tcp_keepalive' in Config.OPTION_DEFAULTS:
+        options['tcp_keepalive'] = AWS_TCP_KEEPALIVE
+    return Config(**options)
+
+
+def _memoized(key, factory):
+    obj = _clients.get(key)
+    if obj is None:
+        with _lock:
+            obj = _clients.get(key)
+            if obj is None:
+                obj = _clients[key] = factory()
+    return obj
+
+
+def get_client(service, region_name=None):
+    """
+    Return the process-wide boto3 client for a service
+
+    Args:
+        service (str): Service name, e.g. 's3'
+        region_name (str): AWS region (default: the boto3 default)
+
+    Returns:
+        botocore client
+    """
+    def create():
+        import boto3
+        return boto3.client(service, region_name=region_name, config=client_config())
+
+    return _memoized(('client', service, region_name), create)
+
+
+def get_resource(service, region_name=None):
+    """
+    Return the process-wide boto3 resource for a service
+
+    Args:
+        service (str): Service name, e.g. 'dynamodb'
+        region_name (str): AWS region (default: the boto3 default)
+
+    Returns:
+        boto3 service resource
+    """
+    def create():
+        import boto3
+        return boto3.resource(service, region_name=region_name, config=client_config())
+
+    return _memoized(('resource', service, region_name), create)
+
+
+def get_table(table_name, region_name=None):
+    """
+    Return the process-wide DynamoDB Table resource for a table
+
+    Args:
+        table_name (str): Table name
+        region_name (str): AWS region (default: the boto3 default)
+
+    Returns:
+        boto3 DynamoDB Table resource
+    """
+    return _memoized(('table', table_name, region_name),
+                     lambda: get_resource('dynamodb', region_name).Table(table_name))
+
+
+class LazyAWSObject:
+    """
+    Placeholder that builds a boto3 object on first attribute access
+
+    Args:
+        factory (callable): Returns the real object
+        description (str): Shown in repr() until the object is built
+    """
+
+    def __init__(self, factory, description):
+        self._factory = factory
+        self._description = description
+        self._target = None
+        _placeholders.add(self)
+        if AWS_CLIENT_INIT == 'eager':
+            self._resolve()
+
+    def _resolve(self):
+        target = self._target
+        if target is None:
+            # get_* are memoized under a lock, so racing threads get the same object
+            target = self._target = self._factory()
+        return target
+
+    @property
+    def initialized(self):
+        """True once the real object has been built"""
+        return self._target is not None
+
+    def __getattr__(self, name):
+        # Only called for attributes the placeholder itself does not have
+        return getattr(self._resolve(), name)
+
+    def __repr__(self):
+        if self._target is None:
+            return f'<lazy {self._description}>'
+        return repr(self._target)
+
+
+def lazy_client(service, region_name=None):
+    """Return a placeholder for get_client(service, region_name)"""
+    return LazyAWSObject(lambda: get_client(service, region_name), f'{service} client')
+
+
+def lazy_resource(service, region_name=None):
+    """Return a placeholder for get_resource(service, region_name)"""
+    return LazyAWSObject(lambda: get_resource(service, region_name), f'{service} resource')
+
+
+def lazy_table(table_name, region_name=None):
+    """Return a placeholder for get_table(table_name, region_name)"""
+    return LazyAWSObject(lambda: get_table(table_name, region_name), f'DynamoDB table {table_name}')
@@ -0,0 +1,155 @@
+"""
+BatchGetItem reads for fetching many items by key in one round trip
+
+A GetItem per ID costs one request (and one Lambda invocation, when the
+client calls get_movie_by_id in a loop) per movie. BatchGetItem reads up to
+BATCH_GET_LIMIT keys per request; batch_get_items splits larger key lists
+into chunks, sends the chunks concurrently and retries the keys DynamoDB
+returns as UnprocessedKeys (under throttling or the 16MB response limit)
+with exponential backoff and jitter.
+
+Like parallel_scan, workers call the low-level client behind the Table
+resource (table.meta.client), which is thread safe and still returns plain
+Python types.
+"""
+
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# DynamoDB accepts at most 100 keys per BatchGetItem request
+BATCH_GET_LIMIT = 100
+
+# Chunks read concurrently
+BATCH_GET_WORKERS = int(os.environ.get('BATCH_GET_WORKERS', '4'))
+
+# Requests per chunk, including retries of UnprocessedKeys
+BATCH_GET_MAX_ATTEMPTS = int(os.environ.get('BATCH_GET_MAX_ATTEMPTS', '8'))
+
+# Backoff before retry n is a random delay up to min(cap, base * 2**n)
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_CAP_SECONDS = 2.0
+
+
+class UnprocessedKeysError(Exception):
+    """Raised when keys are still unprocessed after the last retry"""
+
+    def __init__(self, keys, attempts):
+        super().__init__(f'{len(keys)} keys still unprocessed after {attempts} attempts')
+        self.keys = keys
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_CAP_SECONDS):
+    """
+    Return the delay before a retry ("full jitter" exponential backoff)
+
+    Args:
+        attempt (int): Number of requests already sent for the chunk (1 or more)
+        base (float): Delay scale in seconds
+        cap (float): Upper bound in seconds
+
+    Returns:
+        float: Seconds to wait
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def chunked_keys(keys, size=BATCH_GET_LIMIT):
+    """
+    Split keys into BatchGetItem-sized chunks
+
+    Args:
+        keys (list): Key dicts, e.g. [{'id': '...'}]
+        size (int): Keys per chunk
+
+    Returns:
+        list: Lists of at most `size` keys
+    """
+    return [keys[start:start + size] for start in range(0, len(keys), size)]
+
+
+def get_chunk(table, keys, projection=None, max_attempts=None, sleep=time.sleep):
+    """
+    Read one chunk of keys, retrying UnprocessedKeys until all are read
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        keys (list): At most BATCH_GET_LIMIT key dicts
+        projection (dict): Parameters from build_projection, if any
+        max_attempts (int): Requests before giving up (default: BATCH_GET_MAX_ATTEMPTS)
+        sleep (callable): Used to wait between retries (tests pass a fake)
+
+    Returns:
+        list: The items found; keys without an item are simply absent
+
+    Raises:
+        UnprocessedKeysError: If keys remain unprocessed after max_attempts
+    """
+    client = table.meta.client
+    max_attempts = max_attempts or BATCH_GET_MAX_ATTEMPTS
+    request = dict(projection or {}, Keys=keys)
+    items = []
+
+    for attempt in range(1, max_attempts + 1):
+        response = client.batch_get_item(RequestItems={table.name: request})
+        items.extend(response.get('Responses', {}).get(table.name, []))
+
+        unprocessed = response.get('UnprocessedKeys', {}).get(table.name)
+        if not unprocessed or not unprocessed.get('Keys'):
+            return items
+        # Retry only what is left, with the same projection
+        request = unprocessed
+        if attempt < max_attempts:
+            sleep(backoff_delay(attempt))
+
+    raise UnprocessedKeysError(request['Keys'], max_attempts)
+
+
+def batch_get_items(table, keys, projection=None, max_workers=None, max_attempts=None, sleep=time.sleep):
+    """
+    Read many items by primary key with concurrent BatchGetItem requests
+
+    Duplicate keys are read once. Items come back in no particular order; map
+    them by key to restore the order the caller needs.
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        keys (list): Key dicts, e.g. [{'id': '...'}]
+        projection (dict): Parameters from build_projection, if any (the key
+                           attributes must be part of it to map the results)
+        max_workers (int): Chunks read concurrently (default: BATCH_GET_WORKERS)
+        max_attempts (int): Requests per chunk (default: BATCH_GET_MAX_ATTEMPTS)
+        sleep (callable): Used to wait between retries (tests pass a fake)
+
+    Returns:
+        list: The items found
+
+    Raises:
+        UnprocessedKeysError: If a chunk could not be read completely
+    """
+    unique_keys = []
+    seen = set()
+    for key in keys:
+        marker = tuple(sorted(key.items()))
+        if marker not in seen:
+            seen.add(marker)
+            unique_keys.append(key)
+
+    chunks = chunked_keys(unique_keys)
+    if not chunks:
+        return []
+    if len(chunks) == 1:
+        # Nothing to parallelize - read inline without starting threads
+        return get_chunk(table, chunks[0], projection, max_attempts, sleep)
+
+    workers = max(1, min(max_workers or BATCH_GET_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dynamodb-batch-get') as executor:
+        futures = [
+            executor.submit(get_chunk, table, chunk, projection, max_attempts, sleep)
+            for chunk in chunks
+        ]
+        items = []
+        for future in futures:
+            items.extend(future.result())
+    return items
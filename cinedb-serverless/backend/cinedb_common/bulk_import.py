@@ -0,0 +1,510 @@
+"""
+Bulk movie import with concurrent BatchWriteItem requests
+
+Loading a catalog one put_item per movie spends almost all of its time
+waiting for round trips. BulkImporter reads CSV or NDJSON rows, validates
+them with the add_movie field rules (cinedb_common.movie_record), and writes
+them in BATCH_WRITE_LIMIT-item BatchWriteItem requests sent from a worker
+pool:
+
+- Items DynamoDB returns as UnprocessedItems (and throttling errors) are
+  re-sent after a delay shared by all workers (AdaptiveBackoff): it doubles
+  when requests are throttled and shrinks by 10% after each request that
+  goes through, so the pool settles at the table's write capacity.
+- Progress is checkpointed as the last row up to which every row has been
+  written or rejected. A rerun with the same checkpoint skips those rows;
+  IDs for rows without one are derived from the source name and row number,
+  so rows written after the checkpoint are overwritten, not duplicated.
+- Items per second are reported while the import runs and at the end.
+
+Used by scripts/bulk_import.py (local files) and the bulk_import Lambda
+(files in S3).
+"""
+
+import codecs
+import csv
+import gzip
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from .movie_record import MovieValidationError, build_movie_item
+
+# DynamoDB accepts at most 25 put/delete requests per BatchWriteItem
+BATCH_WRITE_LIMIT = 25
+
+# Worker threads sending BatchWriteItem requests
+BULK_IMPORT_WORKERS = int(os.environ.get('BULK_IMPORT_WORKERS', '8'))
+
+# Seconds between checkpoint writes (and progress reports)
+CHECKPOINT_INTERVAL = float(os.environ.get('BULK_IMPORT_CHECKPOINT_INTERVAL', '5'))
+
+# Requests per batch, including re-sends of UnprocessedItems
+MAX_WRITE_ATTEMPTS = int(os.environ.get('BULK_IMPORT_MAX_ATTEMPTS', '10'))
+
+# Rejected rows kept in the report (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Error codes that mean "slow down" rather than "this request is wrong"
+THROTTLING_ERROR_CODES = (
+    'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'
+)
+
+# Fixed namespace for the IDs of rows without one
+_ROW_ID_NAMESPACE = uuid.UUID('4f1c2a34-9d4e-5b6f-8a7b-0c1d2e3f4a5b')
+
+_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class ImportFormatError(ValueError):
+    """Raised for a file whose format cannot be determined or read"""
+
+
+class UnprocessedItemsError(Exception):
+    """Raised when a batch is still not fully written after MAX_WRITE_ATTEMPTS requests"""
+
+
+def detect_format(name):
+    """
+    Determine the import format from a file name
+
+    Args:
+        name (str): File name or S3 key; '.gz' is ignored
+
+    Returns:
+        str: 'csv' or 'ndjson'
+
+    Raises:
+        ImportFormatError: For other extensions
+    """
+    base = name[:-3] if name.endswith('.gz') else name
+    extension = os.path.splitext(base)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    raise ImportFormatError(f'Cannot tell the format of {name}; use .csv, .ndjson or .jsonl (optionally .gz)')
+
+
+def open_text(stream, name):
+    """
+    Wrap a binary stream as UTF-8 text, decompressing '.gz' files
+
+    Args:
+        stream: A binary file object (a local file or an S3 StreamingBody)
+        name (str): File name or S3 key
+
+    Returns:
+        A text stream that is read incrementally
+    """
+    if name.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=stream)
+    # utf-8-sig drops the byte order mark spreadsheet exports start with
+    return codecs.getreader('utf-8-sig')(stream)
+
+
+def iter_rows(text, file_format):
+    """
+    Read the rows of an import file
+
+    Args:
+        text: Text stream from open_text
+        file_format (str): 'csv' (with a header row) or 'ndjson'
+
+    Yields:
+        tuple: (row number, fields dict or None, error message or None);
+               rows are numbered from 1, blank NDJSON lines are skipped
+    """
+    if file_format == 'csv':
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            yield row_number, row, None
+        return
+
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, 'Each line must be a JSON object'
+            continue
+        yield row_number, row, None
+
+
+def row_movie_id(row, source, row_number):
+    """
+    Return the ID for a row: its own `id`, or one derived from its position
+
+    Args:
+        row (dict): The row's fields
+        source (str): Name of the import file (stable across reruns)
+        row_number (int): The row's number in the file
+
+    Returns:
+        str: The movie ID
+
+    Raises:
+        MovieValidationError: If the row has an invalid `id`
+    """
+    movie_id = row.get('id')
+    if movie_id is None or (isinstance(movie_id, str) and not movie_id.strip()):
+        return str(uuid.uuid5(_ROW_ID_NAMESPACE, f'{source}:{row_number}'))
+    movie_id = str(movie_id).strip()
+    if not _ID_PATTERN.match(movie_id):
+        raise MovieValidationError("Field 'id' must be 1-64 letters, digits, '-' or '_'")
+    return movie_id
+
+
+class AdaptiveBackoff:
+    """
+    Delay shared by all workers before each BatchWriteItem request
+
+    Multiplicative increase on throttling, multiplicative decrease on
+    success: when the table is at capacity every worker slows down together,
+    instead of each retrying on its own schedule. Throttled responses that
+    arrive together (one per worker) count as one signal, so the delay
+    doubles at most once per delay period.
+    """
+
+    def __init__(self, base=0.05, cap=5.0, clock=time.monotonic):
+        self.base = base
+        self.cap = cap
+        self.clock = clock
+        self.delay = 0.0
+        self.throttle_count = 0
+        self._raised_at = None
+        self._lock = threading.Lock()
+
+    def throttled(self):
+        with self._lock:
+            self.throttle_count += 1
+            now = self.clock()
+            if self._raised_at is not None and now - self._raised_at < self.delay:
+                return
+            self._raised_at = now
+            self.delay = min(self.cap, max(self.base, self.delay * 2))
+
+    def succeeded(self):
+        with self._lock:
+            self.delay = self.delay * 0.9 if self.delay > self.base else 0.0
+
+    def wait(self, sleep=time.sleep):
+        delay = self.delay
+        if delay:
+            # Jitter spreads the workers' retries apart
+            sleep(random.uniform(delay / 2, delay))
+
+
+def write_batch(table, items, backoff, max_attempts=None, sleep=time.sleep):
+    """
+    Put up to BATCH_WRITE_LIMIT items, re-sending UnprocessedItems
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        items (list): Items with distinct keys
+        backoff (AdaptiveBackoff): Shared delay
+        max_attempts (int): Requests before giving up (default: MAX_WRITE_ATTEMPTS)
+        sleep (callable): Used to wait between requests (tests pass a fake)
+
+    Raises:
+        UnprocessedItemsError: If items remain unwritten after max_attempts
+        ClientError: For errors other than throttling
+    """
+    from botocore.exceptions import ClientError
+
+    # The low-level client is thread safe; the Table resource is not
+    client = table.meta.client
+    max_attempts = max_attempts or MAX_WRITE_ATTEMPTS
+    requests = [{'PutRequest': {'Item': item}} for item in items]
+
+    for _ in range(max_attempts):
+        backoff.wait(sleep)
+        try:
+            response = client.batch_write_item(RequestItems={table.name: requests})
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in THROTTLING_ERROR_CODES:
+                raise
+            backoff.throttled()
+            continue
+
+        unprocessed = response.get('UnprocessedItems', {}).get(table.name)
+        if not unprocessed:
+            backoff.succeeded()
+            return
+        backoff.throttled()
+        requests = unprocessed
+
+    raise UnprocessedItemsError(f'{len(requests)} items still unprocessed after {max_attempts} attempts')
+
+
+class FileCheckpointStore:
+    """Keeps the import checkpoint in a local JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, checkpoint):
+        # Write-then-rename, so a crash never leaves a truncated checkpoint
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class S3CheckpointStore:
+    """Keeps the import checkpoint in an S3 object"""
+
+    def __init__(self, s3_client, bucket, key):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+
+    def load(self):
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self.key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return json.loads(response['Body'].read())
+
+    def save(self, checkpoint):
+        self.s3_client.put_object(
+            Bucket=self.bucket, Key=self.key,
+            Body=json.dumps(checkpoint).encode('utf-8'), ContentType='application/json'
+        )
+
+    def clear(self):
+        self.s3_client.delete_object(Bucket=self.bucket, Key=self.key)
+
+
+class _Batch:
+    __slots__ = ('seq', 'last_row', 'items')
+
+    def __init__(self, seq, last_row, items):
+        self.seq = seq
+        self.last_row = last_row
+        self.items = items
+
+
+class BulkImporter:
+    """
+    Validate rows and write them to DynamoDB with a pool of BatchWriteItem workers
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        source (str): Name of the import file; part of the derived IDs and
+                      of the checkpoint, so keep it stable across reruns
+        workers (int): Concurrent BatchWriteItem requests (default: BULK_IMPORT_WORKERS)
+        checkpoint_store: FileCheckpointStore, S3CheckpointStore or None
+        dry_run (bool): Validate only, write nothing
+        progress (callable): Called with a stats dict every CHECKPOINT_INTERVAL seconds
+        clock (callable): Time source (tests pass a fake)
+        sleep (callable): Used for backoff delays (tests pass a fake)
+    """
+
+    def __init__(self, table, source, workers=None, checkpoint_store=None, dry_run=False,
+                 progress=None, clock=time.monotonic, sleep=time.sleep):
+        self.table = table
+        self.source = source
+        self.workers = max(1, workers or BULK_IMPORT_WORKERS)
+        self.checkpoint_store = checkpoint_store
+        self.dry_run = dry_run
+        self.progress = progress
+        self.clock = clock
+        self.sleep = sleep
+        self.backoff = AdaptiveBackoff()
+
+        self.rows_read = 0
+        self.written = 0
+        self.rejected = 0
+        self.errors = []
+        # Last row up to which every row is written or rejected
+        self.rows_done = 0
+        self._started = None
+        self._last_report = None
+
+    def _reject(self, row_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def _checkpoint(self, complete=False):
+        if not self.checkpoint_store or self.dry_run:
+            return
+        self.checkpoint_store.save({
+            'source': self.source,
+            'rowsDone': self.rows_done,
+            'complete': complete,
+            'updatedAt': datetime.now().isoformat()
+        })
+
+    def stats(self):
+        """Return counters and throughput so far"""
+        elapsed = max(self.clock() - self._started, 1e-9) if self._started is not None else 0.0
+        return {
+            'rowsRead': self.rows_read,
+            'written': self.written,
+            'rejected': self.rejected,
+            'rowsDone': self.rows_done,
+            'seconds': round(elapsed, 3),
+            'itemsPerSecond': round(self.written / elapsed, 1) if elapsed else 0.0,
+            'throttled': self.backoff.throttle_count
+        }
+
+    def _maybe_report(self):
+        now = self.clock()
+        if now - self._last_report < CHECKPOINT_INTERVAL:
+            return
+        self._last_report = now
+        self._checkpoint()
+        if self.progress:
+            self.progress(self.stats())
+
+    def run(self, rows, should_stop=None):
+        """
+        Import rows until they run out or should_stop() returns True
+
+        Args:
+            rows (iterable): (row number, fields, error) tuples from iter_rows
+            should_stop (callable): Checked before each row (e.g. when the
+                                    Lambda is running out of time)
+
+        Returns:
+            dict: stats() plus `complete`, `resumedFrom` and the first
+                  MAX_REPORTED_ERRORS rejected rows
+
+        Raises:
+            UnprocessedItemsError, ClientError: If a batch cannot be written;
+                the checkpoint still records every row finished before it
+        """
+        checkpoint = self.checkpoint_store.load() if self.checkpoint_store else None
+        resumed_from = 0
+        if checkpoint and checkpoint.get('source') == self.source and not checkpoint.get('complete'):
+            resumed_from = self.rows_done = checkpoint['rowsDone']
+
+        self._started = self._last_report = self.clock()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dynamodb-batch-write')
+        in_flight = {}
+        finished = {}
+        next_seq = 0
+        commit_seq = 0
+        pending = []
+        pending_ids = set()
+        last_row = resumed_from
+        stopped = False
+
+        def commit(batch):
+            # Advance rows_done over the batches finished so far, in row order
+            nonlocal commit_seq
+            finished[batch.seq] = batch
+            while commit_seq in finished:
+                done = finished.pop(commit_seq)
+                self.written += len(done.items)
+                self.rows_done = done.last_row
+                commit_seq += 1
+
+        def collect(timeout=None):
+            done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                future.result()
+                commit(batch)
+
+        def flush():
+            # The batch covers every row up to last_row, rejected ones included
+            nonlocal next_seq
+            batch = _Batch(next_seq, last_row, list(pending))
+            next_seq += 1
+            pending.clear()
+            pending_ids.clear()
+            if not batch.items or self.dry_run:
+                commit(batch)
+                return
+            # Bound the number of batches held in memory
+            while len(in_flight) >= self.workers * 2:
+                collect()
+            future = executor.submit(write_batch, self.table, batch.items, self.backoff, None, self.sleep)
+            in_flight[future] = batch
+
+        try:
+            for row_number, row, error in rows:
+                if row_number <= resumed_from:
+                    continue
+                if should_stop and should_stop():
+                    stopped = True
+                    break
+                self.rows_read += 1
+                try:
+                    if error:
+                        raise MovieValidationError(error)
+                    item = build_movie_item(row, row_movie_id(row, self.source, row_number),
+                                            created_at=row.get('createdAt') or None)
+                    if row.get('poster'):
+                        # An S3 key of a poster uploaded beforehand
+                        item['poster'] = str(row['poster'])
+                except MovieValidationError as e:
+                    self._reject(row_number, str(e))
+                    last_row = row_number
+                    continue
+
+                if item['id'] in pending_ids:
+                    # A BatchWriteItem request cannot put the same key twice
+                    flush()
+                pending.append(item)
+                pending_ids.add(item['id'])
+                last_row = row_number
+                if len(pending) == BATCH_WRITE_LIMIT:
+                    flush()
+                    if in_flight:
+                        collect(timeout=0)
+                    self._maybe_report()
+
+            flush()
+            while in_flight:
+                collect()
+        except BaseException:
+            # Keep what was written: wait for the other batches, then save
+            # the checkpoint before passing the error on
+            for future in list(in_flight):
+                batch = in_flight.pop(future)
+                if future.exception() is None:
+                    commit(batch)
+            self._checkpoint()
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+        complete = not stopped
+        self._checkpoint(complete=complete)
+        report = self.stats()
+        report.update({'complete': complete, 'resumedFrom': resumed_from, 'errors': self.errors})
+        return report
@@ -0,0 +1,489 @@
+"""
+Streaming catalog export to S3 as NDJSON, CSV or Parquet
+
+get_all_movies builds its whole response in memory and is capped at 6MB by
+Lambda anyway, so it cannot hand out the catalog. export_catalog reads the
+table with a segmented Scan and gives each segment its own worker, which
+encodes its pages as they arrive and streams them to S3:
+
+    scan page -> rows -> encode (gzip or Parquet row groups) -> multipart upload
+
+A worker holds one Scan page, the unsent part of its upload
+(EXPORT_PART_SIZE) and, for Parquet, one row group, so memory does not grow
+with the table. Each worker rolls over to a new file once the current one
+reaches EXPORT_FILE_SIZE bytes:
+
+    exports/<export id>/part-<segment>-<file>.<ext>
+    exports/<export id>/manifest.json
+
+The manifest, written once every file is complete, lists the files with
+their row counts and sizes. Parquet needs pyarrow, which is not part of the
+Lambda runtime; it is imported lazily so NDJSON and CSV exports work
+without it.
+"""
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from .json_stream import encode_value, to_number
+from .parallel_scan import resolve_segment_count, scan_segment
+from .projection import build_projection
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'parquet')
+
+# Exported attributes, in column order; the columns bulk_import reads back
+EXPORT_FIELDS = (
+    'id', 'title', 'year', 'duration', 'rating', 'genre', 'director', 'cast', 'synopsis', 'poster', 'createdAt'
+)
+
+EXPORT_PREFIX = os.environ.get('EXPORT_PREFIX', 'exports/')
+
+# Bytes buffered per multipart upload part (S3 requires at least 5MB)
+EXPORT_PART_SIZE = max(5, int(os.environ.get('EXPORT_PART_SIZE_MB', '8'))) * 1024 * 1024
+
+# A worker starts a new file once its current one is this large
+EXPORT_FILE_SIZE = int(os.environ.get('EXPORT_FILE_SIZE_MB', '256')) * 1024 * 1024
+
+# Rows per Parquet row group (also the rows a Parquet worker holds in memory)
+EXPORT_ROW_GROUP_ROWS = int(os.environ.get('EXPORT_ROW_GROUP_ROWS', '20000'))
+
+# Lifetime of the presigned manifest link, in seconds
+EXPORT_URL_EXPIRY = int(os.environ.get('EXPORT_URL_EXPIRY', '3600'))
+
+# Seconds between progress reports
+EXPORT_PROGRESS_INTERVAL = 5
+
+# gzip level 1 compresses movie text ~4x at a fraction of the CPU of level 6
+GZIP_LEVEL = 1
+
+MANIFEST_NAME = 'manifest.json'
+
+_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+class ExportError(ValueError):
+    """Raised for an unsupported export format or compression"""
+
+
+def export_row(item, fields=EXPORT_FIELDS):
+    """
+    Convert a DynamoDB item to a plain row
+
+    Args:
+        item (dict): A movie item
+        fields (tuple): Exported attributes
+
+    Returns:
+        dict: The fields present on the item, numbers converted from Decimal
+    """
+    return {field: to_number(item[field]) for field in fields if field in item}
+
+
+def flat_value(value):
+    """Render a value for a CSV or Parquet text column (lists are comma-joined)"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple, set)):
+        return ', '.join(str(element) for element in value)
+    return value
+
+
+class MultipartUpload:
+    """
+    Write-only file object that streams to one S3 object
+
+    Data is sent in EXPORT_PART_SIZE multipart upload parts as soon as a part
+    is full; objects smaller than one part are written with a single
+    PutObject on close. Call abort() if the export fails, so no unfinished
+    upload keeps its parts (and their storage cost) around.
+    """
+
+    def __init__(self, s3_client, bucket, key, content_type, part_size=EXPORT_PART_SIZE):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.bytes_written = 0
+        self.closed = False
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.bytes_written
+
+    def flush(self):
+        pass
+
+    def write(self, data):
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(part)
+        return len(data)
+
+    def _upload_part(self, data):
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )
+            self._upload_id = response['UploadId']
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=data
+        )
+        self._parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._upload_id is None:
+            self.s3_client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), ContentType=self.content_type
+            )
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+        self._buffer = bytearray()
+
+    def abort(self):
+        self.closed = True
+        self._buffer = bytearray()
+        if self._upload_id is not None:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+
+class _TextFileWriter:
+    """NDJSON or CSV rows, optionally gzipped, into a MultipartUpload"""
+
+    def __init__(self, upload, file_format, fields, compression):
+        self.upload = upload
+        self.file_format = file_format
+        self.fields = fields
+        # wbits=31 writes a gzip header and trailer, so the file is a .gz
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compression == 'gzip' else None
+        if file_format == 'csv':
+            # Header row
+            self._write_text(self._csv_text([fields]))
+
+    def _csv_text(self, lines):
+        text = io.StringIO()
+        csv.writer(text, lineterminator='\n').writerows(lines)
+        return text.getvalue()
+
+    def _write_text(self, text):
+        data = text.encode('utf-8')
+        if self._compressor:
+            data = self._compressor.compress(data)
+        if data:
+            self.upload.write(data)
+
+    def write_rows(self, rows):
+        if self.file_format == 'csv':
+            self._write_text(self._csv_text([flat_value(row.get(field)) for field in self.fields] for row in rows))
+        else:
+            self._write_text(''.join(encode_value(row) + '\n' for row in rows))
+
+    @property
+    def bytes_written(self):
+        return self.upload.bytes_written
+
+    def close(self):
+        if self._compressor:
+            self.upload.write(self._compressor.flush())
+        self.upload.close()
+
+
+def load_pyarrow():
+    """
+    Import pyarrow for Parquet exports
+
+    Returns:
+        tuple: (pyarrow, pyarrow.parquet)
+
+    Raises:
+        ExportError: If pyarrow is not installed
+    """
+    # pyarrow's default allocator (mimalloc) keeps memory in per-thread
+    # arenas: with 8 workers, a Parquet export of 100,000 movies peaked at
+    # ~190MB instead of ~105MB with malloc. The pool is chosen when pyarrow
+    # is first imported, so this only helps if nothing imported it before.
+    os.environ.setdefault('ARROW_DEFAULT_MEMORY_POOL', 'system')
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError('Parquet export needs pyarrow (pip install pyarrow, or a pyarrow layer in Lambda)')
+    return pyarrow, pyarrow.parquet
+
+
+_PARQUET_TYPES = {'year': 'int32', 'duration': 'int32', 'rating': 'float64'}
+
+
+class _ParquetFileWriter:
+    """Parquet row groups of EXPORT_ROW_GROUP_ROWS rows into a MultipartUpload"""
+
+    def __init__(self, upload, fields, compression):
+        pa, pq = load_pyarrow()
+        self._pa = pa
+        self.upload = upload
+        self.fields = fields
+        self.schema = pa.schema([(field, getattr(pa, _PARQUET_TYPES.get(field, 'string'))()) for field in fields])
+        self._writer = pq.ParquetWriter(
+            pa.PythonFile(upload, mode='w'), self.schema, compression=compression or 'none'
+        )
+        # Pages are converted to Arrow right away: columnar buffers take a
+        # fraction of the memory of the row dicts
+        self._batches = []
+        self._buffered_rows = 0
+
+    def write_rows(self, rows):
+        columns = []
+        for column in self.schema:
+            if column.name in _PARQUET_TYPES:
+                values = [row.get(column.name) for row in rows]
+            else:
+                values = [None if row.get(column.name) is None else str(flat_value(row[column.name])) for row in rows]
+            columns.append(self._pa.array(values, type=column.type))
+        self._batches.append(self._pa.RecordBatch.from_arrays(columns, schema=self.schema))
+        self._buffered_rows += len(rows)
+        if self._buffered_rows >= EXPORT_ROW_GROUP_ROWS:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if not self._batches:
+            return
+        self._writer.write_table(self._pa.Table.from_batches(self._batches, schema=self.schema))
+        self._batches = []
+        self._buffered_rows = 0
+
+    @property
+    def bytes_written(self):
+        return self.upload.bytes_written
+
+    def close(self):
+        self._write_row_group()
+        self._writer.close()
+        self.upload.close()
+
+
+def file_extension(file_format, compression):
+    """Return the file extension for a format ('.ndjson.gz', '.csv', '.parquet', ...)"""
+    if file_format == 'parquet':
+        return '.parquet'
+    return f'.{file_format}' + ('.gz' if compression == 'gzip' else '')
+
+
+def resolve_compression(file_format, compression=None):
+    """
+    Check a format and compression pair, filling in the default compression
+
+    Args:
+        file_format (str): One of EXPORT_FORMATS
+        compression (str): 'gzip' or 'none' for NDJSON and CSV; a Parquet
+                           codec ('snappy', 'zstd', 'gzip', 'none') for Parquet
+
+    Returns:
+        str: The compression to use ('gzip' for text formats, 'zstd' for
+             Parquet by default)
+
+    Raises:
+        ExportError: For an unknown format or compression
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format: {file_format}. Available formats: {', '.join(EXPORT_FORMATS)}")
+    if file_format == 'parquet':
+        compression = compression or 'zstd'
+        allowed = ('snappy', 'zstd', 'gzip', 'none')
+    else:
+        compression = compression or 'gzip'
+        allowed = ('gzip', 'none')
+    if compression not in allowed:
+        raise ExportError(f"Compression for {file_format} must be one of: {', '.join(allowed)}")
+    return compression
+
+
+class _Progress:
+    """Row and byte counters shared by the export workers"""
+
+    def __init__(self):
+        self.rows = 0
+        self.files = 0
+        self._lock = threading.Lock()
+
+    def add(self, rows=0, files=0):
+        with self._lock:
+            self.rows += rows
+            self.files += files
+
+
+def _export_segment(table, s3_client, bucket, prefix, segment, total_segments, file_format,
+                    compression, fields, progress, stop):
+    files = []
+    writer = None
+    rows_in_file = 0
+    extension = file_extension(file_format, compression)
+
+    def open_writer():
+        key = f'{prefix}part-{segment:03d}-{len(files):03d}{extension}'
+        upload = MultipartUpload(s3_client, bucket, key, _CONTENT_TYPES[file_format])
+        if file_format == 'parquet':
+            return _ParquetFileWriter(upload, fields, compression)
+        return _TextFileWriter(upload, file_format, fields, compression)
+
+    def close_writer():
+        writer.close()
+        files.append({'key': writer.upload.key, 'rows': rows_in_file, 'bytes': writer.bytes_written})
+        progress.add(files=1)
+
+    try:
+        for items in scan_segment(table, segment, total_segments, **build_projection(fields)):
+            if stop.is_set():
+                # Another segment failed; the export has no manifest and is dropped
+                if writer is not None:
+                    writer.upload.abort()
+                return files
+            if not items:
+                continue
+            if writer is None:
+                writer = open_writer()
+                rows_in_file = 0
+            writer.write_rows([export_row(item, fields) for item in items])
+            rows_in_file += len(items)
+            progress.add(rows=len(items))
+            if writer.bytes_written >= EXPORT_FILE_SIZE:
+                close_writer()
+                writer = None
+        if writer is not None:
+            close_writer()
+            writer = None
+    except BaseException:
+        if writer is not None:
+            writer.upload.abort()
+        raise
+    return files
+
+
+def new_export_id():
+    """Return a sortable, unique export ID (UTC timestamp plus a random suffix)"""
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ') + '-' + uuid.uuid4().hex[:8]
+
+
+def export_catalog(table, s3_client, bucket, file_format='ndjson', compression=None, fields=EXPORT_FIELDS,
+                   total_segments=None, export_id=None, progress=None, clock=time.monotonic):
+    """
+    Export every movie to S3, one worker per Scan segment
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        s3_client: boto3 S3 client
+        bucket (str): Destination bucket
+        file_format (str): 'ndjson', 'csv' or 'parquet'
+        compression (str): See resolve_compression (default: gzip, or zstd
+                           for Parquet)
+        fields (tuple): Exported attributes, in column order
+        total_segments (int): Scan segments and workers (default: SCAN_SEGMENTS)
+        export_id (str): Name of the export folder (default: new_export_id())
+        progress (callable): Called with a stats dict every
+                             EXPORT_PROGRESS_INTERVAL seconds
+        clock (callable): Time source (tests pass a fake)
+
+    Returns:
+        dict: The manifest (also written to S3), plus `manifestKey` and a
+              presigned `manifestUrl`
+
+    Raises:
+        ExportError: For an unsupported format or compression
+        Exception: Any error of a worker; the other workers stop and their
+                   unfinished uploads are aborted
+    """
+    compression = resolve_compression(file_format, compression)
+    if file_format == 'parquet':
+        # Fail before scanning anything
+        load_pyarrow()
+    total_segments = resolve_segment_count(total_segments)
+    export_id = export_id or new_export_id()
+    prefix = f'{EXPORT_PREFIX}{export_id}/'
+
+    counters = _Progress()
+    stop = threading.Event()
+    started = clock()
+
+    def stats():
+        elapsed = max(clock() - started, 1e-9)
+        return {
+            'rows': counters.rows,
+            'files': counters.files,
+            'seconds': round(elapsed, 3),
+            'rowsPerSecond': round(counters.rows / elapsed, 1)
+        }
+
+    with ThreadPoolExecutor(max_workers=total_segments, thread_name_prefix='catalog-export') as executor:
+        futures = [
+            executor.submit(
+                _export_segment, table, s3_client, bucket, prefix, segment, total_segments,
+                file_format, compression, fields, counters, stop
+            )
+            for segment in range(total_segments)
+        ]
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=EXPORT_PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+            failed = [future for future in done if future.exception() is not None]
+            if failed:
+                stop.set()
+                raise failed[0].exception()
+            if pending and progress:
+                progress(stats())
+
+    files = [entry for future in futures for entry in future.result()]
+    files.sort(key=lambda entry: entry['key'])
+    summary = stats()
+    manifest = {
+        'exportId': export_id,
+        'table': table.name,
+        'format': file_format,
+        'compression': compression,
+        'fields': list(fields),
+        'createdAt': datetime.now(timezone.utc).isoformat(),
+        'rows': summary['rows'],
+        'bytes': sum(entry['bytes'] for entry in files),
+        'seconds': summary['seconds'],
+        'rowsPerSecond': summary['rowsPerSecond'],
+        'files': files
+    }
+
+    manifest_key = f'{prefix}{MANIFEST_NAME}'
+    s3_client.put_object(
+        Bucket=bucket, Key=manifest_key,
+        Body=json.dumps(manifest, indent=2).encode('utf-8'), ContentType='application/json'
+    )
+    manifest['manifestKey'] = manifest_key
+    manifest['manifestUrl'] = s3_client.generate_presigned_url(
+        'get_object', Params={'Bucket': bucket, 'Key': manifest_key}, ExpiresIn=EXPORT_URL_EXPIRY
+    )
+    return manifest
@@ -0,0 +1,109 @@
+"""
+Catalog version counter for conditional GETs
+
+Listing the catalog means a Scan and a presigned URL per poster, and polling
+clients repeat it even when nothing changed. Every write to the movie table
+bumps one counter item:
+
+    table CATALOG_VERSION_TABLE    {"id": "catalog", "version": 42}
+
+so a read endpoint can tell whether its last response is still current with
+a single small get_item, and answer If-None-Match with 304 before scanning
+or presigning anything.
+
+The counter lives in its own table because every item in the movie table is
+a movie to the Scans that read it. Writers bump it after their write has
+succeeded; a reader that sees the old version may already send the new data,
+which only costs one extra full response later. A failed bump is logged and
+does not fail the write, so the ETags of read endpoints also include the
+presign window (see versioning.version_etag) and change at least that often.
+
+The counter is off unless CATALOG_VERSION_TABLE names the table, since only
+some deployments create it. If the table does not exist, the first call logs
+it and the counter stays off for the rest of the process.
+"""
+
+import os
+
+# Table holding the counter, e.g. 'cinedb-meta' (empty disables conditional
+# GETs and bumps)
+CATALOG_VERSION_TABLE = os.environ.get('CATALOG_VERSION_TABLE', '')
+
+# Key of the counter item
+CATALOG_VERSION_ID = 'catalog'
+
+
+class CatalogVersion:
+    """
+    Read and bump the catalog version counter
+
+    Args:
+        dynamodb: boto3 DynamoDB resource
+        table_name (str): Counter table (default: CATALOG_VERSION_TABLE)
+    """
+
+    def __init__(self, dynamodb, table_name=CATALOG_VERSION_TABLE):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self._table = None
+        self._missing = False
+
+    @property
+    def table(self):
+        """The counter table, or None when disabled (created on first use)"""
+        if self._missing:
+            return None
+        if self._table is None and self.table_name:
+            self._table = self.dynamodb.Table(self.table_name)
+        return self._table
+
+    def _log_error(self, action, error):
+        """Log a failed call, and turn the counter off if its table is missing"""
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        if code != 'ResourceNotFoundException':
+            print(f"Error {action} catalog version: {str(error)}")
+        elif not self._missing:
+            self._missing = True
+            print(f"Catalog version table {self.table_name} not found, catalog version disabled: {str(error)}")
+
+    def current(self):
+        """
+        Read the catalog version
+
+        A strongly consistent read, so a client never gets a 304 for data
+        written before it asked.
+
+        Returns:
+            int: The version (0 before the first bump), or None when the
+                 counter cannot be read and conditional GETs are off
+        """
+        if self.table is None:
+            return None
+        try:
+            response = self.table.get_item(Key={'id': CATALOG_VERSION_ID}, ConsistentRead=True)
+        except Exception as e:
+            self._log_error('reading', e)
+            return None
+        return int(response.get('Item', {}).get('version', 0))
+
+    def bump(self):
+        """
+        Increment the catalog version after a write to the movie table
+
+        Returns:
+            int: The new version, or None if the counter could not be updated
+        """
+        if self.table is None:
+            return None
+        try:
+            response = self.table.update_item(
+                Key={'id': CATALOG_VERSION_ID},
+                UpdateExpression='ADD #version :one',
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues={':one': 1},
+                ReturnValues='UPDATED_NEW'
+            )
+        except Exception as e:
+            self._log_error('bumping', e)
+            return None
+        return int(response['Attributes']['version'])
@@ -0,0 +1,94 @@
+"""
+Snapshot cache for the chat assistant's movie context
+
+chat_bedrock used to scan the movie table for every message, although the
+catalog rarely changes between two turns of a conversation. ContextCache
+keeps what is built from the scan (the movie retrieval index, see
+chat_retrieval) in the container and rebuilds it only when the catalog has
+changed:
+
+- for CHAT_CONTEXT_TTL seconds after it was built or last checked, the
+  snapshot is used as is, without calling AWS
+- after that, the catalog version counter (see catalog_version) is read;
+  if no writer has bumped it since the snapshot was built, the snapshot
+  stays valid for another TTL, at the cost of one small get_item
+- otherwise, or when the version cannot be read, the snapshot is rebuilt
+
+get() reports whether the request was served from the snapshot, the hit rate
+of the container so far and the milliseconds saved. Savings are estimated
+from how long the last build took.
+"""
+
+import os
+import threading
+import time
+
+# Seconds a prompt snapshot is used before the catalog version is checked again (0 disables caching)
+CHAT_CONTEXT_TTL = float(os.environ.get('CHAT_CONTEXT_TTL', '60'))
+
+
+class ContextCache:
+    """
+    Container-wide cache of a value built from the catalog
+
+    Args:
+        builder (callable): Builds the value, e.g. scans the table and indexes it
+        version_reader (callable): Returns the current catalog version, or None
+                                   if it is unknown (see CatalogVersion.current)
+        ttl (float): Seconds between version checks
+        clock (callable): Monotonic clock, overridable for tests
+    """
+
+    def __init__(self, builder, version_reader=None, ttl=CHAT_CONTEXT_TTL, clock=time.monotonic):
+        self.builder = builder
+        self.version_reader = version_reader
+        self.ttl = ttl
+        self.clock = clock
+
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+        self._build_ms = 0.0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _stats(self, hit, saved_ms):
+        return {
+            'hit': hit,
+            'hitRate': round(self.hits / (self.hits + self.misses), 3),
+            'savedMs': round(max(saved_ms, 0.0), 1)
+        }
+
+    def get(self):
+        """
+        Return the cached value, rebuilding it if the catalog has changed
+
+        Returns:
+            tuple: (value, stats), where stats is a dict with `hit`, the
+                   container's `hitRate` and the `savedMs` of this call
+        """
+        with self._lock:
+            if self._value is not None and self.ttl > 0:
+                if self.clock() - self._checked_at < self.ttl:
+                    self.hits += 1
+                    return self._value, self._stats(True, self._build_ms)
+
+            start = time.perf_counter()
+            version = self.version_reader() if self.version_reader and self.ttl > 0 else None
+            if self._value is not None and version is not None and version == self._version:
+                # Nothing was written since the snapshot was built
+                self._checked_at = self.clock()
+                self.hits += 1
+                return self._value, self._stats(True, self._build_ms - (time.perf_counter() - start) * 1000)
+
+            # The version was read before building, so a write that lands
+            # during the build is picked up by the next check
+            build_start = time.perf_counter()
+            self._value = self.builder()
+            self._build_ms = (time.perf_counter() - build_start) * 1000
+            self._version = version
+            self._checked_at = self.clock()
+            self.misses += 1
+            return self._value, self._stats(False, 0.0)
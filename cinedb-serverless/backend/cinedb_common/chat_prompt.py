@@ -0,0 +1,146 @@
+"""
+Token-budget packing of the chat assistant's conversation history
+
+The frontend sends the whole conversation with every message, and
+chat_bedrock used to pass all of it to Bedrock. Each turn of a long session
+was slower and more expensive than the last, until the request no longer
+fit the model. pack_history() keeps the input within CHAT_INPUT_TOKENS:
+
+- the instructions and the new message are always sent
+- the newest CHAT_RECENT_MESSAGES history messages are kept verbatim, as
+  long as they fit the budget left after CHAT_CONTEXT_TOKENS is set aside
+  for the movie context
+- older messages are compressed into a summary: each becomes one line with
+  its opening sentences, up to SUMMARY_LINE_CHARS. Once the summary
+  reaches CHAT_SUMMARY_TOKENS, its oldest lines are dropped and counted
+- whatever the history leaves unused goes to the movie context, up to
+  CHAT_CONTEXT_TOKENS
+
+The summary is rebuilt from the history on every request, so it rolls
+forward with the conversation without the function keeping any state, and
+it is identical from one turn to the next until a message moves out of the
+verbatim window.
+
+Tokens are estimated with chat_retrieval.estimate_tokens (about 4
+characters per token); the model's tokenizer is not available in Lambda.
+"""
+
+import os
+import re
+
+from cinedb_common.chat_retrieval import CHAT_CONTEXT_TOKENS, estimate_tokens
+
+# Estimated input tokens per Bedrock call: instructions, movies, history and message
+CHAT_INPUT_TOKENS = int(os.environ.get('CHAT_INPUT_TOKENS', '4000'))
+
+# Newest history messages sent verbatim when they fit
+CHAT_RECENT_MESSAGES = int(os.environ.get('CHAT_RECENT_MESSAGES', '6'))
+
+# Estimated tokens of the summary of older messages (0 drops them instead)
+CHAT_SUMMARY_TOKENS = int(os.environ.get('CHAT_SUMMARY_TOKENS', '300'))
+
+# Longest line of the summary, in characters
+SUMMARY_LINE_CHARS = 160
+
+SPEAKERS = {'user': 'User', 'assistant': 'Assistant'}
+
+# End of a sentence: punctuation followed by whitespace
+SENTENCE_END = re.compile(r'[.!?](?=\s)')
+
+
+def summarize_message(role, text):
+    """
+    Compress one message into a line of the summary
+
+    Args:
+        role (str): 'user' or 'assistant'
+        text (str): The message text
+
+    Returns:
+        str: The speaker and the message, cut after the last sentence that
+             ends within SUMMARY_LINE_CHARS, or on a word boundary if none does
+    """
+    text = ' '.join(text.split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        ends = [match.end() for match in SENTENCE_END.finditer(text, 0, SUMMARY_LINE_CHARS + 1)]
+        if ends:
+            text = text[:ends[-1]]
+        else:
+            text = text[:SUMMARY_LINE_CHARS].rsplit(' ', 1)[0] + '...'
+    return f"{SPEAKERS[role]}: {text}"
+
+
+def _message_tokens(message):
+    return estimate_tokens(message['content'])
+
+
+def pack_history(history, fixed_tokens, budget=CHAT_INPUT_TOKENS, context_tokens=CHAT_CONTEXT_TOKENS):
+    """
+    Fit the conversation history into the input-token budget
+
+    Args:
+        history (list): Client-supplied messages ({'role', 'content'}), oldest first;
+                        messages with other roles or no text are ignored
+        fixed_tokens (int): Tokens that are always sent (instructions and new message)
+        budget (int): Estimated input tokens per call
+        context_tokens (int): Most tokens to give the movie context
+
+    Returns:
+        tuple: (messages, summary, context_budget, stats). messages are the
+               verbatim ones, oldest first and starting with a user message,
+               as Bedrock requires. summary is the text of the older
+               messages, or '' if there are none. context_budget is the tokens
+               left for the movie context. stats holds the counts and
+               estimated tokens before and after packing
+    """
+    history = [msg for msg in history
+               if msg.get('role') in SPEAKERS and isinstance(msg.get('content'), str) and msg['content']]
+    available = max(budget - fixed_tokens, 0)
+    history_budget = max(available - context_tokens, 0)
+
+    # Newest messages first, while they fit
+    kept, used = 0, 0
+    for msg in reversed(history[-CHAT_RECENT_MESSAGES:] if CHAT_RECENT_MESSAGES > 0 else []):
+        tokens = _message_tokens(msg)
+        if used + tokens > history_budget:
+            break
+        kept += 1
+        used += tokens
+    recent = history[len(history) - kept:] if kept else []
+    # The conversation sent to Bedrock has to start with a user message
+    while recent and recent[0]['role'] != 'user':
+        used -= _message_tokens(recent[0])
+        recent = recent[1:]
+    older = history[:len(history) - len(recent)]
+
+    # Summary of the older messages, newest lines first, while they fit
+    summary_budget = min(CHAT_SUMMARY_TOKENS, history_budget - used)
+    lines, summary_tokens = [], 0
+    for msg in reversed(older):
+        line = summarize_message(msg['role'], msg['content'])
+        tokens = estimate_tokens(line) + 1
+        if summary_tokens + tokens > summary_budget:
+            break
+        lines.append(line)
+        summary_tokens += tokens
+    lines.reverse()
+    dropped = len(older) - len(lines)
+    if dropped and lines:
+        lines.insert(0, f"({dropped} earlier messages omitted)")
+    summary = '\n'.join(lines)
+    summary_tokens = estimate_tokens(summary) if summary else 0
+
+    history_tokens = sum(_message_tokens(msg) for msg in history)
+    packed_tokens = used + summary_tokens
+    stats = {
+        'budget': budget,
+        'fixedTokens': fixed_tokens,
+        'historyMessages': len(history),
+        'verbatim': len(recent),
+        'summarized': len(older) - dropped,
+        'dropped': dropped,
+        'historyTokens': history_tokens,
+        'packedHistoryTokens': packed_tokens,
+        'savedTokens': history_tokens - packed_tokens
+    }
+    return recent, summary, min(context_tokens, max(available - packed_tokens, 0)), stats
@@ -0,0 +1,241 @@
+"""
+Relevance-ranked movie context for the chat assistant
+
+chat_bedrock used to put the first MAX_CONTEXT_MOVIES items a scan returned
+into every prompt. On a large catalog those are rarely the movies the user
+is asking about, and every turn paid for the same tokens. MovieRetriever
+ranks the whole catalog against the conversation instead and sends only the
+best matches that fit CHAT_CONTEXT_TOKENS.
+
+At build time every movie is tokenized like the search index does (see
+search_index.tokenize), with title, genre and director weighted above the
+synopsis. The BM25 weight of every (term, movie) pair is precomputed into a
+term-major sparse matrix held as three NumPy arrays:
+
+    offsets[term]..offsets[term + 1]   slice of the term's entries
+    movies[slice]                      movie positions containing the term
+    weights[slice]                     BM25 weights (idf and length norm applied)
+
+Scoring a message is then one np.bincount over the entries of its terms,
+which takes about a millisecond even for tens of thousands of movies. Terms of
+the user's CHAT_RETRIEVAL_HISTORY_TURNS previous messages count at half
+weight, so follow-up questions ("something older?") keep their subject.
+
+Each movie's context row is rendered once at build time. select() fills
+the budget in rank order and tops up with the highest-rated movies when
+fewer than MIN_CONTEXT_MOVIES match, so greetings and vague requests still
+get candidates.
+
+NumPy is not part of the Lambda runtime; publish it as a layer (see the
+chat_bedrock README, whose deploy.sh attaches it). It is imported lazily.
+Without it, select() falls back to the catalog in scan order, which was the
+behaviour before ranking: the process prints a warning once, and the
+retrieval stats report `ranked: false`.
+"""
+
+import os
+import time
+from itertools import islice
+
+from cinedb_common.search_index import BM25_B, BM25_K1, tokenize
+
+# Input tokens available for movie rows in the system prompt
+CHAT_CONTEXT_TOKENS = int(os.environ.get('CHAT_CONTEXT_TOKENS', '1500'))
+
+# Earlier user messages whose terms also count in the ranking
+CHAT_RETRIEVAL_HISTORY_TURNS = int(os.environ.get('CHAT_RETRIEVAL_HISTORY_TURNS', '2'))
+
+# Weight of the current message's terms and of earlier messages' terms
+MESSAGE_TERM_WEIGHT = 1.0
+HISTORY_TERM_WEIGHT = 0.5
+
+# Weight of a term occurrence in each field
+FIELD_WEIGHTS = {'title': 3, 'genre': 2, 'director': 2, 'synopsis': 1}
+
+# Matches below this many are topped up with the highest-rated movies
+MIN_CONTEXT_MOVIES = 5
+
+# Rough token estimate for English text and context rows
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Approximate number of model tokens in a string"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+# Whether this process has already warned that NumPy is missing
+_numpy_warning_printed = False
+
+
+def _load_numpy():
+    global _numpy_warning_printed
+    try:
+        import numpy
+    except ImportError:
+        if not _numpy_warning_printed:
+            _numpy_warning_printed = True
+            print("WARNING: NumPy is not available, so the chat context is not ranked. "
+                  "Attach the numpy layer (see the chat_bedrock README)")
+        return None
+    return numpy
+
+
+def _field_text(value):
+    if isinstance(value, (list, tuple, set)):
+        return ' '.join(str(item) for item in value)
+    return value if isinstance(value, str) else ''
+
+
+def _rating(movie):
+    try:
+        return float(movie.get('rating') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class MovieRetriever:
+    """
+    Pick the movies most relevant to a conversation, under a token budget
+
+    Args:
+        movies (iterable): Movie items with the fields in FIELD_WEIGHTS
+        render (callable): Renders one movie as its context row (str)
+        max_movies (int): Most movies returned by select()
+        token_budget (int): Tokens available for the rows (default: CHAT_CONTEXT_TOKENS)
+    """
+
+    def __init__(self, movies, render, max_movies, token_budget=CHAT_CONTEXT_TOKENS):
+        movies = list(movies)
+        self.max_movies = max_movies
+        self.token_budget = token_budget
+        self.rows = [render(movie) for movie in movies]
+        self.row_tokens = [estimate_tokens(row) for row in self.rows]
+        # Positions by rating, for top-ups
+        self.by_rating = sorted(range(len(movies)), key=lambda position: -_rating(movies[position]))
+
+        self.np = _load_numpy()
+        self.ranked = self.np is not None
+        if self.ranked:
+            self._build_matrix(movies)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _build_matrix(self, movies):
+        np = self.np
+        vocabulary = {}
+        term_ids, positions, frequencies = [], [], []
+        lengths = np.zeros(len(movies), dtype=np.float32)
+        for position, movie in enumerate(movies):
+            counts = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(_field_text(movie.get(field))):
+                    counts[term] = counts.get(term, 0) + weight
+            for term, count in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                positions.append(position)
+                frequencies.append(count)
+            lengths[position] = sum(counts.values())
+
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind='stable')
+        term_ids = term_ids[order]
+        movie_positions = np.asarray(positions, dtype=np.int32)[order]
+        term_frequencies = np.asarray(frequencies, dtype=np.float32)[order]
+
+        document_frequency = np.bincount(term_ids, minlength=len(vocabulary)).astype(np.float32)
+        idf = np.log1p((len(movies) - document_frequency + 0.5) / (document_frequency + 0.5))
+        average_length = float(lengths.mean()) if len(movies) else 1.0
+        norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / (average_length or 1.0))
+        weights = idf[term_ids] * term_frequencies * (BM25_K1 + 1) / (term_frequencies + norms[movie_positions])
+
+        self.vocabulary = vocabulary
+        self.offsets = np.concatenate(([0], np.cumsum(document_frequency, dtype=np.int64)))
+        self.movies = movie_positions
+        self.weights = weights.astype(np.float32)
+
+    def _query_weights(self, message, history):
+        query = {}
+        for term in tokenize(message):
+            query[term] = query.get(term, 0.0) + MESSAGE_TERM_WEIGHT
+        for text in history[-CHAT_RETRIEVAL_HISTORY_TURNS:] if CHAT_RETRIEVAL_HISTORY_TURNS else ():
+            for term in tokenize(text):
+                query[term] = query.get(term, 0.0) + HISTORY_TERM_WEIGHT
+        return {self.vocabulary[term]: weight for term, weight in query.items() if term in self.vocabulary}
+
+    def rank(self, message, history=()):
+        """
+        Score every movie against a message and the user's previous messages
+
+        Args:
+            message (str): The new user message
+            history (list): Texts of the user's earlier messages, oldest first
+
+        Returns:
+            list: Positions of the matching movies, best first
+        """
+        if not self.ranked or not self.rows:
+            return []
+        np = self.np
+        query = self._query_weights(message, list(history))
+        if not query:
+            return []
+
+        entries = [np.arange(self.offsets[term], self.offsets[term + 1]) for term in query]
+        term_weights = [np.full(len(indices), weight, dtype=np.float32)
+                        for indices, weight in zip(entries, query.values())]
+        entries = np.concatenate(entries)
+        scores = np.bincount(self.movies[entries], weights=self.weights[entries] * np.concatenate(term_weights),
+                             minlength=len(self.rows))
+
+        matches = np.flatnonzero(scores)
+        if len(matches) > self.max_movies:
+            matches = matches[np.argpartition(-scores[matches], self.max_movies - 1)[:self.max_movies]]
+        return [int(position) for position in matches[np.argsort(-scores[matches], kind='stable')]]
+
+    def select(self, message, history=(), token_budget=None):
+        """
+        Choose the context rows for a turn
+
+        Args:
+            message (str): The new user message
+            history (list): Texts of the user's earlier messages, oldest first
+            token_budget (int): Tokens available for this turn's rows
+                                (default: the retriever's token_budget)
+
+        Returns:
+            tuple: (rows, stats), rows best first; stats has `ranked`, the
+                   number of `matched` and selected `movies`, their
+                   `contextTokens` and the time taken in `ms`
+        """
+        start = time.perf_counter()
+        if token_budget is None:
+            token_budget = self.token_budget
+        ranked = self.rank(message, history)
+        if not self.ranked:
+            candidates = range(len(self.rows))
+        elif len(ranked) < MIN_CONTEXT_MOVIES:
+            matched = set(ranked)
+            top_up = islice((position for position in self.by_rating if position not in matched),
+                            MIN_CONTEXT_MOVIES - len(ranked))
+            candidates = ranked + list(top_up)
+        else:
+            candidates = ranked
+
+        rows, tokens = [], 0
+        for position in candidates:
+            if len(rows) >= self.max_movies:
+                break
+            # Rows that do not fit are skipped; a shorter one further down may
+            if tokens + self.row_tokens[position] <= token_budget:
+                rows.append(self.rows[position])
+                tokens += self.row_tokens[position]
+
+        return rows, {
+            'ranked': self.ranked,
+            'matched': len(ranked),
+            'movies': len(rows),
+            'contextTokens': tokens,
+            'ms': round((time.perf_counter() - start) * 1000, 1)
+        }
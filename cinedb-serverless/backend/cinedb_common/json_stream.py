@@ -0,0 +1,128 @@
+"""
+Incremental JSON encoding for large movie lists
+
+Serializing a list response with json.dumps(..., cls=DecimalEncoder) needs the
+raw scan items, the projected API objects and the final string in memory at
+the same time, and calls back into Python (DecimalEncoder.default) for every
+number. The helpers here encode the list in small batches instead:
+
+    scan page -> project (numbers converted) -> encode batch -> output buffer
+
+Raw items and projected objects can be released as soon as their batch has
+been encoded. Projections convert numbers with to_number, so the C encoder
+never has to call back into Python; the `default` hook only exists as a safety
+net for values a projection did not convert.
+"""
+
+import json
+from decimal import Decimal
+
+# Items encoded per json call; large enough to amortize the call overhead,
+# small enough that a batch is a negligible share of the response
+ENCODE_BATCH_SIZE = 200
+
+
+def decimal_to_number(value):
+    """
+    Convert a DynamoDB Decimal to int when it is integral, float otherwise
+
+    int() and a comparison are cheaper than the `value % 1` arithmetic used by
+    DecimalEncoder.default, and produce the same result.
+
+    Args:
+        value (Decimal): A number returned by DynamoDB
+
+    Returns:
+        int or float: The JSON-friendly number
+    """
+    integral = int(value)
+    return integral if integral == value else float(value)
+
+
+def to_number(value):
+    """Like decimal_to_number, but passes None and non-Decimal values through"""
+    if type(value) is Decimal:
+        return decimal_to_number(value)
+    return value
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return decimal_to_number(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+# One shared compact encoder: json.dumps with non-default arguments would
+# build a new JSONEncoder on every call
+_encoder = json.JSONEncoder(separators=(',', ':'), default=_default)
+
+
+def encode_value(value):
+    """Encode any value as compact JSON, converting stray Decimals"""
+    return _encoder.encode(value)
+
+
+def batched(iterable, size):
+    """
+    Group an iterable into lists of at most `size` elements
+
+    Args:
+        iterable: Any iterable (e.g. a parallel scan)
+        size (int): Batch size
+
+    Yields:
+        list: Consecutive batches
+    """
+    batch = []
+    for element in iterable:
+        batch.append(element)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_json_list(items, batch_size=ENCODE_BATCH_SIZE):
+    """
+    Yield the JSON text of a list, a batch of items at a time
+
+    Args:
+        items (iterable): Projected items; consumed lazily
+        batch_size (int): Items encoded per json call
+
+    Yields:
+        str: Chunks that concatenate to a JSON array
+    """
+    yield '['
+    first = True
+    for batch in batched(items, batch_size):
+        if first:
+            first = False
+        else:
+            yield ','
+        # Encode the batch as one array and drop its brackets
+        yield _encoder.encode(batch)[1:-1]
+    yield ']'
+
+
+def encode_list_response(list_key, items, extra=None):
+    """
+    Build a JSON object body such as {"movies": [...], "nextCursor": ...}
+
+    Args:
+        list_key (str): Name of the list field
+        items (iterable): Projected items, consumed lazily
+        extra (dict): Additional top-level fields, written after the list
+
+    Returns:
+        str: The complete JSON body
+    """
+    buffer = ['{', json.dumps(list_key), ':']
+    buffer.extend(iter_json_list(items))
+    for key, value in (extra or {}).items():
+        buffer.append(f',{json.dumps(key)}:{encode_value(value)}')
+    buffer.append('}')
+    return ''.join(buffer)
@@ -0,0 +1,41 @@
+"""
+CloudWatch metrics from the function logs
+
+emit_metric() prints one log line in the CloudWatch Embedded Metric Format.
+CloudWatch Logs turns it into a metric in the METRICS_NAMESPACE namespace,
+so a function can count events (a failed search index update, a presign
+cache miss) and have an alarm on them without calling PutMetricData or
+waiting on the network. Outside Lambda the line is just logged.
+"""
+
+import json
+import os
+import time
+
+# Namespace of every metric
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'CineDB')
+
+
+def emit_metric(name, value=1, unit='Count', **dimensions):
+    """
+    Log a metric value in the Embedded Metric Format
+
+    Args:
+        name (str): Metric name, e.g. 'SearchIndexUpdateFailed'
+        value (float): Value to record
+        unit (str): CloudWatch unit (Count, Milliseconds, ...)
+        **dimensions: Dimension names and values, e.g. Function='add_movie'
+    """
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [sorted(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': unit}]
+            }]
+        },
+        name: value
+    }
+    record.update({key: str(dimension) for key, dimension in dimensions.items()})
+    print(json.dumps(record))
@@ -0,0 +1,521 @@
+"""
+Secondary indexes for browsing movies by genre, year and rating
+
+The table is keyed on `id` only, so every filtered listing used to be a full
+Scan. Three global secondary indexes let the common filters run as a Query:
+
+    GenreYearIndex      genreKey (S)    + year (N)    genre, optional year range
+    CatalogYearIndex    catalogKey (S)  + year (N)    year range
+    CatalogRatingIndex  catalogKey (S)  + rating (N)  minimum rating, best first
+
+`genre` is a free-text, comma-separated list ("Action, Sci-Fi"), which cannot
+be a key, so writes store a normalized copy of the *primary* (first listed)
+genre in `genreKey`.
+
+`catalogKey` lets the year and rating indexes range over the whole catalog.
+A single constant would put every movie in one GSI partition, and a
+partition takes about 1,000 writes and 3,000 reads per second: index writes
+would be throttled, which throttles the base table too. The key is therefore
+sharded by movie id: `movie#<crc32(id) % CATALOG_KEY_SHARDS>`. A query on
+these indexes runs on every shard concurrently and the results are merged by
+the index's sort key (see query_all and query_page). Both attributes are
+maintained by index_keys() on every write.
+
+plan_query() picks the index for a set of filters. When the indexes are not
+available (USE_MOVIE_INDEXES=false, or a table created before they were
+added), callers fall back to a filtered scan built by plan_scan(); both paths
+apply the same filter semantics.
+"""
+
+import heapq
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+
+GENRE_INDEX = 'GenreYearIndex'
+YEAR_INDEX = 'CatalogYearIndex'
+RATING_INDEX = 'CatalogRatingIndex'
+
+# Number of catalogKey values the movies are spread over. Each one is a
+# partition of CatalogYearIndex and CatalogRatingIndex, and every query on
+# them makes one request per shard. Run scripts/backfill_index_keys.py after
+# changing it, with the readers and writers all on the new value
+CATALOG_KEY_SHARDS = int(os.environ.get('CATALOG_KEY_SHARDS', '8'))
+
+# Sort key of each index
+SORT_KEYS = {GENRE_INDEX: 'year', YEAR_INDEX: 'year', RATING_INDEX: 'rating'}
+
+# Set to "false" for tables without the GSIs to always use a filtered scan
+USE_MOVIE_INDEXES = os.environ.get('USE_MOVIE_INDEXES', 'true').lower() != 'false'
+
+# Query string parameters understood by parse_movie_filters
+FILTER_PARAMS = ('genre', 'yearFrom', 'yearTo', 'minRating')
+
+
+class InvalidFilterError(ValueError):
+    """Raised when a filter query parameter is malformed"""
+
+
+def primary_genre(genre):
+    """
+    Normalize the first genre of a comma-separated genre list
+
+    Args:
+        genre (str): Genre list as entered, e.g. "Action, Sci-Fi"
+
+    Returns:
+        str: The lowercased primary genre (e.g. "action"), or '' if none
+    """
+    if not genre:
+        return ''
+    return genre.split(',', 1)[0].strip().lower()
+
+
+def catalog_key(movie_id):
+    """
+    Return the catalogKey shard of a movie
+
+    Args:
+        movie_id (str): The movie's id
+
+    Returns:
+        str: 'movie#<shard>', with the shard derived from the id
+    """
+    return f"movie#{zlib.crc32(str(movie_id).encode('utf-8')) % CATALOG_KEY_SHARDS}"
+
+
+def catalog_keys():
+    """Return every catalogKey value, in shard order"""
+    return [f"movie#{shard}" for shard in range(CATALOG_KEY_SHARDS)]
+
+
+def index_keys(movie):
+    """
+    Compute the GSI key attributes a movie item must carry
+
+    Args:
+        movie (dict): Movie attributes being written (needs 'id' to produce a
+                      catalogKey and 'genre' to produce a genreKey)
+
+    Returns:
+        dict: {'catalogKey': ..., 'genreKey': ...}; genreKey is omitted when
+              the movie has no genre, which keeps it out of GenreYearIndex
+    """
+    keys = {}
+    if movie.get('id'):
+        keys['catalogKey'] = catalog_key(movie['id'])
+    genre_key = primary_genre(movie.get('genre'))
+    if genre_key:
+        keys['genreKey'] = genre_key
+    return keys
+
+
+def _parse_int(query_params, name):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidFilterError(f"'{name}' must be an integer")
+
+
+def parse_rating(value):
+    """
+    Parse a rating entered as text
+
+    The rating is the sort key of CatalogRatingIndex, which only accepts
+    numbers, so it can not be stored as the raw string.
+
+    Returns:
+        Decimal: The rating, or None if the value is not a number
+    """
+    try:
+        rating = Decimal(value.strip())
+    except (InvalidOperation, AttributeError):
+        return None
+    return rating if rating.is_finite() else None
+
+
+def parse_movie_filters(query_params):
+    """
+    Read the browsing filters from the query string
+
+    Args:
+        query_params (dict): API Gateway queryStringParameters (may be None)
+
+    Returns:
+        dict: Filters with keys genre, year_from, year_to and min_rating
+              (missing ones are None), or None when no filter was given
+
+    Raises:
+        InvalidFilterError: If a value is malformed or the year range is empty
+    """
+    query_params = query_params or {}
+    genre = primary_genre(query_params.get('genre'))
+    year_from = _parse_int(query_params, 'yearFrom')
+    year_to = _parse_int(query_params, 'yearTo')
+
+    min_rating = query_params.get('minRating')
+    if min_rating in (None, ''):
+        min_rating = None
+    else:
+        try:
+            min_rating = Decimal(min_rating)
+        except InvalidOperation:
+            raise InvalidFilterError("'minRating' must be a number")
+        if not min_rating.is_finite():
+            raise InvalidFilterError("'minRating' must be a number")
+
+    if year_from is not None and year_to is not None and year_from > year_to:
+        raise InvalidFilterError("'yearFrom' must not be greater than 'yearTo'")
+
+    filters = {
+        'genre': genre or None,
+        'year_from': year_from,
+        'year_to': year_to,
+        'min_rating': min_rating
+    }
+    if all(value is None for value in filters.values()):
+        return None
+    return filters
+
+
+def query_index_name(filters):
+    """
+    Return the index plan_query would use for these filters
+
+    Args:
+        filters (dict): Result of parse_movie_filters
+
+    Returns:
+        str: A GSI name
+    """
+    if filters['genre']:
+        return GENRE_INDEX
+    if filters['year_from'] is not None or filters['year_to'] is not None:
+        return YEAR_INDEX
+    return RATING_INDEX
+
+
+def _year_condition(filters, names, values):
+    year_from, year_to = filters['year_from'], filters['year_to']
+    if year_from is None and year_to is None:
+        return None
+
+    names['#year'] = 'year'
+    if year_from is not None and year_to is not None:
+        values[':yearFrom'] = year_from
+        values[':yearTo'] = year_to
+        return '#year BETWEEN :yearFrom AND :yearTo'
+    if year_from is not None:
+        values[':yearFrom'] = year_from
+        return '#year >= :yearFrom'
+    values[':yearTo'] = year_to
+    return '#year <= :yearTo'
+
+
+def _rating_condition(filters, names, values):
+    if filters['min_rating'] is None:
+        return None
+    names['#rating'] = 'rating'
+    values[':minRating'] = filters['min_rating']
+    return '#rating >= :minRating'
+
+
+def plan_query(filters):
+    """
+    Build the Query parameters for a set of filters
+
+    The most selective index wins: genre, then year, then rating. Filters the
+    chosen index cannot express as a key condition become a FilterExpression.
+    Queries on the catalog-wide indexes are planned for the first catalogKey
+    shard; run them with query_all or query_page, which cover every shard.
+
+    Args:
+        filters (dict): Result of parse_movie_filters
+
+    Returns:
+        dict: Keyword arguments for Table.query (IndexName,
+              KeyConditionExpression, ExpressionAttributeNames/Values and,
+              when needed, FilterExpression and ScanIndexForward)
+    """
+    index_name = query_index_name(filters)
+    names, values = {}, {}
+    params = {'IndexName': index_name}
+
+    if index_name == GENRE_INDEX:
+        names['#genreKey'] = 'genreKey'
+        values[':genreKey'] = filters['genre']
+        key_condition = '#genreKey = :genreKey'
+    else:
+        names['#catalogKey'] = 'catalogKey'
+        values[':catalogKey'] = catalog_keys()[0]
+        key_condition = '#catalogKey = :catalogKey'
+
+    year_condition = _year_condition(filters, names, values)
+    rating_condition = _rating_condition(filters, names, values)
+
+    if index_name == RATING_INDEX:
+        key_condition += f' AND {rating_condition}'
+        # Best rated first
+        params['ScanIndexForward'] = False
+    else:
+        if year_condition:
+            key_condition += f' AND {year_condition}'
+        if rating_condition:
+            params['FilterExpression'] = rating_condition
+
+    params['KeyConditionExpression'] = key_condition
+    params['ExpressionAttributeNames'] = names
+    params['ExpressionAttributeValues'] = values
+    return params
+
+
+def plan_scan(filters):
+    """
+    Build the filtered Scan parameters used when no index is available
+
+    Year and rating are filtered by DynamoDB. The genre cannot be, because
+    items written before the indexes existed have no genreKey and the raw
+    genre needs normalizing; check it with matches_genre instead.
+
+    Args:
+        filters (dict): Result of parse_movie_filters
+
+    Returns:
+        dict: Keyword arguments for a Scan (may be empty)
+    """
+    names, values = {}, {}
+    conditions = [
+        condition for condition in (
+            _year_condition(filters, names, values),
+            _rating_condition(filters, names, values)
+        ) if condition
+    ]
+    if not conditions:
+        return {}
+    return {
+        'FilterExpression': ' AND '.join(conditions),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }
+
+
+def matches_genre(movie, filters):
+    """
+    Apply the genre filter to a scanned movie
+
+    Args:
+        movie (dict): Movie item including its 'genre' attribute
+        filters (dict): Result of parse_movie_filters
+
+    Returns:
+        bool: True if the movie's primary genre matches (or no genre filter)
+    """
+    return not filters['genre'] or primary_genre(movie.get('genre')) == filters['genre']
+
+
+def cursor_scope(filters):
+    """
+    Scope of the pagination cursors issued for a set of filters
+
+    Cursors of the catalog-wide indexes hold a position per shard, so they
+    are only valid for the shard count they were issued with.
+
+    Args:
+        filters (dict): Result of parse_movie_filters
+
+    Returns:
+        str: Scope to pass to encode_cursor and parse_page_params
+    """
+    index_name = query_index_name(filters)
+    if index_name == GENRE_INDEX:
+        return index_name
+    return f"{index_name}/{CATALOG_KEY_SHARDS}"
+
+
+def query_key_fields(filters):
+    """
+    Attributes query_page and query_all need in every item they merge
+
+    Args:
+        filters (dict): Result of parse_movie_filters
+
+    Returns:
+        tuple: Attribute names to add to the projection
+    """
+    index_name = query_index_name(filters)
+    if index_name == GENRE_INDEX:
+        return ()
+    return ('id', 'catalogKey', SORT_KEYS[index_name])
+
+
+def _shard_queries(query_kwargs):
+    """One Query per catalogKey shard, or the query itself for GenreYearIndex"""
+    if query_kwargs['IndexName'] == GENRE_INDEX:
+        return [dict(query_kwargs)]
+    return [
+        dict(query_kwargs, ExpressionAttributeValues=dict(query_kwargs['ExpressionAttributeValues'],
+                                                          **{':catalogKey': key}))
+        for key in catalog_keys()
+    ]
+
+
+def _run_concurrently(table, queries):
+    if len(queries) == 1:
+        return [table.query(**queries[0])]
+    with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix='index-query') as executor:
+        return list(executor.map(lambda query: table.query(**query), queries))
+
+
+def _order_key(query_kwargs):
+    sort_key = SORT_KEYS[query_kwargs['IndexName']]
+    if query_kwargs.get('ScanIndexForward', True):
+        return lambda item: item[sort_key]
+    return lambda item: -item[sort_key]
+
+
+def query_all(table, **query_kwargs):
+    """
+    Read every match of a planned query, in index order
+
+    The first page of every shard is read concurrently before this function
+    returns, so a missing index fails here rather than halfway through the
+    response. Later pages are read as the merge needs them.
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        **query_kwargs: Parameters from plan_query plus a projection that
+                        includes query_key_fields
+
+    Returns:
+        iterator: Matching items, merged across shards by the sort key
+    """
+    queries = _shard_queries(query_kwargs)
+    streams = []
+    for query, response in zip(queries, _run_concurrently(table, queries)):
+        items = response.get('Items', [])
+        if 'LastEvaluatedKey' in response:
+            query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            items = chain(items, iter_query(table, **query))
+        streams.append(items)
+    if len(streams) == 1:
+        return iter(streams[0])
+    forward = query_kwargs.get('ScanIndexForward', True)
+    sort_key = SORT_KEYS[query_kwargs['IndexName']]
+    return heapq.merge(*streams, key=lambda item: item[sort_key], reverse=not forward)
+
+
+def _shard_positions(exclusive_start_key, shards):
+    """Decode a query_page key into per-shard (start key, exhausted) pairs"""
+    positions = [[None, False] for _ in range(shards)]
+    for name, value in (exclusive_start_key or {}).items():
+        shard, _, attribute = name.partition(':')
+        if not shard.isdigit() or int(shard) >= shards or not attribute:
+            raise ValueError('Cursor does not match the catalog shards')
+        if attribute == 'done':
+            positions[int(shard)][1] = True
+        else:
+            positions[int(shard)][0] = dict(positions[int(shard)][0] or {}, **{attribute: value})
+    return positions
+
+
+def query_page(table, limit, exclusive_start_key=None, **query_kwargs):
+    """
+    Read one page of a planned query
+
+    On GenreYearIndex this is one Query call. On the catalog-wide indexes,
+    every shard that is not exhausted is queried concurrently for up to
+    `limit` items, and the page takes the first `limit` of them in sort key
+    order. Items are only taken up to the lowest position a shard stopped at,
+    since that shard's next items may sort before the others'. The returned
+    key records where each shard stands, so no item is skipped or repeated.
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        limit (int): Most items to return
+        exclusive_start_key (dict): The key returned with the previous page
+        **query_kwargs: Parameters from plan_query plus a projection that
+                        includes query_key_fields
+
+    Returns:
+        tuple: (items, last_evaluated_key); the key is None on the last page
+
+    Raises:
+        ValueError: If the key was not issued for the current shard count
+    """
+    if query_kwargs['IndexName'] == GENRE_INDEX:
+        if exclusive_start_key:
+            query_kwargs['ExclusiveStartKey'] = exclusive_start_key
+        response = table.query(Limit=limit, **query_kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    queries = _shard_queries(query_kwargs)
+    positions = _shard_positions(exclusive_start_key, len(queries))
+    active = [shard for shard, (_, done) in enumerate(positions) if not done]
+    for shard in active:
+        queries[shard]['Limit'] = limit
+        if positions[shard][0]:
+            queries[shard]['ExclusiveStartKey'] = positions[shard][0]
+    responses = dict(zip(active, _run_concurrently(table, [queries[shard] for shard in active])))
+
+    order_key = _order_key(query_kwargs)
+    sort_key = SORT_KEYS[query_kwargs['IndexName']]
+    stopped_at = [order_key(response['LastEvaluatedKey']) for response in responses.values()
+                  if 'LastEvaluatedKey' in response]
+    frontier = min(stopped_at) if stopped_at else None
+
+    candidates = sorted(
+        (order_key(item), shard, position, item)
+        for shard, response in responses.items()
+        for position, item in enumerate(response.get('Items', []))
+    )
+    taken = {shard: 0 for shard in responses}
+    items = []
+    for key, shard, _, item in candidates:
+        if len(items) >= limit or (frontier is not None and key > frontier):
+            break
+        items.append(item)
+        taken[shard] += 1
+
+    next_key = {}
+    for shard, (start, done) in enumerate(positions):
+        if shard in responses:
+            response = responses[shard]
+            returned = response.get('Items', [])
+            if taken[shard] == len(returned):
+                start = response.get('LastEvaluatedKey')
+                done = start is None
+            elif taken[shard]:
+                last = returned[taken[shard] - 1]
+                start = {'id': last['id'], 'catalogKey': last['catalogKey'], sort_key: last[sort_key]}
+        if done:
+            next_key[f'{shard}:done'] = 'true'
+        elif start:
+            next_key.update({f'{shard}:{name}': value for name, value in start.items()})
+
+    if all(name.endswith(':done') for name in next_key) and len(next_key) == len(positions):
+        return items, None
+    return items, next_key
+
+
+def iter_query(table, **query_kwargs):
+    """
+    Run a Query to completion, following LastEvaluatedKey
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        **query_kwargs: Parameters from plan_query plus any projection
+
+    Yields:
+        dict: Each matching item, in index order
+    """
+    while True:
+        response = table.query(**query_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
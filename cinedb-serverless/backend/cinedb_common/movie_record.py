@@ -0,0 +1,103 @@
+"""
+Field rules for new movie items, shared by add_movie and the bulk importer
+
+build_movie_item turns the submitted fields (form fields, a JSON body, or a
+CSV/NDJSON row) into the item add_movie stores: `title` and `year` are
+required, numbers are parsed into the types the browsing indexes need, empty
+optional fields are left out, and the index key attributes are added.
+"""
+
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from .movie_index import index_keys
+from .versioning import VERSION_ATTRIBUTE
+
+REQUIRED_FIELDS = ('title', 'year')
+
+# Optional text fields, stored as given
+TEXT_FIELDS = ('synopsis', 'director', 'genre')
+
+
+class MovieValidationError(ValueError):
+    """Raised when submitted movie fields break the field rules"""
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _parse_int(name, value):
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise MovieValidationError(f"Field '{name}' must be a whole number")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise MovieValidationError(f"Field '{name}' must be a whole number")
+
+
+def _parse_decimal(name, value):
+    if isinstance(value, bool):
+        raise MovieValidationError(f"Field '{name}' must be a number")
+    try:
+        # str() first, so floats from JSON keep their short representation
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise MovieValidationError(f"Field '{name}' must be a number")
+    if not number.is_finite():
+        raise MovieValidationError(f"Field '{name}' must be a number")
+    return number
+
+
+def build_movie_item(fields, movie_id=None, created_at=None):
+    """
+    Build a movie item from submitted fields
+
+    Args:
+        fields (dict): Submitted values; unknown keys are ignored
+        movie_id (str): ID to use (default: a new UUID)
+        created_at (str): createdAt timestamp (default: now)
+
+    Returns:
+        dict: The item to put into DynamoDB, index keys included
+
+    Raises:
+        MovieValidationError: If a required field is missing or a number
+                              cannot be parsed
+    """
+    for field in REQUIRED_FIELDS:
+        if _is_blank(fields.get(field)):
+            raise MovieValidationError(f'Missing required field: {field}')
+
+    item = {
+        'id': movie_id or str(uuid.uuid4()),
+        'title': str(fields['title']),
+        'year': _parse_int('year', fields['year']),
+        'createdAt': created_at or datetime.now().isoformat(),
+        # Optimistic locking: update_movie bumps it on every edit
+        VERSION_ATTRIBUTE: 1
+    }
+
+    for field in TEXT_FIELDS:
+        if not _is_blank(fields.get(field)):
+            item[field] = str(fields[field])
+
+    if not _is_blank(fields.get('rating')):
+        item['rating'] = _parse_decimal('rating', fields['rating'])
+
+    if not _is_blank(fields.get('duration')):
+        item['duration'] = _parse_int('duration', fields['duration'])
+
+    cast = fields.get('cast')
+    if isinstance(cast, list):
+        # NDJSON rows may carry the cast as a list of names
+        cast = [str(name) for name in cast if not _is_blank(name)]
+        if cast:
+            item['cast'] = cast
+    elif not _is_blank(cast):
+        item['cast'] = str(cast)
+
+    # Key attributes for the genre/year/rating browsing indexes
+    item.update(index_keys(item))
+    return item
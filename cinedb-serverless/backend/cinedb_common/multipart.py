@@ -0,0 +1,519 @@
+"""
+Incremental multipart/form-data parsing for poster uploads
+
+The handlers used to decode the whole base64 body, split it on the boundary,
+split each part on the header separator and strip the content again, so a
+poster was copied in memory four or five times before it reached S3, and a
+body that was too large was only noticed after all of that. This module
+parses a body in one pass instead:
+
+- parse_multipart walks a bytes body with bytes.find and returns file parts
+  as zero-copy memoryview slices, wrapped in a seekable reader that can be
+  passed straight to put_object.
+- MultipartParser is fed the body in chunks (parse_multipart_event decodes a
+  base64 API Gateway body chunk by chunk) and writes file parts to spooled
+  temporary files, so only one chunk and the spool threshold are held in
+  memory besides the event itself.
+
+Both enforce the size limits as they go: a part is rejected as soon as it
+crosses its limit, and a base64 body that decodes to more than MAX_BODY_SIZE
+is rejected before anything is decoded.
+
+Parsed forms keep the shape of the old parse_multipart_data result:
+
+    {'fields': {name: str},
+     'files': {name: {'filename', 'content_type', 'content', 'size'}}}
+
+where `content` is a seekable binary file object positioned at the start.
+"""
+
+import base64
+import binascii
+import io
+import os
+import re
+import tempfile
+
+# Size limits; a poster is the only file the forms accept
+MAX_FILE_SIZE = int(os.environ.get('MULTIPART_MAX_FILE_SIZE', str(10 * 1024 * 1024)))
+MAX_FIELD_SIZE = int(os.environ.get('MULTIPART_MAX_FIELD_SIZE', str(64 * 1024)))
+MAX_BODY_SIZE = int(os.environ.get('MULTIPART_MAX_BODY_SIZE', str(MAX_FILE_SIZE + 1024 * 1024)))
+MAX_PARTS = 32
+MAX_HEADER_SIZE = 8 * 1024
+
+# File parts up to this size stay in memory; larger ones spill to /tmp
+SPOOL_THRESHOLD = int(os.environ.get('MULTIPART_SPOOL_THRESHOLD', str(1024 * 1024)))
+
+# Base64 characters decoded per step (a multiple of 4)
+BASE64_CHUNK_SIZE = 256 * 1024
+
+_BOUNDARY_PATTERN = re.compile(r'boundary=(?:"([^"]+)"|([^;\s]+))', re.IGNORECASE)
+_PARAM_PATTERN = re.compile(r';\s*([\w*-]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+class MultipartError(ValueError):
+    """Raised when a multipart body is malformed"""
+
+
+class PayloadTooLargeError(MultipartError):
+    """Raised when a body, part or field exceeds its size limit"""
+
+
+def get_boundary(content_type):
+    """
+    Extract the boundary from a multipart Content-Type header
+
+    Args:
+        content_type (str): e.g. 'multipart/form-data; boundary=----abc'
+
+    Returns:
+        bytes: The boundary, without the leading dashes of the delimiter
+
+    Raises:
+        MultipartError: If the header has no boundary
+    """
+    match = _BOUNDARY_PATTERN.search(content_type or '')
+    if not match:
+        raise MultipartError('No boundary found in Content-Type')
+    boundary = (match.group(1) or match.group(2)).encode('latin-1')
+    if len(boundary) > 70:
+        raise MultipartError('Multipart boundary is too long')
+    return boundary
+
+
+def _parse_headers(raw):
+    headers = {}
+    for line in bytes(raw).split(b'\r\n'):
+        name, sep, value = line.partition(b':')
+        if sep:
+            headers[name.strip().decode('latin-1').lower()] = value.strip().decode('utf-8', 'replace')
+    return headers
+
+
+def _disposition_params(value):
+    params = {}
+    for name, raw in _PARAM_PATTERN.findall(value):
+        raw = raw.strip()
+        if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+            raw = re.sub(r'\\(.)', r'\1', raw[1:-1])
+        params[name.lower()] = raw
+    return params
+
+
+class MemoryviewReader(io.RawIOBase):
+    """
+    Seekable read-only file over a memoryview, without copying it
+
+    boto3 accepts any file-like object as an S3 Body; this lets a poster
+    sliced out of the request body be uploaded without materializing it as
+    a separate bytes object.
+
+    Args:
+        view (memoryview): The bytes to expose
+    """
+
+    def __init__(self, view):
+        super().__init__()
+        self._view = view.cast('B') if view.format != 'B' or view.ndim != 1 else view
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def getbuffer(self):
+        return self._view
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        end = min(self._position + len(buffer), len(self._view))
+        count = end - self._position
+        buffer[:count] = self._view[self._position:end]
+        self._position = end
+        return count
+
+    def readall(self):
+        data = self._view[self._position:].tobytes()
+        self._position = len(self._view)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f'Invalid whence: {whence}')
+        if position < 0:
+            raise ValueError('Negative seek position')
+        self._position = position
+        return position
+
+    def tell(self):
+        return self._position
+
+
+class _FormBuilder:
+    """Collects parsed parts into the form dict and enforces per-part limits"""
+
+    def __init__(self, max_file_size, max_field_size, max_parts):
+        self.max_file_size = max_file_size
+        self.max_field_size = max_field_size
+        self.max_parts = max_parts
+        self.parts = 0
+        self.result = {'fields': {}, 'files': {}}
+
+    def describe(self, headers):
+        """
+        Classify a part from its headers
+
+        Returns:
+            tuple: (kind, name, filename, content_type, limit) where kind is
+                   'file', 'field' or None for parts to skip
+        """
+        self.parts += 1
+        if self.parts > self.max_parts:
+            raise MultipartError(f'Too many parts (maximum {self.max_parts})')
+
+        params = _disposition_params(headers.get('content-disposition', ''))
+        name = params.get('name')
+        if not name:
+            return None, None, None, None, self.max_field_size
+
+        filename = params.get('filename')
+        if filename is None:
+            return 'field', name, None, None, self.max_field_size
+        if not filename:
+            # A file input left empty by the browser
+            return None, None, None, None, self.max_field_size
+        content_type = headers.get('content-type', 'application/octet-stream')
+        return 'file', name, filename, content_type, self.max_file_size
+
+    def check_size(self, size, kind, name, limit):
+        if size > limit:
+            what = 'File' if kind == 'file' else 'Field'
+            raise PayloadTooLargeError(f"{what} '{name}' exceeds the maximum size of {limit} bytes")
+
+    def add_field(self, name, data):
+        try:
+            self.result['fields'][name] = bytes(data).decode('utf-8')
+        except UnicodeDecodeError:
+            raise MultipartError(f"Field '{name}' is not valid UTF-8")
+
+    def add_file(self, name, filename, content_type, content, size):
+        self.result['files'][name] = {
+            'filename': filename,
+            'content_type': content_type,
+            'content': content,
+            'size': size
+        }
+
+
+def _to_bytes(body):
+    if isinstance(body, (bytes, bytearray)):
+        return body
+    if isinstance(body, str):
+        return body.encode('utf-8')
+    return bytes(body)
+
+
+def parse_multipart(content_type, body, max_file_size=MAX_FILE_SIZE, max_field_size=MAX_FIELD_SIZE,
+                    max_parts=MAX_PARTS):
+    """
+    Parse a complete multipart/form-data body held in memory
+
+    Part boundaries are located with bytes.find; file contents are not
+    copied, they are returned as MemoryviewReader objects over the body.
+    The body must therefore stay unmodified while the files are in use.
+
+    Args:
+        content_type (str): The Content-Type header with the boundary
+        body (bytes): The decoded request body (str is encoded as UTF-8)
+        max_file_size (int): Maximum size of a file part in bytes
+        max_field_size (int): Maximum size of a regular field in bytes
+        max_parts (int): Maximum number of parts
+
+    Returns:
+        dict: {'fields': {...}, 'files': {...}} (see the module docstring)
+
+    Raises:
+        PayloadTooLargeError: If a part exceeds its limit
+        MultipartError: If the body is malformed
+    """
+    delimiter = b'--' + get_boundary(content_type)
+    close_delimiter = b'\r\n' + delimiter
+    data = _to_bytes(body)
+    view = memoryview(data)
+    form = _FormBuilder(max_file_size, max_field_size, max_parts)
+
+    position = data.find(delimiter)
+    if position < 0:
+        raise MultipartError('Body does not contain the multipart boundary')
+    position += len(delimiter)
+
+    while True:
+        if data.startswith(b'--', position):
+            return form.result
+
+        # Skip transport padding after the delimiter
+        line_end = data.find(b'\r\n', position)
+        if line_end < 0:
+            raise MultipartError('Malformed multipart delimiter')
+        headers_start = line_end + 2
+
+        if data.startswith(b'\r\n', headers_start):
+            headers, content_start = {}, headers_start + 2
+        else:
+            headers_end = data.find(b'\r\n\r\n', headers_start, headers_start + MAX_HEADER_SIZE + 4)
+            if headers_end < 0:
+                raise MultipartError('Malformed or oversized part headers')
+            headers = _parse_headers(view[headers_start:headers_end])
+            content_start = headers_end + 4
+
+        content_end = data.find(close_delimiter, content_start)
+        if content_end < 0:
+            raise MultipartError('Multipart body is missing its closing boundary')
+
+        kind, name, filename, part_type, limit = form.describe(headers)
+        size = content_end - content_start
+        if kind is not None:
+            form.check_size(size, kind, name, limit)
+            if kind == 'file':
+                form.add_file(name, filename, part_type, MemoryviewReader(view[content_start:content_end]), size)
+            else:
+                form.add_field(name, view[content_start:content_end])
+
+        position = content_end + len(close_delimiter)
+
+
+class MultipartParser:
+    """
+    Incremental multipart/form-data parser
+
+    Feed the body in chunks of any size with feed() and call close() at the
+    end. Only the unparsed tail of the input is buffered (at most one chunk
+    plus a delimiter's length); file parts are written to spooled temporary
+    files as their bytes arrive, and every part is checked against its limit
+    before it grows past it.
+
+    Args:
+        boundary (bytes): The multipart boundary (see get_boundary)
+        max_file_size (int): Maximum size of a file part in bytes
+        max_field_size (int): Maximum size of a regular field in bytes
+        max_parts (int): Maximum number of parts
+        spool_threshold (int): File parts larger than this go to disk
+    """
+
+    _PREAMBLE, _DELIMITER, _HEADERS, _CONTENT, _DONE = range(5)
+
+    def __init__(self, boundary, max_file_size=MAX_FILE_SIZE, max_field_size=MAX_FIELD_SIZE,
+                 max_parts=MAX_PARTS, spool_threshold=SPOOL_THRESHOLD):
+        self.spool_threshold = spool_threshold
+        self._delimiter = b'\r\n--' + boundary
+        # The first delimiter need not follow a line break; pretend it does
+        self._buffer = bytearray(b'\r\n')
+        self._state = self._PREAMBLE
+        self._form = _FormBuilder(max_file_size, max_field_size, max_parts)
+        self._part = None
+
+    def feed(self, data):
+        """
+        Parse the next chunk of the body
+
+        Raises:
+            PayloadTooLargeError: If the current part exceeds its limit
+            MultipartError: If the body is malformed
+        """
+        if self._state == self._DONE:
+            return
+        self._buffer += data
+        while self._step():
+            pass
+
+    def close(self):
+        """
+        Finish parsing
+
+        Returns:
+            dict: {'fields': {...}, 'files': {...}} (see the module docstring)
+
+        Raises:
+            MultipartError: If the body ended before the closing boundary
+        """
+        if self._state != self._DONE:
+            self._discard_part()
+            raise MultipartError('Multipart body is missing its closing boundary')
+        return self._form.result
+
+    def _step(self):
+        """Advance the state machine; returns False when more input is needed"""
+        buffer = self._buffer
+        if self._state == self._PREAMBLE:
+            index = buffer.find(self._delimiter)
+            if index < 0:
+                # Keep just enough to recognize a delimiter split across chunks
+                del buffer[:max(0, len(buffer) - len(self._delimiter) + 1)]
+                return False
+            del buffer[:index + len(self._delimiter)]
+            self._state = self._DELIMITER
+            return True
+
+        if self._state == self._DELIMITER:
+            if len(buffer) < 2:
+                return False
+            if buffer.startswith(b'--'):
+                self._state = self._DONE
+                buffer.clear()
+                return False
+            line_end = buffer.find(b'\r\n')
+            if line_end < 0:
+                if len(buffer) > MAX_HEADER_SIZE:
+                    raise MultipartError('Malformed multipart delimiter')
+                return False
+            del buffer[:line_end + 2]
+            self._state = self._HEADERS
+            return True
+
+        if self._state == self._HEADERS:
+            if buffer.startswith(b'\r\n'):
+                headers, consumed = {}, 2
+            else:
+                headers_end = buffer.find(b'\r\n\r\n')
+                if headers_end < 0:
+                    if len(buffer) > MAX_HEADER_SIZE:
+                        raise MultipartError('Malformed or oversized part headers')
+                    return False
+                headers = _parse_headers(buffer[:headers_end])
+                consumed = headers_end + 4
+            del buffer[:consumed]
+            self._begin_part(headers)
+            self._state = self._CONTENT
+            return True
+
+        if self._state == self._CONTENT:
+            index = buffer.find(self._delimiter)
+            if index < 0:
+                safe = len(buffer) - len(self._delimiter) + 1
+                if safe > 0:
+                    self._write(safe)
+                return False
+            self._write(index)
+            del buffer[:len(self._delimiter)]
+            self._finish_part()
+            self._state = self._DELIMITER
+            return True
+
+        return False
+
+    def _begin_part(self, headers):
+        kind, name, filename, content_type, limit = self._form.describe(headers)
+        if kind == 'file':
+            sink = tempfile.SpooledTemporaryFile(max_size=self.spool_threshold)
+        elif kind == 'field':
+            sink = bytearray()
+        else:
+            sink = None
+        self._part = {
+            'kind': kind, 'name': name, 'filename': filename,
+            'content_type': content_type, 'limit': limit, 'sink': sink, 'size': 0
+        }
+
+    def _write(self, count):
+        """Move the first `count` buffered bytes into the current part"""
+        part = self._part
+        part['size'] += count
+        if part['kind'] is not None:
+            try:
+                self._form.check_size(part['size'], part['kind'], part['name'], part['limit'])
+            except PayloadTooLargeError:
+                self._discard_part()
+                raise
+            with memoryview(self._buffer) as view:
+                if part['kind'] == 'file':
+                    part['sink'].write(view[:count])
+                else:
+                    part['sink'] += view[:count]
+        del self._buffer[:count]
+
+    def _finish_part(self):
+        part, self._part = self._part, None
+        if part['kind'] == 'file':
+            part['sink'].seek(0)
+            self._form.add_file(part['name'], part['filename'], part['content_type'], part['sink'], part['size'])
+        elif part['kind'] == 'field':
+            self._form.add_field(part['name'], part['sink'])
+
+    def _discard_part(self):
+        if self._part and self._part['kind'] == 'file':
+            self._part['sink'].close()
+        self._part = None
+
+
+def iter_base64_chunks(text, chunk_size=BASE64_CHUNK_SIZE):
+    """
+    Decode a base64 string in chunks
+
+    Args:
+        text (str): Base64 data (line breaks are tolerated)
+        chunk_size (int): Characters decoded per chunk, a multiple of 4
+
+    Yields:
+        bytes: Consecutive pieces of the decoded data
+
+    Raises:
+        MultipartError: If the data is not valid base64
+    """
+    if '\n' in text or '\r' in text or ' ' in text:
+        text = ''.join(text.split())
+    try:
+        for start in range(0, len(text), chunk_size):
+            yield base64.b64decode(text[start:start + chunk_size], validate=True)
+    except binascii.Error:
+        raise MultipartError('Request body is not valid base64')
+
+
+def parse_multipart_event(event, content_type, max_body_size=MAX_BODY_SIZE, **limits):
+    """
+    Parse the multipart body of an API Gateway proxy event
+
+    Base64-encoded bodies (isBase64Encoded, the usual case for binary
+    uploads) are decoded chunk by chunk into a MultipartParser, so the
+    decoded body never exists in memory as a whole. Other bodies are parsed
+    in place with parse_multipart.
+
+    Args:
+        event (dict): The Lambda proxy event
+        content_type (str): The request Content-Type header
+        max_body_size (int): Maximum decoded body size in bytes
+        **limits: max_file_size, max_field_size, max_parts and (for base64
+                  bodies) spool_threshold
+
+    Returns:
+        dict: {'fields': {...}, 'files': {...}} (see the module docstring)
+
+    Raises:
+        PayloadTooLargeError: If the body or a part exceeds its limit
+        MultipartError: If the body is malformed
+    """
+    body = event.get('body') or ''
+
+    if event.get('isBase64Encoded') and isinstance(body, str):
+        # Decoded size is 3/4 of the encoded length, less padding
+        if len(body) // 4 * 3 - 2 > max_body_size:
+            raise PayloadTooLargeError(f'Request body exceeds the maximum size of {max_body_size} bytes')
+        parser = MultipartParser(get_boundary(content_type), **limits)
+        for chunk in iter_base64_chunks(body):
+            parser.feed(chunk)
+        return parser.close()
+
+    data = _to_bytes(body)
+    if len(data) > max_body_size:
+        raise PayloadTooLargeError(f'Request body exceeds the maximum size of {max_body_size} bytes')
+    limits.pop('spool_threshold', None)
+    return parse_multipart(content_type, data, **limits)
@@ -0,0 +1,202 @@
+"""
+Opaque, tamper-checked pagination cursors for DynamoDB reads
+
+A cursor wraps the LastEvaluatedKey returned by a Scan or Query so that clients
+can ask for the next page without knowing anything about the table's key
+schema. The key is serialized with explicit DynamoDB type tags (S/N/B) so that
+numeric index keys round-trip as Decimal, and the payload is signed with
+HMAC-SHA256 so an edited or forged cursor is rejected instead of being passed
+straight to DynamoDB as ExclusiveStartKey.
+
+The signing key is CURSOR_SECRET. There is no fallback: without it, paginated
+requests fail instead of handing out cursors anyone could forge.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+# Secret used to sign cursors, from the cursor secret in Secrets Manager (see
+# the get_all_movies README). Paginated requests fail while it is unset
+CURSOR_SECRET = os.environ.get('CURSOR_SECRET', '')
+
+# Page size limits for the `limit` query parameter
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '500'))
+
+# Length of the truncated HMAC appended to every cursor
+SIGNATURE_BYTES = 16
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor cannot be decoded or fails the signature check"""
+
+
+class CursorSecretMissingError(RuntimeError):
+    """Raised when a cursor is needed but CURSOR_SECRET is not set"""
+
+
+def _signing_key():
+    if not CURSOR_SECRET:
+        raise CursorSecretMissingError('CURSOR_SECRET is not set, pagination cursors can not be signed')
+    return CURSOR_SECRET.encode('utf-8')
+
+
+def _sign(payload, scope):
+    digest = hmac.new(_signing_key(), scope.encode('utf-8') + b'\x00' + payload, hashlib.sha256)
+    return digest.digest()[:SIGNATURE_BYTES]
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    padding = '=' * (-len(text) % 4)
+    return base64.urlsafe_b64decode(text + padding)
+
+
+def _serialize_key(key):
+    """Convert a LastEvaluatedKey into a JSON-safe dict with type tags"""
+    serialized = {}
+    for name, value in key.items():
+        if isinstance(value, str):
+            serialized[name] = {'S': value}
+        elif isinstance(value, (Decimal, int, float)):
+            serialized[name] = {'N': str(value)}
+        elif isinstance(value, (bytes, bytearray)):
+            serialized[name] = {'B': _b64encode(bytes(value))}
+        else:
+            # boto3 wraps binary keys in a Binary object exposing .value
+            serialized[name] = {'B': _b64encode(bytes(value.value))}
+    return serialized
+
+
+def _deserialize_key(serialized):
+    """Inverse of _serialize_key"""
+    key = {}
+    for name, typed in serialized.items():
+        if not isinstance(typed, dict) or len(typed) != 1:
+            raise InvalidCursorError('Malformed cursor')
+        (type_tag, value), = typed.items()
+        if not isinstance(value, str):
+            raise InvalidCursorError('Malformed cursor')
+        try:
+            if type_tag == 'S':
+                key[name] = value
+            elif type_tag == 'N':
+                key[name] = Decimal(value)
+            elif type_tag == 'B':
+                key[name] = _b64decode(value)
+            else:
+                raise InvalidCursorError('Malformed cursor')
+        except (InvalidOperation, ValueError, binascii.Error):
+            raise InvalidCursorError('Malformed cursor')
+    return key
+
+
+def encode_cursor(last_evaluated_key, scope=''):
+    """
+    Encode a DynamoDB LastEvaluatedKey as an opaque cursor string
+
+    Args:
+        last_evaluated_key (dict): The LastEvaluatedKey from a Scan/Query response
+        scope (str): Identifies the read the cursor belongs to (e.g. an index
+                     name and filter), so a cursor cannot be replayed elsewhere
+
+    Returns:
+        str: URL-safe cursor, or None if there are no more pages
+
+    Raises:
+        CursorSecretMissingError: If CURSOR_SECRET is not set
+    """
+    if not last_evaluated_key:
+        return None
+
+    payload = json.dumps(_serialize_key(last_evaluated_key), separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload, scope))}"
+
+
+def decode_cursor(cursor, scope=''):
+    """
+    Decode and verify a cursor produced by encode_cursor
+
+    Args:
+        cursor (str): The cursor sent back by the client
+        scope (str): Must match the scope the cursor was encoded with
+
+    Returns:
+        dict: A key suitable for ExclusiveStartKey
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed, unsigned or has been
+                            tampered with
+        CursorSecretMissingError: If CURSOR_SECRET is not set
+    """
+    try:
+        payload_part, signature_part = cursor.split('.', 1)
+        payload = _b64decode(payload_part)
+        signature = _b64decode(signature_part)
+    except (ValueError, binascii.Error):
+        raise InvalidCursorError('Malformed cursor')
+
+    if not hmac.compare_digest(signature, _sign(payload, scope)):
+        raise InvalidCursorError('Cursor signature does not match')
+
+    try:
+        serialized = json.loads(payload)
+    except ValueError:
+        raise InvalidCursorError('Malformed cursor')
+
+    if not isinstance(serialized, dict) or not serialized:
+        raise InvalidCursorError('Malformed cursor')
+
+    return _deserialize_key(serialized)
+
+
+def parse_page_params(query_params, scope=''):
+    """
+    Read `limit` and `cursor` from API Gateway query string parameters
+
+    Args:
+        query_params (dict): event['queryStringParameters'] (may be None)
+        scope (str): Cursor scope, see encode_cursor
+
+    Returns:
+        tuple: (limit, exclusive_start_key) where exclusive_start_key is None
+               for the first page
+
+    Raises:
+        ValueError: If `limit` is not a positive integer
+        InvalidCursorError: If `cursor` fails verification
+        CursorSecretMissingError: If CURSOR_SECRET is not set, checked before
+                                  any page is read
+    """
+    query_params = query_params or {}
+    _signing_key()
+
+    limit = DEFAULT_PAGE_SIZE
+    if query_params.get('limit'):
+        try:
+            limit = int(query_params['limit'])
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if limit < 1:
+            raise ValueError('limit must be a positive integer')
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    exclusive_start_key = None
+    if query_params.get('cursor'):
+        exclusive_start_key = decode_cursor(query_params['cursor'], scope)
+
+    return limit, exclusive_start_key
+
+
+def is_paginated_request(query_params):
+    """Return True if the client asked for a single page rather than the full list"""
+    query_params = query_params or {}
+    return 'limit' in query_params or 'cursor' in query_params
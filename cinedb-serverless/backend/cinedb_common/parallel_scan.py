@@ -0,0 +1,164 @@
+"""
+Parallel segmented Scan for full-catalog reads
+
+A sequential Scan reads the table one 1MB page at a time, so its latency grows
+linearly with table size. DynamoDB lets a Scan be split into TotalSegments
+disjoint segments that can be read concurrently; this module runs each segment
+on a thread pool and merges the pages into a single iterator as they arrive.
+
+Workers call the low-level client behind the Table resource
+(table.meta.client), which is thread safe and still returns plain Python
+types, rather than sharing the Table resource itself across threads.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of segments used when the caller does not pass total_segments
+DEFAULT_SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '4'))
+
+# DynamoDB allows at most 1,000,000 segments; anything above a few dozen only
+# adds thread overhead for a table this size
+MAX_SCAN_SEGMENTS = 64
+
+# Pages buffered between the workers and the consumer before workers block
+QUEUE_PAGES_PER_SEGMENT = 2
+
+# How often a blocked worker re-checks whether the consumer has gone away
+_PUT_TIMEOUT_SECONDS = 0.1
+
+_SEGMENT_DONE = object()
+
+
+def resolve_segment_count(total_segments=None):
+    """
+    Clamp a requested segment count to the supported range
+
+    Args:
+        total_segments (int): Requested segments, or None for the default
+
+    Returns:
+        int: A segment count between 1 and MAX_SCAN_SEGMENTS
+    """
+    if total_segments is None:
+        total_segments = DEFAULT_SCAN_SEGMENTS
+    return max(1, min(int(total_segments), MAX_SCAN_SEGMENTS))
+
+
+def scan_segment(table, segment, total_segments, **scan_kwargs):
+    """
+    Yield pages of items from one segment of a Scan
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        segment (int): Zero-based segment number
+        total_segments (int): Total number of segments in the scan
+        **scan_kwargs: Extra Scan parameters (ProjectionExpression,
+                       FilterExpression, Limit, ...)
+
+    Yields:
+        list: The Items of each page, in key order within the segment
+    """
+    client = table.meta.client
+    params = dict(scan_kwargs, TableName=table.name)
+    if total_segments > 1:
+        params['Segment'] = segment
+        params['TotalSegments'] = total_segments
+
+    while True:
+        response = client.scan(**params)
+        yield response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def parallel_scan(table, total_segments=None, max_workers=None, **scan_kwargs):
+    """
+    Scan the whole table using concurrent segments
+
+    Items are yielded as soon as any segment returns a page, so the order is
+    not deterministic. Closing the iterator early (e.g. with itertools.islice)
+    stops the workers after their in-flight request.
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        total_segments (int): Number of Scan segments (default: SCAN_SEGMENTS)
+        max_workers (int): Thread pool size (default: one thread per segment)
+        **scan_kwargs: Extra Scan parameters passed to every segment
+
+    Yields:
+        dict: Each item in the table
+
+    Raises:
+        Exception: Any error raised by a segment is re-raised in the caller
+    """
+    total_segments = resolve_segment_count(total_segments)
+
+    # Nothing to parallelize - scan inline without starting threads
+    if total_segments == 1:
+        for items in scan_segment(table, 0, 1, **scan_kwargs):
+            yield from items
+        return
+
+    pages = queue.Queue(maxsize=total_segments * QUEUE_PAGES_PER_SEGMENT)
+    stop = threading.Event()
+
+    def put(entry):
+        # Block while the consumer is busy, but give up if it has gone away
+        while not stop.is_set():
+            try:
+                pages.put(entry, timeout=_PUT_TIMEOUT_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run_segment(segment):
+        try:
+            for items in scan_segment(table, segment, total_segments, **scan_kwargs):
+                if not put(items):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers or total_segments,
+        thread_name_prefix='dynamodb-scan'
+    )
+    try:
+        for segment in range(total_segments):
+            executor.submit(run_segment, segment)
+
+        remaining = total_segments
+        while remaining:
+            entry = pages.get()
+            if entry is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(entry, Exception):
+                raise entry
+            else:
+                yield from entry
+    finally:
+        stop.set()
+        executor.shutdown(wait=False)
+
+
+def scan_all(table, total_segments=None, max_workers=None, **scan_kwargs):
+    """
+    Convenience wrapper returning every item of a parallel scan as a list
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        total_segments (int): Number of Scan segments (default: SCAN_SEGMENTS)
+        max_workers (int): Thread pool size (default: one thread per segment)
+        **scan_kwargs: Extra Scan parameters passed to every segment
+
+    Returns:
+        list: All items in the table
+    """
+    return list(parallel_scan(table, total_segments, max_workers, **scan_kwargs))
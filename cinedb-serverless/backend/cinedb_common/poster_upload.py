@@ -0,0 +1,245 @@
+"""
+Direct-to-S3 poster uploads with presigned POST/PUT requests
+
+Sending a poster through API Gateway costs the base64 overhead, Lambda memory
+and duration for every upload, and caps posters at the API Gateway payload
+limit. Instead, generate_presigned_url hands the browser a short-lived upload
+that S3 itself enforces:
+
+    1. POST /presigned {"action": "upload", "contentType": "image/jpeg"}
+       -> create_upload(): a presigned POST policy (or PUT URL) for
+          posters/<movie id>/<random>.jpg, limited to that content type
+          and to 1..MAX_POSTER_SIZE bytes
+    2. The browser uploads the file straight to S3
+    3. add_movie / update_movie receive only {"poster_key": ...} and check it
+       with verify_upload(), a single HEAD request
+
+Keys are scoped to a movie ID: an update only accepts keys under its own
+movie, and add_movie creates the movie with the ID the upload was issued for.
+"""
+
+import os
+import re
+import uuid
+
+# Content types accepted for posters and the extension used in their keys
+POSTER_CONTENT_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif'
+}
+
+# Largest poster accepted by a direct upload (API Gateway bodies stop at 10MB)
+MAX_POSTER_SIZE = int(os.environ.get('MAX_POSTER_SIZE', str(20 * 1024 * 1024)))
+
+# Lifetime of an upload policy in seconds
+UPLOAD_EXPIRATION = int(os.environ.get('UPLOAD_EXPIRATION', '900'))
+
+POSTER_PREFIX = 'posters/'
+
+UPLOAD_METHODS = ('POST', 'PUT')
+
+_S3_URL_PATTERN = re.compile(r'https?://[^/]+\.amazonaws\.com/([^?]+)')
+# Movie IDs are UUIDs, but any key-safe ID is accepted
+_MOVIE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+_POSTER_KEY_PATTERN = re.compile(r'^' + re.escape(POSTER_PREFIX) + r'([A-Za-z0-9_-]{1,64})/[0-9a-f]{32}\.[a-z0-9]+$')
+_EXTENSION_PATTERN = re.compile(r'^\.[a-z0-9]{1,8}$')
+
+
+class PosterUploadError(ValueError):
+    """Raised for an invalid upload request or an upload that fails verification"""
+
+
+def poster_url(bucket, key):
+    """
+    Build the stored poster URL for an S3 key (same form as upload_file_to_s3)
+
+    Args:
+        bucket (str): S3 bucket name
+        key (str): Object key
+
+    Returns:
+        str: The S3 URL saved in the movie's `poster` attribute
+    """
+    return f"https://{bucket}.s3.amazonaws.com/{key}"
+
+
+def key_from_url(url):
+    """
+    Extract the S3 key from a stored poster URL
+
+    Args:
+        url (str): A poster URL as built by poster_url
+
+    Returns:
+        str: The object key, or None if the URL is not an S3 URL
+    """
+    match = _S3_URL_PATTERN.match(url or '')
+    return match.group(1) if match else None
+
+
+def movie_id_from_key(key):
+    """
+    Extract the movie ID an upload key was issued for
+
+    Args:
+        key (str): A key from create_upload
+
+    Returns:
+        str: The movie ID
+
+    Raises:
+        PosterUploadError: If the key was not issued by create_upload
+    """
+    match = _POSTER_KEY_PATTERN.match(key or '')
+    if not match:
+        raise PosterUploadError('Invalid poster key')
+    return match.group(1)
+
+
+def new_poster_key(movie_id, extension):
+    """
+    Build a fresh poster key for a movie
+
+    Every poster version gets its own key, so cached copies of an old poster
+    (and its variants) never shadow a new one.
+
+    Args:
+        movie_id (str): Movie the poster belongs to
+        extension (str): File extension, e.g. '.jpg'; '.img' if unusable
+
+    Returns:
+        str: 'posters/<movie id>/<random>.<ext>'
+    """
+    extension = (extension or '').lower()
+    if not _EXTENSION_PATTERN.match(extension):
+        extension = '.img'
+    return f"{POSTER_PREFIX}{movie_id}/{uuid.uuid4().hex}{extension}"
+
+
+def create_upload(s3_client, bucket, content_type, movie_id=None, method='POST', size=None,
+                  expires_in=UPLOAD_EXPIRATION):
+    """
+    Issue a presigned upload for one poster
+
+    POST policies are preferred: S3 enforces the content type and the size
+    range itself. PUT URLs sign the content type and the exact size the
+    client announced; verify_upload checks both afterwards in either case.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket (str): Poster bucket
+        content_type (str): MIME type of the poster, one of POSTER_CONTENT_TYPES
+        movie_id (str): Movie the poster belongs to; a new ID is issued when
+                        omitted (for a movie that is about to be added)
+        method (str): 'POST' or 'PUT'
+        size (int): Poster size in bytes (required for PUT)
+        expires_in (int): Lifetime of the upload in seconds
+
+    Returns:
+        dict: method, url, key, movieId, expiresIn, maxSize, plus `fields`
+              (form fields to send before the file) for POST or `headers`
+              (headers to send with the body) for PUT
+
+    Raises:
+        PosterUploadError: If a parameter is invalid
+    """
+    method = (method or 'POST').upper()
+    if method not in UPLOAD_METHODS:
+        raise PosterUploadError(f"'method' must be one of: {', '.join(UPLOAD_METHODS)}")
+    if content_type not in POSTER_CONTENT_TYPES:
+        raise PosterUploadError(
+            f"'contentType' must be one of: {', '.join(POSTER_CONTENT_TYPES)}"
+        )
+    if movie_id is None:
+        movie_id = str(uuid.uuid4())
+    elif not _MOVIE_ID_PATTERN.match(movie_id):
+        raise PosterUploadError("'movieId' must be a movie ID")
+
+    key = new_poster_key(movie_id, POSTER_CONTENT_TYPES[content_type])
+    upload = {
+        'method': method,
+        'key': key,
+        'movieId': movie_id,
+        'expiresIn': expires_in,
+        'maxSize': MAX_POSTER_SIZE
+    }
+
+    if method == 'POST':
+        post = s3_client.generate_presigned_post(
+            Bucket=bucket,
+            Key=key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, MAX_POSTER_SIZE]
+            ],
+            ExpiresIn=expires_in
+        )
+        upload['url'] = post['url']
+        upload['fields'] = post['fields']
+        return upload
+
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise PosterUploadError("'size' is required for PUT uploads")
+    if not 1 <= size <= MAX_POSTER_SIZE:
+        raise PosterUploadError(f"'size' must be between 1 and {MAX_POSTER_SIZE} bytes")
+
+    upload['url'] = s3_client.generate_presigned_url(
+        'put_object',
+        Params={'Bucket': bucket, 'Key': key, 'ContentType': content_type, 'ContentLength': size},
+        ExpiresIn=expires_in
+    )
+    upload['headers'] = {'Content-Type': content_type}
+    return upload
+
+
+def verify_upload(s3_client, bucket, key, movie_id=None):
+    """
+    Check an uploaded poster with a HEAD request before saving its URL
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket (str): Poster bucket
+        key (str): Key returned by create_upload
+        movie_id (str): Movie being updated; the key must belong to it
+                        (None when adding, where the key decides the ID)
+
+    Returns:
+        dict: movie_id, key, url, size and content_type of the poster
+
+    Raises:
+        PosterUploadError: If the key is invalid, belongs to another movie,
+                           or the object is missing or not a valid poster
+        ClientError: For other S3 errors
+    """
+    from botocore.exceptions import ClientError
+
+    key_movie_id = movie_id_from_key(key)
+    if movie_id is not None and key_movie_id != movie_id:
+        raise PosterUploadError('Poster key belongs to a different movie')
+
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            raise PosterUploadError('Poster has not been uploaded')
+        raise
+
+    size = head.get('ContentLength', 0)
+    content_type = head.get('ContentType', '')
+    if content_type not in POSTER_CONTENT_TYPES:
+        raise PosterUploadError(f'Uploaded poster has an unsupported content type: {content_type}')
+    if not 1 <= size <= MAX_POSTER_SIZE:
+        raise PosterUploadError(f'Uploaded poster must be between 1 and {MAX_POSTER_SIZE} bytes')
+
+    return {
+        'movie_id': key_movie_id,
+        'key': key,
+        'url': poster_url(bucket, key),
+        'size': size,
+        'content_type': content_type
+    }
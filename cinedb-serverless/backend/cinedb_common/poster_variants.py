@@ -0,0 +1,319 @@
+"""
+Poster derivatives: fixed-width thumbnails in modern formats
+
+Posters are stored as uploaded, often multi-megabyte PNGs, while the grids
+draw them a couple of hundred pixels wide. When a poster is uploaded,
+render_variants() resizes it to POSTER_WIDTHS in each of POSTER_FORMATS
+(AVIF and WebP where the Pillow build supports them, and JPEG for everything
+else), and store_variants() writes them under predictable keys:
+
+    variants/<movie id>/<version>/<width>w.<ext>
+
+The movie item records what exists in a `posterVariants` map (prefix, widths,
+formats; also saved next to the variants as a manifest), so list endpoints can build per-size URLs and `srcset` strings
+without listing S3 (see variant_keys and build_srcset). The version comes from
+the source object, so a new poster never collides with cached variants of the
+old one and variants can be served with an immutable Cache-Control.
+
+Rendering needs Pillow, which is not part of the Lambda runtime; it is
+imported lazily so the URL helpers work without it.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+
+# Widths in pixels; posters are never upscaled
+POSTER_WIDTHS = tuple(
+    int(width) for width in os.environ.get('POSTER_WIDTHS', '160,320,480').split(',') if width.strip()
+)
+
+# Preferred formats, best compression first; unsupported ones are skipped
+POSTER_FORMATS = tuple(
+    name.strip().lower() for name in os.environ.get('POSTER_FORMATS', 'avif,webp,jpeg').split(',') if name.strip()
+)
+
+VARIANT_PREFIX = 'variants/'
+
+# Written after the variants; its presence means they are complete
+MANIFEST_NAME = 'manifest.json'
+
+# Variant keys are versioned, so they never change once written
+VARIANT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Pillow format name, file extension, MIME type and save options per format
+FORMAT_SETTINGS = {
+    'avif': ('AVIF', '.avif', 'image/avif', {'quality': 55, 'speed': 8}),
+    'webp': ('WEBP', '.webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', '.jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+
+# Width of the URL list endpoints return as a single `posterThumbnail`
+THUMBNAIL_WIDTH = 320
+
+_VERSION_PATTERN = re.compile(r'([0-9a-f]{32})\.[a-z0-9]+$')
+
+
+def supported_formats():
+    """
+    Return the configured formats the installed Pillow can encode
+
+    Returns:
+        tuple: Format names in POSTER_FORMATS order (JPEG is always available)
+    """
+    from PIL import features
+
+    available = []
+    for name in POSTER_FORMATS:
+        if name not in FORMAT_SETTINGS:
+            continue
+        if name in ('avif', 'webp') and not features.check(name):
+            continue
+        available.append(name)
+    return tuple(available)
+
+
+def variant_version(source_key):
+    """
+    Derive the variant version from the source poster key
+
+    Keys issued by poster_upload already end in a random token, which is
+    reused; other keys are hashed.
+
+    Args:
+        source_key (str): S3 key of the original poster
+
+    Returns:
+        str: A short token that changes whenever the poster does
+    """
+    match = _VERSION_PATTERN.search(source_key)
+    if match:
+        return match.group(1)[:12]
+    return hashlib.sha256(source_key.encode('utf-8')).hexdigest()[:12]
+
+
+def variant_key(prefix, width, format_name):
+    """
+    Build the S3 key of one variant
+
+    Args:
+        prefix (str): The `prefix` of a posterVariants record
+        width (int): Variant width in pixels
+        format_name (str): A FORMAT_SETTINGS name
+
+    Returns:
+        str: e.g. 'variants/<movie id>/<version>/320w.webp'
+    """
+    return f"{prefix}{int(width)}w{FORMAT_SETTINGS[format_name][1]}"
+
+
+def variant_keys(record):
+    """
+    List the variant keys a posterVariants record describes
+
+    Args:
+        record (dict): The movie's `posterVariants` attribute
+
+    Returns:
+        list: (width, format name, key) tuples, narrowest first
+    """
+    return [
+        (int(width), format_name, variant_key(record['prefix'], width, format_name))
+        for format_name in record['formats']
+        for width in sorted(int(width) for width in record['widths'])
+    ]
+
+
+def build_srcset(record, url_for_key):
+    """
+    Build per-format `srcset` strings and a thumbnail URL for a movie
+
+    Args:
+        record (dict): The movie's `posterVariants` attribute
+        url_for_key (dict or callable): Maps a variant key to its URL
+
+    Returns:
+        tuple: ({MIME type: 'url 160w, url 320w, ...'}, thumbnail URL), where
+               the thumbnail is the THUMBNAIL_WIDTH variant (or the nearest
+               one) in the most widely supported format
+    """
+    lookup = url_for_key.get if isinstance(url_for_key, dict) else url_for_key
+    srcset = {}
+    for width, format_name, key in variant_keys(record):
+        mime_type = FORMAT_SETTINGS[format_name][2]
+        entry = f"{lookup(key)} {width}w"
+        srcset[mime_type] = f"{srcset[mime_type]}, {entry}" if mime_type in srcset else entry
+
+    widths = sorted(int(width) for width in record['widths'])
+    thumbnail_width = min(widths, key=lambda width: (abs(width - THUMBNAIL_WIDTH), width))
+    fallback = record['formats'][-1]
+    thumbnail = lookup(variant_key(record['prefix'], thumbnail_width, fallback))
+    return srcset, thumbnail
+
+
+def render_variants(data, widths=POSTER_WIDTHS, formats=None):
+    """
+    Resize a poster to each width and encode it in each format
+
+    The image is decoded once. JPEG sources are decoded at reduced scale
+    when the largest variant allows it (Image.draft), and each width is
+    resized from the previous, larger one rather than from the original.
+
+    Args:
+        data (bytes): The original poster
+        widths (tuple): Target widths in pixels; widths above the poster's
+                        own width are replaced by the poster's width
+        formats (tuple): Format names (default: supported_formats())
+
+    Returns:
+        tuple: (widths rendered, {(width, format name): encoded bytes})
+
+    Raises:
+        ValueError: If the data is not an image Pillow can read
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    formats = formats or supported_formats()
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Both sides stay at least as large as the widest variant, so the
+        # result is still wide enough after an EXIF rotation
+        image.draft('RGB', (max(widths), max(widths)))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f'Poster is not a readable image: {e}')
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    targets = sorted({min(int(width), image.width) for width in widths}, reverse=True)
+    rendered = {}
+    current = image
+    for width in targets:
+        if width != current.width:
+            height = max(1, round(current.height * width / current.width))
+            current = current.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+        for format_name in formats:
+            pil_format, _, _, options = FORMAT_SETTINGS[format_name]
+            frame = current
+            if pil_format == 'JPEG' and frame.mode == 'RGBA':
+                # JPEG has no alpha channel; flatten onto white
+                background = Image.new('RGB', frame.size, (255, 255, 255))
+                background.paste(frame, mask=frame.getchannel('A'))
+                frame = background
+            output = io.BytesIO()
+            frame.save(output, pil_format, **options)
+            rendered[(width, format_name)] = output.getvalue()
+
+    return tuple(sorted(targets)), rendered
+
+
+def variant_prefix(movie_id, source_key):
+    """
+    Return the key prefix of a poster's variants
+
+    Args:
+        movie_id (str): Movie the poster belongs to
+        source_key (str): S3 key of the original poster
+
+    Returns:
+        str: e.g. 'variants/<movie id>/<version>/'
+    """
+    return f"{VARIANT_PREFIX}{movie_id}/{variant_version(source_key)}/"
+
+
+def store_variants(s3_client, bucket, movie_id, source_key, data, widths=POSTER_WIDTHS, formats=None):
+    """
+    Render a poster's variants and upload them to S3
+
+    The record is also written as `<prefix>manifest.json`, last, so a
+    manifest only exists once every variant does (see load_variants).
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket (str): Poster bucket
+        movie_id (str): Movie the poster belongs to
+        source_key (str): S3 key of the original poster
+        data (bytes): The original poster
+        widths (tuple): Target widths in pixels
+        formats (tuple): Format names (default: supported_formats())
+
+    Returns:
+        dict: The posterVariants record to save on the movie item, with
+              prefix, widths, formats, source and total bytes written
+    """
+    formats = formats or supported_formats()
+    rendered_widths, rendered = render_variants(data, widths, formats)
+    prefix = variant_prefix(movie_id, source_key)
+
+    total_bytes = 0
+    for (width, format_name), body in rendered.items():
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=variant_key(prefix, width, format_name),
+            Body=body,
+            ContentType=FORMAT_SETTINGS[format_name][2],
+            CacheControl=VARIANT_CACHE_CONTROL
+        )
+        total_bytes += len(body)
+
+    record = {
+        'prefix': prefix,
+        'widths': list(rendered_widths),
+        'formats': list(formats),
+        'source': source_key,
+        'bytes': total_bytes
+    }
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=f"{prefix}{MANIFEST_NAME}",
+        Body=json.dumps(record).encode('utf-8'),
+        ContentType='application/json'
+    )
+    return record
+
+
+def load_variants(s3_client, bucket, movie_id, source_key):
+    """
+    Read the variants record of a poster, if they have been rendered
+
+    Writers call this when they attach a poster that was uploaded earlier
+    (process_poster may have finished before the movie item was written).
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket (str): Poster bucket
+        movie_id (str): Movie the poster belongs to
+        source_key (str): S3 key of the original poster
+
+    Returns:
+        dict: The posterVariants record, or None if not rendered (yet)
+    """
+    from botocore.exceptions import ClientError
+
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=f"{variant_prefix(movie_id, source_key)}{MANIFEST_NAME}")
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+    return json.loads(response['Body'].read())
+
+
+def delete_variants(s3_client, bucket, record):
+    """
+    Delete the variants (and manifest) described by a posterVariants record
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket (str): Poster bucket
+        record (dict): The movie's `posterVariants` attribute
+    """
+    keys = [key for _, _, key in variant_keys(record)]
+    keys.append(f"{record['prefix']}{MANIFEST_NAME}")
+    s3_client.delete_objects(
+        Bucket=bucket,
+        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+    )
@@ -0,0 +1,271 @@
+"""
+Presigned poster URLs with local SigV4 signing and a time-bucketed cache
+
+boto3's generate_presigned_url recomputes the whole SigV4 derivation for every
+call, and every call produces a different URL because the signature embeds
+the current second. Listing N movies therefore costs N signatures and hands
+CloudFront N URLs it has never seen before.
+
+PresignedUrlCache signs GET URLs locally with the process credentials and
+pins the signing time to the start of a time bucket that lasts
+`reuse_fraction` of the URL lifetime. Within a bucket the same
+(bucket, key, expiry) always maps to the same URL, which is served from an LRU
+cache; every URL handed out still has at least (1 - reuse_fraction) of its
+lifetime left. The derived signing key is cached per day and region, so even
+a cache miss is a single HMAC.
+
+If credentials cannot be resolved locally, or the bucket name is not usable
+as a virtual host, the cache falls back to s3_client.generate_presigned_url.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+# Default lifetime of a presigned URL and share of it a URL may be reused for
+DEFAULT_EXPIRATION = int(os.environ.get('DEFAULT_EXPIRATION', '3600'))
+PRESIGN_REUSE_FRACTION = float(os.environ.get('PRESIGN_REUSE_FRACTION', '0.5'))
+
+# Maximum number of signed URLs kept per container
+PRESIGN_CACHE_SIZE = int(os.environ.get('PRESIGN_CACHE_SIZE', '4096'))
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+
+
+def _hmac_sha256(key, message):
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _s3_host(bucket, region):
+    if region in (None, '', 'us-east-1'):
+        return f'{bucket}.s3.amazonaws.com'
+    return f'{bucket}.s3.{region}.amazonaws.com'
+
+
+class PresignedUrlCache:
+    """
+    LRU cache of presigned S3 GET URLs, reused within a time bucket
+
+    Args:
+        s3_client: boto3 S3 client, used for its region and as a fallback signer
+        expires_in (int): Default URL lifetime in seconds
+        reuse_fraction (float): Share of the lifetime a URL is reused for (0-1)
+        max_entries (int): Maximum number of cached URLs
+        credentials: botocore credentials; resolved from the default boto3
+                     session on first use when omitted
+        clock (callable): Returns the current Unix time (for tests/benchmarks)
+    """
+
+    def __init__(self, s3_client, expires_in=DEFAULT_EXPIRATION, reuse_fraction=PRESIGN_REUSE_FRACTION,
+                 max_entries=PRESIGN_CACHE_SIZE, credentials=None, clock=time.time):
+        if not 0 < reuse_fraction < 1:
+            raise ValueError('reuse_fraction must be between 0 and 1')
+
+        self.s3_client = s3_client
+        self.expires_in = expires_in
+        self.reuse_fraction = reuse_fraction
+        self.max_entries = max_entries
+        self.clock = clock
+
+        self._credentials = credentials
+        self._credentials_resolved = credentials is not None
+        self._entries = OrderedDict()
+        self._signing_keys = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries)
+            }
+
+    def get_url(self, bucket, key, expires_in=None):
+        """
+        Return a presigned GET URL for one object
+
+        Args:
+            bucket (str): S3 bucket name
+            key (str): S3 object key
+            expires_in (int): URL lifetime in seconds (default: the cache's)
+
+        Returns:
+            str: The presigned URL
+        """
+        return self.sign_many(bucket, [key], expires_in)[key]
+
+    def signing_window(self, expires_in=None):
+        """
+        Return the signing time of the URLs handed out now
+
+        URLs signed within one window are identical, so a response built
+        from them stays valid as long as the window and its data do. Used
+        in ETags.
+
+        Args:
+            expires_in (int): URL lifetime in seconds (default: the cache's)
+
+        Returns:
+            int: Unix time the current window started
+        """
+        expires_in = expires_in or self.expires_in
+        now = int(self.clock())
+        bucket_seconds = max(1, int(expires_in * self.reuse_fraction))
+        return now - now % bucket_seconds
+
+    def sign_many(self, bucket, keys, expires_in=None):
+        """
+        Presign a batch of keys with one timestamp and one signing key
+
+        Args:
+            bucket (str): S3 bucket name
+            keys (iterable): S3 object keys; duplicates are signed once
+            expires_in (int): URL lifetime in seconds (default: the cache's)
+
+        Returns:
+            dict: Mapping of key -> presigned URL
+        """
+        expires_in = expires_in or self.expires_in
+
+        # All URLs in the same bucket share a signing time, so they are stable
+        signing_time = self.signing_window(expires_in)
+
+        frozen = self._frozen_credentials()
+        access_key = frozen.access_key if frozen else None
+
+        urls = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in urls:
+                    continue
+                cache_key = (bucket, key, expires_in, signing_time, access_key)
+                url = self._entries.get(cache_key)
+                if url is None:
+                    missing.append(key)
+                    urls[key] = None
+                else:
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    urls[key] = url
+
+        for key in missing:
+            if frozen and '.' not in bucket:
+                urls[key] = self._sign_locally(bucket, key, expires_in, signing_time, frozen)
+            else:
+                urls[key] = self.s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': bucket, 'Key': key},
+                    ExpiresIn=expires_in
+                )
+
+        if missing:
+            with self._lock:
+                for key in missing:
+                    self._entries[(bucket, key, expires_in, signing_time, access_key)] = urls[key]
+                    self.misses += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return urls
+
+    def clear(self):
+        """Drop every cached URL (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _frozen_credentials(self):
+        if not self._credentials_resolved:
+            self._credentials_resolved = True
+            try:
+                import boto3
+                self._credentials = boto3.session.Session().get_credentials()
+            except Exception as e:
+                print(f"Falling back to boto3 presigning: {str(e)}")
+                self._credentials = None
+        if self._credentials is None:
+            return None
+        # Refreshable (e.g. role) credentials rotate themselves here
+        return self._credentials.get_frozen_credentials()
+
+    def _signing_key(self, secret_key, date_stamp, region):
+        cache_key = (secret_key, date_stamp, region)
+        signing_key = self._signing_keys.get(cache_key)
+        if signing_key is None:
+            k_date = _hmac_sha256(f'AWS4{secret_key}'.encode('utf-8'), date_stamp)
+            k_region = _hmac_sha256(k_date, region)
+            k_service = _hmac_sha256(k_region, 's3')
+            signing_key = _hmac_sha256(k_service, 'aws4_request')
+            # Only the latest key is kept; it changes at most once a day
+            self._signing_keys = {cache_key: signing_key}
+        return signing_key
+
+    def _sign_locally(self, bucket, key, expires_in, signing_time, credentials):
+        region = self.s3_client.meta.region_name or 'us-east-1'
+        host = _s3_host(bucket, region)
+        amz_date = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(signing_time))
+        date_stamp = amz_date[:8]
+        scope = f'{date_stamp}/{region}/s3/aws4_request'
+
+        query = {
+            'X-Amz-Algorithm': ALGORITHM,
+            'X-Amz-Credential': f'{credentials.access_key}/{scope}',
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(expires_in),
+            'X-Amz-SignedHeaders': 'host',
+        }
+        if credentials.token:
+            query['X-Amz-Security-Token'] = credentials.token
+        canonical_query = '&'.join(
+            f"{quote(name, safe='')}={quote(value, safe='')}" for name, value in sorted(query.items())
+        )
+
+        canonical_uri = '/' + quote(key, safe='/')
+        canonical_request = '\n'.join([
+            'GET', canonical_uri, canonical_query, f'host:{host}\n', 'host', 'UNSIGNED-PAYLOAD'
+        ])
+        string_to_sign = '\n'.join([
+            ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+        ])
+
+        signing_key = self._signing_key(credentials.secret_key, date_stamp, region)
+        signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+        return f'https://{host}{canonical_uri}?{canonical_query}&X-Amz-Signature={signature}'
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_presign_cache(s3_client):
+    """
+    Return the process-wide PresignedUrlCache, creating it on first use
+
+    Handlers deployed together (lambda_functions/api_router) then reuse each
+    other's URLs: a poster signed for the movie list is served from the cache
+    on the movie's detail page.
+
+    Args:
+        s3_client: boto3 S3 client; the first caller's is used
+
+    Returns:
+        PresignedUrlCache: The shared cache
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = PresignedUrlCache(s3_client)
+        return _shared_cache
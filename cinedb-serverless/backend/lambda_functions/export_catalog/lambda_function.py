@@ -0,0 +1,69 @@
+import json
+import os
+from cinedb_common.aws_clients import lazy_client, lazy_table
+from cinedb_common.catalog_export import EXPORT_FIELDS, ExportError, export_catalog
+from cinedb_common.projection import InvalidFieldsError, parse_fields_param
+
+# Environment variables with default values
+# These can be overridden in the Lambda function configuration
+DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
+S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Scan segments, each exported by its own worker
+EXPORT_SEGMENTS = int(os.environ.get('EXPORT_SEGMENTS', '8'))
+
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+
+def lambda_handler(event, context):
+    """
+    Lambda handler function - export the catalog to S3
+
+    Runs on a direct invocation or a schedule. Every movie is read with a
+    segmented Scan and streamed to S3 as compressed NDJSON, CSV or Parquet
+    files (cinedb_common.catalog_export), followed by a manifest.
+
+    Event (all optional):
+        format: 'ndjson' (default), 'csv' or 'parquet'
+        compression: 'gzip' or 'none' for NDJSON and CSV; 'zstd' (default),
+                     'snappy', 'gzip' or 'none' for Parquet
+        fields: Comma-separated subset of EXPORT_FIELDS ('id' is always included)
+        segments: Scan segments and workers (default: EXPORT_SEGMENTS)
+
+    Args:
+        event (dict): The export options
+        context (LambdaContext): The runtime information of the Lambda function
+
+    Returns:
+        dict: Export summary with a presigned link to the manifest, or an error
+    """
+    try:
+        fields = parse_fields_param(event, EXPORT_FIELDS)
+        manifest = export_catalog(
+            table, s3_client, S3_BUCKET,
+            file_format=event.get('format', 'ndjson'),
+            compression=event.get('compression'),
+            fields=fields,
+            total_segments=event.get('segments', EXPORT_SEGMENTS),
+            progress=lambda stats: print(json.dumps(stats))
+        )
+    except (ExportError, InvalidFieldsError) as e:
+        print(f"Export rejected: {str(e)}")
+        return {'error': str(e)}
+
+    summary = {
+        'exportId': manifest['exportId'],
+        'format': manifest['format'],
+        'compression': manifest['compression'],
+        'rows': manifest['rows'],
+        'bytes': manifest['bytes'],
+        'files': len(manifest['files']),
+        'seconds': manifest['seconds'],
+        'rowsPerSecond': manifest['rowsPerSecond'],
+        'manifestKey': manifest['manifestKey'],
+        'manifestUrl': manifest['manifestUrl']
+    }
+    print(json.dumps({key: value for key, value in summary.items() if key != 'manifestUrl'}))
+    return summary
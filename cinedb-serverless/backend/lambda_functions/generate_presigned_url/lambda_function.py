@@ -1,8 +1,8 @@
 import json
-import boto3
 import os
 import re
-from botocore.exceptions import ClientError
+from cinedb_common.aws_clients import lazy_client
+from cinedb_common.poster_upload import PosterUploadError, create_upload
 
 # Environment variables with default values
 # These can be overridden in the Lambda function configuration
@@ -11,8 +11,8 @@ S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 DEFAULT_EXPIRATION = int(os.environ.get('DEFAULT_EXPIRATION', '3600'))  # Default: 1 hour
 
-# Initialize AWS clients using the specified region
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+s3_client = lazy_client('s3', AWS_REGION)
 
 # Regex pattern to extract the S3 key from a full URL
 url_pattern = re.compile(r'https?://[^/]+\.amazonaws\.com/([^?]+)')
@@ -49,6 +49,73 @@ def generate_presigned_url(key, expiration=DEFAULT_EXPIRATION):
         print(f"Error generating presigned URL: {str(e)}")
         return None
 
+def get_upload_request(event):
+    """
+    Return the parameters of a poster upload request
+
+    Upload requests carry `action=upload` in the query string or JSON body,
+    along with contentType and optionally movieId, method and size.
+
+    Args:
+        event (dict): The event data passed to the function
+
+    Returns:
+        dict: The merged request parameters, or None for a presigned GET request
+    """
+    params = dict(event.get('queryStringParameters') or {})
+    body = event.get('body')
+    if body:
+        try:
+            body = json.loads(body) if isinstance(body, str) else body
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            params.update(body)
+
+    if params.get('action') != 'upload':
+        return None
+    return params
+
+def create_upload_response(params):
+    """
+    Issue a presigned POST policy or PUT URL for a direct poster upload
+
+    Args:
+        params (dict): Parameters from get_upload_request
+
+    Returns:
+        dict: API Gateway response object with the upload details
+    """
+    try:
+        upload = create_upload(
+            s3_client,
+            S3_BUCKET,
+            params.get('contentType'),
+            movie_id=params.get('movieId'),
+            method=params.get('method', 'POST'),
+            size=params.get('size')
+        )
+    except PosterUploadError as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)})
+        }
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'GET,POST',
+            'Access-Control-Allow-Headers': 'Content-Type'
+        },
+        'body': json.dumps(upload)
+    }
+
 def lambda_handler(event, context):
     """
     Lambda handler function to generate a presigned URL for an S3 object
@@ -58,12 +125,19 @@ def lambda_handler(event, context):
                      - pathParameters.key: The S3 object key or full URL
                      - OR queryStringParameters.key: The S3 object key or full URL
                      - OPTIONAL: queryStringParameters.expiration: URL expiration time in seconds
+                     With action=upload (query string or JSON body), issues a
+                     presigned poster upload instead; see create_upload_response
         context (LambdaContext): The runtime information of the Lambda function
         
     Returns:
         dict: API Gateway response object with status code, headers, and body
     """
     try:
+        # Direct-to-S3 poster uploads
+        upload_params = get_upload_request(event)
+        if upload_params is not None:
+            return create_upload_response(upload_params)
+        
         # Extract key and expiration from the event
         key = None
         expiration = DEFAULT_EXPIRATION
@@ -1,9 +1,20 @@
 import json
-import boto3
 import os
-import re
 import decimal
 from botocore.exceptions import ClientError
+from cinedb_common.api_movie import presign_posters, read_fields, to_api_movie
+from cinedb_common.aws_clients import lazy_client, lazy_resource, lazy_table
+from cinedb_common.catalog_version import CatalogVersion
+from cinedb_common.pagination import CursorSecretMissingError, encode_cursor, is_paginated_request, parse_page_params
+from cinedb_common.parallel_scan import parallel_scan
+from cinedb_common.json_stream import batched, encode_list_response
+from cinedb_common.presign_cache import shared_presign_cache
+from cinedb_common.projection import build_projection, parse_fields_param, with_projection
+from cinedb_common.versioning import etag_matches, get_header, version_etag
+from cinedb_common.movie_index import (
+    USE_MOVIE_INDEXES, cursor_scope, matches_genre, parse_movie_filters, plan_query, plan_scan,
+    query_all, query_key_fields, query_page
+)
 
 # Custom JSON encoder to handle Decimal objects returned by DynamoDB
 class DecimalEncoder(json.JSONEncoder):
@@ -23,78 +34,183 @@ DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
 S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 
-# Initialize AWS clients using the specified region
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-table = dynamodb.Table(DYNAMODB_TABLE)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+# Number of movies presigned and encoded together while streaming the response
+PRESIGN_BATCH_SIZE = int(os.environ.get('PRESIGN_BATCH_SIZE', '200'))
 
-# Regex pattern to extract the S3 key from a full URL
-# Example: https://bucket-name.s3.region.amazonaws.com/filename.jpg -> filename.jpg
-url_pattern = re.compile(r'https?://[^/]+\.amazonaws\.com/([^?]+)')
+# Fields returned for each movie, in response order. Only these attributes are
+# read from DynamoDB; the `fields` query parameter can narrow them further.
+LIST_FIELDS = ('id', 'title', 'year', 'duration', 'synopsis', 'rating', 'poster')
 
-def generate_presigned_url(movie):
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+dynamodb = lazy_resource('dynamodb', AWS_REGION)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+
+# Presigned poster URLs are cached per container and reused while fresh
+presign_cache = shared_presign_cache(s3_client)
+
+# Catalog version counter, bumped by every write; drives the ETag
+catalog_version = CatalogVersion(dynamodb)
+
+def iter_all_movies(projection):
     """
-    Generate a presigned URL for the movie poster if it exists
-    
-    This function:
-    1. Checks if the movie has a poster URL
-    2. Extracts the S3 key from the full URL
-    3. Generates a temporary access URL valid for 1 hour
-    4. Adds the URL to the movie object as 'poster_url'
-    
+    Read the whole table with a parallel segmented scan
+
+    Each segment follows LastEvaluatedKey until it is complete, and segments
+    run concurrently (SCAN_SEGMENTS, default 4), so latency no longer grows
+    one 1MB page at a time with the size of the table.
+
     Args:
-        movie (dict): A movie record from DynamoDB
-        
+        projection (dict): Parameters from build_projection
+
+    Returns:
+        iterator: Movie records, yielded as the scan pages arrive
+    """
+    return parallel_scan(table, **projection)
+
+def scan_movie_page(limit, exclusive_start_key=None, projection=None, cursor_scope=''):
+    """
+    Read a single page of movies with one bounded Scan call
+
+    Args:
+        limit (int): Maximum number of items to read
+        exclusive_start_key (dict): Key to resume from, decoded from the cursor
+        projection (dict): Parameters from build_projection, optionally
+                           merged with a FilterExpression
+        cursor_scope (str): Scope the next cursor is signed for
+
+    Returns:
+        tuple: (movies, next_cursor) where next_cursor is None on the last page
+    """
+    scan_params = dict(projection or {}, Limit=limit)
+    if exclusive_start_key:
+        scan_params['ExclusiveStartKey'] = exclusive_start_key
+
+    response = table.scan(**scan_params)
+    return response.get('Items', []), encode_cursor(response.get('LastEvaluatedKey'), cursor_scope)
+
+def query_movies(filters, fields, limit=None, exclusive_start_key=None):
+    """
+    Read the movies matching the browsing filters from the best GSI
+
+    The first Query of every catalogKey shard runs before this function
+    returns, so a table without the index fails here rather than halfway
+    through the response.
+
+    Args:
+        filters (dict): Result of parse_movie_filters
+        fields (tuple): Fields to read
+        limit (int): Page size, or None to read every match
+        exclusive_start_key (dict): Key to resume from, decoded from the cursor
+
+    Returns:
+        tuple: (movies, next_cursor); next_cursor is None on the last page and
+               for unpaginated reads
+    """
+    # The shards are merged by their index keys, so those are read too
+    projection = build_projection(fields + query_key_fields(filters))
+    query_params = with_projection(plan_query(filters), projection)
+
+    if limit:
+        movies, last_key = query_page(table, limit, exclusive_start_key, **query_params)
+        return movies, encode_cursor(last_key, cursor_scope(filters))
+    return query_all(table, **query_params), None
+
+def scan_filtered_movies(filters, fields, limit=None, exclusive_start_key=None):
+    """
+    Filter the catalog with a Scan, for tables without the browsing indexes
+
+    Args:
+        filters (dict): Result of parse_movie_filters
+        fields (tuple): Fields to read
+        limit (int): Page size, or None to read every match
+        exclusive_start_key (dict): Key to resume from, decoded from the cursor
+
+    Returns:
+        tuple: (movies, next_cursor), like query_movies
+    """
+    if filters['genre'] and 'genre' not in fields:
+        # The genre is matched here, so it has to be read
+        fields = fields + ('genre',)
+    scan_params = with_projection(plan_scan(filters), build_projection(fields))
+
+    if limit:
+        movies, next_cursor = scan_movie_page(
+            limit, exclusive_start_key, scan_params, cursor_scope(filters)
+        )
+    else:
+        movies, next_cursor = parallel_scan(table, **scan_params), None
+    return (movie for movie in movies if matches_genre(movie, filters)), next_cursor
+
+def find_movies(filters, fields, limit=None, exclusive_start_key=None):
+    """
+    Read the movies matching the browsing filters
+
+    Uses a Query on the matching GSI, and falls back to a filtered parallel
+    scan when the indexes are disabled (USE_MOVIE_INDEXES=false) or missing.
+
+    Args:
+        filters (dict): Result of parse_movie_filters
+        fields (tuple): Fields to read
+        limit (int): Page size, or None to read every match
+        exclusive_start_key (dict): Key to resume from, decoded from the cursor
+
     Returns:
-        dict: The movie object with an additional 'poster_url' field if applicable
+        tuple: (movies, next_cursor)
     """
-    if 'poster' in movie and movie['poster']:
+    if USE_MOVIE_INDEXES:
         try:
-            # Extract the key from the full URL if it's a full URL
-            match = url_pattern.match(movie['poster'])
-            if match:
-                key = match.group(1)
-            else:
-                # If it's not a full URL, assume it's just the key
-                key = movie['poster']
-            
-            # Generate a presigned URL with 1-hour expiration
-            # This allows temporary access to the private S3 object
-            url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': S3_BUCKET,
-                    'Key': key
-                },
-                ExpiresIn=3600  # Keep to 1 hour (3600 seconds)
-            )
-            
-            # Remove any trailing backslash characters that might be added
-            # This is essential to make the URL usable with proper expiration
-            if url.endswith('\\'):
-                url = url[:-1]
-                
-            # Ensure all backslashes are properly handled (this fixes AWS URL issues)
-            url = url.replace('\\\\', '\\')
-            
-            movie['poster_url'] = url
-        except Exception as e:
-            # If there's an error generating the URL, keep the original poster URL
-            # This ensures the function doesn't fail if S3 access issues occur
-            movie['poster_url'] = movie['poster']
-            print(f"Error generating presigned URL: {str(e)}")
-    
-    return movie
+            return query_movies(filters, fields, limit, exclusive_start_key)
+        except ClientError as e:
+            error = e.response.get('Error', {})
+            if error.get('Code') != 'ValidationException' or 'index' not in error.get('Message', ''):
+                raise
+            print(f"Movie index unavailable, falling back to a filtered scan: {str(e)}")
+    return scan_filtered_movies(filters, fields, limit, exclusive_start_key)
+
+def iter_api_movies(movies, fields=LIST_FIELDS):
+    """
+    Presign and project movies batch by batch, without materializing the list
+
+    Args:
+        movies (iterable): Movie records from DynamoDB
+        fields (tuple): Fields requested by the client
+
+    Yields:
+        dict: "Clean" movie objects for the API response
+    """
+    sign_posters = 'poster' in fields
+    for batch in batched(movies, PRESIGN_BATCH_SIZE):
+        if sign_posters:
+            presign_posters(batch, presign_cache, S3_BUCKET)
+        for movie in batch:
+            yield to_api_movie(movie, fields)
 
 def lambda_handler(event, context):
     """
     Lambda handler function - entry point for the Lambda function
     
     Process:
-    1. Retrieves all movies from DynamoDB using scan operation
-    2. Handles pagination if there are more items than the scan limit
-    3. Generates presigned URLs for each movie's poster image
-    4. Returns the movies as a JSON response with CORS headers
+    1. Retrieves movies from DynamoDB, reading only the requested fields:
+       a Query on a GSI when genre/year/rating filters are given, otherwise a
+       scan of either one page (when `limit` or `cursor` is given) or the
+       whole table
+    2. Generates presigned URLs for the posters in cached batches
+    3. Encodes the movies into the JSON response one at a time, plus a
+       `nextCursor` for paginated requests
+    
+    The response carries an ETag made of the catalog version and the presign
+    window. A request whose If-None-Match still matches it gets 304 after one
+    get_item, without a scan or any presigning.
+    
+    Query string parameters (optional):
+        limit: Page size (default: DEFAULT_PAGE_SIZE, capped at MAX_PAGE_SIZE)
+        cursor: The `nextCursor` value from the previous page
+        genre: Primary genre to browse (case-insensitive)
+        yearFrom, yearTo: Inclusive release year range
+        minRating: Minimum rating
+        fields: Comma-separated subset of LIST_FIELDS to return ('id' is
+                always included)
     
     Args:
         event (dict): The event data passed to the function
@@ -104,48 +220,100 @@ def lambda_handler(event, context):
         dict: API Gateway response object with status code, headers, and body
     """
     try:
-        # Get all movies from DynamoDB using scan operation
-        # Initial scan retrieves the first batch of items (up to 1MB)
-        response = table.scan()
-        movies = response.get('Items', [])
+        query_params = event.get('queryStringParameters') or {}
+        paginated = is_paginated_request(query_params)
+        next_cursor = None
+
+        # Validate the request parameters before touching DynamoDB
+        try:
+            fields = parse_fields_param(query_params, LIST_FIELDS)
+            filters = parse_movie_filters(query_params)
+            if paginated:
+                # Cursors are only valid for the index they were issued by
+                scope = cursor_scope(filters) if filters else ''
+                limit, exclusive_start_key = parse_page_params(query_params, scope)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': str(e)})
+            }
+
+        # Conditional GET: one small read tells whether the client's copy is
+        # still current. The presign window is part of the tag when posters
+        # are returned, so cached poster URLs are never kept past it
+        etag = None
+        version = catalog_version.current()
+        if version is not None:
+            etag = version_etag(version, presign_cache.signing_window() if 'poster' in fields else None)
+            if etag_matches(get_header(event, 'If-None-Match'), etag):
+                return {
+                    'statusCode': 304,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Expose-Headers': 'ETag',
+                        'Cache-Control': 'no-cache',
+                        'ETag': etag
+                    },
+                    'body': ''
+                }
+
+        # The poster attributes are only read when the client wants poster URLs
+        projection = build_projection(read_fields(fields))
+
+        if filters:
+            # Browsing by genre, year or rating - query the matching index
+            if paginated:
+                movies, next_cursor = find_movies(filters, read_fields(fields), limit, exclusive_start_key)
+            else:
+                movies, next_cursor = find_movies(filters, read_fields(fields))
+        elif paginated:
+            movies, next_cursor = scan_movie_page(limit, exclusive_start_key, projection)
+        else:
+            # No page requested - stream the full catalog
+            movies = iter_all_movies(projection)
         
-        # Process any pagination (if there are more items)
-        # DynamoDB scan has a 1MB limit per operation, so we need to handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            movies.extend(response.get('Items', []))
+        # Presign, project and encode the movies batch by batch, so raw items
+        # are released as soon as their JSON has been written
+        body = encode_list_response(
+            'movies',
+            iter_api_movies(movies, fields),
+            {'nextCursor': next_cursor} if paginated else None
+        )
         
-        # Create a "clean" version of each movie for the API
-        api_movies = []
-        for movie in movies:
-            # Generate the URL first
-            generate_presigned_url(movie)
-            
-            # Create a new object with just the fields we need
-            api_movie = {
-                'id': movie['id'],
-                'title': movie['title'],
-                'year': movie.get('year', None),
-                'duration': movie.get('duration', None),
-                'synopsis': movie.get('synopsis', ''),
-                'rating': movie.get('rating', 0),
-                'poster': movie.get('poster_url', '')  # Use the presigned URL directly
-            }
-            api_movies.append(api_movie)
+        headers = {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',  # Allow access from any origin
+            'Access-Control-Allow-Methods': 'GET',
+            'Access-Control-Allow-Headers': 'Content-Type,If-None-Match'
+        }
+        if etag:
+            # Clients and CDNs may keep the body but must revalidate it
+            headers.update({'Access-Control-Expose-Headers': 'ETag', 'Cache-Control': 'no-cache', 'ETag': etag})
         
         # Return the clean objects
         return {
             'statusCode': 200,
+            'headers': headers,
+            'isBase64Encoded': False,
+            'body': body
+        }
+    
+    except CursorSecretMissingError as e:
+        # Fail closed: without the secret no cursor can be issued or verified
+        print(f"Pagination disabled: {str(e)}")
+        return {
+            'statusCode': 500,
             'headers': {
                 'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',  # Allow access from any origin
-                'Access-Control-Allow-Methods': 'GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
+                'Access-Control-Allow-Origin': '*'
             },
-            'isBase64Encoded': False,
-            'body': json.dumps({'movies': api_movies}, cls=DecimalEncoder)
+            'body': json.dumps({'error': 'Pagination is not configured'})
         }
-    
+
     except ClientError as e:
         # Handle specific DynamoDB errors (e.g., table not found, permission issues)
         # Return a 500 status code with error details
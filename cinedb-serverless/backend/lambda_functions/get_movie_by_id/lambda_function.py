@@ -1,9 +1,11 @@
 import json
-import boto3
 import os
 import re
 import decimal
 from botocore.exceptions import ClientError
+from cinedb_common.aws_clients import lazy_client, lazy_table
+from cinedb_common.presign_cache import shared_presign_cache
+from cinedb_common.versioning import etag_matches, get_header, movie_version, version_etag
 
 # Custom JSON encoder to handle Decimal objects returned by DynamoDB
 class DecimalEncoder(json.JSONEncoder):
@@ -23,10 +25,12 @@ DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
 S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 
-# Initialize AWS clients using the specified region
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-table = dynamodb.Table(DYNAMODB_TABLE)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+
+# Presigned poster URLs are cached per container and reused while fresh
+presign_cache = shared_presign_cache(s3_client)
 
 # Regex pattern to extract the S3 key from a full URL
 url_pattern = re.compile(r'https?://[^/]+\.amazonaws\.com/([^?]+)')
@@ -51,21 +55,8 @@ def generate_presigned_url(movie):
                 # If it's not a full URL, assume it's just the key
                 key = movie['poster']
             
-            # Generate a presigned URL with 1-hour expiration
-            url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': S3_BUCKET,
-                    'Key': key
-                },
-                ExpiresIn=3600  # 1 hour
-            )
-            
-            # Handle any backslash issues
-            if url.endswith('\\'):
-                url = url[:-1]
-                
-            url = url.replace('\\\\', '\\')
+            # Reuse a cached presigned URL (valid for up to 1 hour) or sign a new one
+            url = presign_cache.get_url(S3_BUCKET, key)
             
             movie['poster_url'] = url
         except Exception as e:
@@ -144,6 +135,22 @@ def lambda_handler(event, context):
         # Get the movie item
         movie = response['Item']
         
+        # The ETag is the movie's version (sent back as If-Match by editors),
+        # plus the presign window when the body carries a poster URL
+        etag = version_etag(movie_version(movie), presign_cache.signing_window() if movie.get('poster') else None)
+        if etag_matches(get_header(event, 'If-None-Match'), etag):
+            # The client's copy is current: skip presigning and the body
+            return {
+                'statusCode': 304,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Expose-Headers': 'ETag',
+                    'Cache-Control': 'no-cache',
+                    'ETag': etag
+                },
+                'body': ''
+            }
+        
         # Generate presigned URL for the poster
         generate_presigned_url(movie)
         
@@ -160,7 +167,8 @@ def lambda_handler(event, context):
             'cast': movie.get('cast', ''),
             'poster_url': movie.get('poster_url', ''),  # Use the presigned URL with correct field name
             'createdAt': movie.get('createdAt', ''),
-            'updatedAt': movie.get('updatedAt', '')
+            'updatedAt': movie.get('updatedAt', ''),
+            'version': movie_version(movie)
         }
         
         # Return the movie details
@@ -170,7 +178,11 @@ def lambda_handler(event, context):
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
+                'Access-Control-Allow-Headers': 'Content-Type,If-None-Match',
+                # Sent back as If-Match by update_movie clients
+                'Access-Control-Expose-Headers': 'ETag',
+                'Cache-Control': 'no-cache',
+                'ETag': etag
             },
             'body': json.dumps(api_movie, cls=DecimalEncoder)
         }
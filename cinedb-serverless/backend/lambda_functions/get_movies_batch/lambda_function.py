@@ -0,0 +1,183 @@
+import json
+import os
+from botocore.exceptions import ClientError
+from cinedb_common.api_movie import presign_posters, read_fields, to_api_movie
+from cinedb_common.aws_clients import lazy_client, lazy_table
+from cinedb_common.batch_get import UnprocessedKeysError, batch_get_items
+from cinedb_common.json_stream import encode_list_response
+from cinedb_common.presign_cache import shared_presign_cache
+from cinedb_common.projection import build_projection, parse_fields_param
+
+# Environment variables with default values
+# These can be overridden in the Lambda function configuration
+DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
+S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Most IDs accepted in one request (BatchGetItem reads 100 per call)
+MAX_BATCH_IDS = int(os.environ.get('MAX_BATCH_IDS', '300'))
+
+# Fields returned for each movie, in response order: the list fields of
+# get_all_movies plus what a carousel or watchlist shows under the poster
+BATCH_FIELDS = ('id', 'title', 'year', 'duration', 'synopsis', 'rating', 'genre', 'director', 'poster')
+
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+
+# Presigned poster URLs are cached per container and reused while fresh
+presign_cache = shared_presign_cache(s3_client)
+
+def parse_ids(event):
+    """
+    Read the requested movie IDs from the request
+
+    IDs come from a JSON body ({"ids": [...]}, for POST) or from the `ids`
+    query string parameter (comma-separated, for GET). Repeated IDs are
+    returned once, at their first position.
+
+    Args:
+        event (dict): The API Gateway event
+
+    Returns:
+        list: Movie IDs in the order requested
+
+    Raises:
+        ValueError: If the IDs are missing, malformed or too many
+    """
+    query_params = event.get('queryStringParameters') or {}
+    if event.get('body'):
+        try:
+            body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
+        except ValueError:
+            raise ValueError('Request body must be valid JSON')
+        ids = body.get('ids') if isinstance(body, dict) else None
+        if not isinstance(ids, list):
+            raise ValueError("Request body must contain an 'ids' list")
+    elif query_params.get('ids'):
+        ids = query_params['ids'].split(',')
+    else:
+        raise ValueError("Movie IDs are required ('ids')")
+
+    unique_ids = []
+    seen = set()
+    for movie_id in ids:
+        if not isinstance(movie_id, str) or not movie_id.strip():
+            raise ValueError("'ids' must be non-empty strings")
+        movie_id = movie_id.strip()
+        if movie_id not in seen:
+            seen.add(movie_id)
+            unique_ids.append(movie_id)
+
+    if not unique_ids:
+        raise ValueError("Movie IDs are required ('ids')")
+    if len(unique_ids) > MAX_BATCH_IDS:
+        raise ValueError(f'At most {MAX_BATCH_IDS} movie IDs can be requested at once')
+    return unique_ids
+
+def lambda_handler(event, context):
+    """
+    Lambda handler function - fetch many movies by ID in one request
+
+    Process:
+    1. Reads the IDs (up to MAX_BATCH_IDS) from the body or query string
+    2. Fetches them with BatchGetItem, 100 keys per request, with the
+       requests running concurrently and UnprocessedKeys retried with
+       backoff (cinedb_common.batch_get)
+    3. Presigns all posters in one batch
+    4. Returns the movies in the order requested, plus the IDs not found
+
+    Query string parameters (optional):
+        ids: Comma-separated movie IDs (GET requests)
+        fields: Comma-separated subset of BATCH_FIELDS to return ('id' is
+                always included)
+
+    Args:
+        event (dict): The event data passed to the function
+        context (LambdaContext): The runtime information of the Lambda function
+
+    Returns:
+        dict: API Gateway response object with status code, headers, and body
+    """
+    try:
+        # Validate the request before touching DynamoDB
+        try:
+            movie_ids = parse_ids(event)
+            fields = parse_fields_param(event.get('queryStringParameters'), BATCH_FIELDS)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': str(e)})
+            }
+
+        # posterVariants is only read when the client wants poster URLs
+        try:
+            items = batch_get_items(
+                table, [{'id': movie_id} for movie_id in movie_ids], build_projection(read_fields(fields))
+            )
+        except UnprocessedKeysError as e:
+            # Throttled for longer than the retries cover; the client can retry
+            print(f"Batch get incomplete: {str(e)}")
+            return {
+                'statusCode': 503,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Retry-After': '1'
+                },
+                'body': json.dumps({'error': 'The movie table is busy, please retry'})
+            }
+
+        # BatchGetItem returns items in no particular order
+        found = {item['id']: item for item in items}
+        movies = [found[movie_id] for movie_id in movie_ids if movie_id in found]
+        missing = [movie_id for movie_id in movie_ids if movie_id not in found]
+
+        if 'poster' in fields:
+            presign_posters(movies, presign_cache, S3_BUCKET)
+
+        body = encode_list_response(
+            'movies',
+            (to_api_movie(movie, fields) for movie in movies),
+            {'missing': missing}
+        )
+        print(f"Batch get: {len(movie_ids)} requested, {len(missing)} missing")
+
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, POST',
+                'Access-Control-Allow-Headers': 'Content-Type'
+            },
+            'isBase64Encoded': False,
+            'body': body
+        }
+
+    except ClientError as e:
+        # Handle DynamoDB specific errors
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'error': f"DynamoDB error: {str(e)}"
+            })
+        }
+
+    except Exception as e:
+        # Handle any other unexpected errors
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'error': f"An unexpected error occurred: {str(e)}"
+            })
+        }
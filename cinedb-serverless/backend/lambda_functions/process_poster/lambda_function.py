@@ -0,0 +1,112 @@
+import json
+import os
+from urllib.parse import unquote_plus
+from botocore.exceptions import ClientError
+from cinedb_common.aws_clients import lazy_client, lazy_resource, lazy_table
+from cinedb_common.catalog_version import CatalogVersion
+from cinedb_common.poster_upload import PosterUploadError, movie_id_from_key
+from cinedb_common.poster_variants import load_variants, store_variants
+
+# Environment variables with default values
+# These can be overridden in the Lambda function configuration
+DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+dynamodb = lazy_resource('dynamodb', AWS_REGION)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+
+# Catalog version counter; listings carry the srcset built from posterVariants
+catalog_version = CatalogVersion(dynamodb)
+
+class PosterNotAttachedError(Exception):
+    """
+    Raised when the movie does not reference the poster yet
+
+    With direct uploads the poster reaches S3 before add_movie/update_movie
+    save it. Failing the invocation makes S3's asynchronous invocation retry
+    it later. The writers also pick up finished variants themselves (see
+    load_variants), so nothing is lost when the retries run out, e.g. for an
+    upload that was never attached or was replaced by another one.
+    """
+
+def attach_variants(movie_id, key, record):
+    """
+    Save a posterVariants record on the movie, if it uses this poster
+
+    Raises:
+        PosterNotAttachedError: If the movie does not exist or does not
+                                reference the poster (yet)
+    """
+    try:
+        table.update_item(
+            Key={'id': movie_id},
+            UpdateExpression='SET posterVariants = :variants',
+            # Stored poster URLs differ in host format, but all end in the key
+            ConditionExpression='attribute_exists(#id) AND contains(poster, :key)',
+            ExpressionAttributeNames={'#id': 'id'},
+            ExpressionAttributeValues={':variants': record, ':key': key}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        raise PosterNotAttachedError(f'Movie {movie_id} does not reference {key}')
+    catalog_version.bump()
+
+def process_poster(bucket, key):
+    """
+    Render and attach the variants of one uploaded poster
+
+    Args:
+        bucket (str): Bucket of the uploaded object
+        key (str): Key of the uploaded object
+
+    Returns:
+        str: What happened ('stored', 'skipped' or 'invalid')
+    """
+    try:
+        movie_id = movie_id_from_key(key)
+    except PosterUploadError:
+        print(f"Skipping {key}: not a poster upload key")
+        return 'skipped'
+
+    # A retried event finds the variants already rendered
+    record = load_variants(s3_client, bucket, movie_id, key)
+    if record is None:
+        data = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+        try:
+            record = store_variants(s3_client, bucket, movie_id, key, data)
+        except ValueError as e:
+            print(f"Skipping {key}: {str(e)}")
+            return 'invalid'
+        print(f"Rendered {key}: {len(data)} bytes -> {record['bytes']} bytes in "
+              f"{len(record['widths']) * len(record['formats'])} variants")
+
+    attach_variants(movie_id, key, record)
+    return 'stored'
+
+def lambda_handler(event, context):
+    """
+    Lambda handler function - S3 ObjectCreated trigger for posters/ uploads
+
+    Renders thumbnails and modern-format variants of every uploaded poster
+    (see cinedb_common.poster_variants) and records them on the movie item,
+    so list endpoints can return per-size URLs.
+
+    Args:
+        event (dict): S3 event notification
+        context (LambdaContext): The runtime information of the Lambda function
+
+    Returns:
+        dict: Outcome per object key
+    """
+    results = {}
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        # Keys in S3 notifications are URL-encoded
+        key = unquote_plus(record['s3']['object']['key'])
+        results[key] = process_poster(bucket, key)
+
+    print(json.dumps(results))
+    return results
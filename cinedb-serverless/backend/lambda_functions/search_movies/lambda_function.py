@@ -0,0 +1,118 @@
+import json
+import os
+from botocore.exceptions import ClientError
+from cinedb_common.aws_clients import lazy_client, lazy_table
+from cinedb_common.parallel_scan import parallel_scan
+from cinedb_common.projection import build_projection
+from cinedb_common.search_index import DEFAULT_SEARCH_LIMIT, INDEX_FIELDS, REVISION_FIELDS, shared_search_store
+
+# Environment variables with default values
+# These can be overridden in the Lambda function configuration
+DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
+S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Bucket holding the serialized search index (default: the poster bucket)
+SEARCH_INDEX_BUCKET = os.environ.get('SEARCH_INDEX_BUCKET', S3_BUCKET)
+
+# Upper bound for the `limit` query parameter
+MAX_SEARCH_RESULTS = int(os.environ.get('MAX_SEARCH_RESULTS', '100'))
+
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
+
+# The loaded index is cached per container and refreshed when a writer saves
+# a new version (checked at most every SEARCH_INDEX_REFRESH seconds)
+search_store = shared_search_store(s3_client, SEARCH_INDEX_BUCKET)
+
+def load_catalog():
+    """
+    Read the indexed fields of every movie, to build the index the first time
+
+    Returns:
+        iterator: Movie records from a parallel scan
+    """
+    return parallel_scan(table, **build_projection(INDEX_FIELDS + REVISION_FIELDS))
+
+def error_response(status_code, message):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({'error': message})
+    }
+
+def parse_limit(query_params):
+    """
+    Read the `limit` query parameter
+
+    Raises:
+        ValueError: If the limit is not a positive integer
+    """
+    raw = query_params.get('limit')
+    if raw in (None, ''):
+        return DEFAULT_SEARCH_LIMIT
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("'limit' must be an integer")
+    if limit < 1:
+        raise ValueError("'limit' must be at least 1")
+    return min(limit, MAX_SEARCH_RESULTS)
+
+def lambda_handler(event, context):
+    """
+    Lambda handler function - full-text movie search
+
+    Ranks movies by relevance (BM25) against the words in `q`, matching
+    title, director, cast and synopsis. The last word also matches as a
+    prefix, so the endpoint can back a search-as-you-type box. Queries are
+    answered from the in-memory index; DynamoDB is only scanned once, to build
+    the index when none has been saved yet.
+
+    Query string parameters:
+        q: Search text (required)
+        limit: Maximum number of results (default: 20, capped at MAX_SEARCH_RESULTS)
+
+    Args:
+        event (dict): The event data passed to the function
+        context (LambdaContext): The runtime information of the Lambda function
+
+    Returns:
+        dict: API Gateway response object with status code, headers, and body
+    """
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        query = (query_params.get('q') or '').strip()
+        if not query:
+            return error_response(400, "Query parameter 'q' is required")
+
+        try:
+            limit = parse_limit(query_params)
+        except ValueError as e:
+            return error_response(400, str(e))
+
+        index = search_store.get(load_catalog)
+        results = index.search(query, limit)
+
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET',
+                'Access-Control-Allow-Headers': 'Content-Type'
+            },
+            'body': json.dumps({'query': query, 'results': results})
+        }
+
+    except ClientError as e:
+        # S3 (index artifact) or DynamoDB (initial build) errors
+        return error_response(500, f"AWS error: {str(e)}")
+
+    except Exception as e:
+        # Handle any other unexpected errors
+        return error_response(500, f"An unexpected error occurred: {str(e)}")
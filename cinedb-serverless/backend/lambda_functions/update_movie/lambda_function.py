@@ -1,127 +1,59 @@
 import json
-import boto3
 import os
-import uuid
-import base64
-import re
-from io import BytesIO
 from datetime import datetime
 from decimal import Decimal
 from botocore.exceptions import ClientError
+from cinedb_common.aws_clients import lazy_client, lazy_resource, lazy_table
+from cinedb_common.catalog_version import CatalogVersion
+from cinedb_common.metrics import emit_metric
+from cinedb_common.movie_index import index_keys
+from cinedb_common.multipart import MultipartError, PayloadTooLargeError, parse_multipart_event
+from cinedb_common.poster_upload import PosterUploadError, key_from_url, movie_id_from_key, new_poster_key, verify_upload
+from cinedb_common.poster_variants import delete_variants, load_variants
+from cinedb_common.search_index import INDEX_FIELDS, shared_search_store
+from cinedb_common.versioning import (
+    VERSION_ATTRIBUTE, PreconditionError, failed_condition_version, get_header, movie_version,
+    parse_if_match, version_condition, version_etag
+)
 
 # Environment variables with default values
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'cinedb')
 S3_BUCKET = os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-table = dynamodb.Table(DYNAMODB_TABLE)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
+# Bucket holding the serialized search index (default: the poster bucket)
+SEARCH_INDEX_BUCKET = os.environ.get('SEARCH_INDEX_BUCKET', S3_BUCKET)
 
-def parse_multipart_data(content_type, body):
-    """
-    Parse multipart form data from API Gateway binary content
-    
-    Args:
-        content_type (str): The Content-Type header with boundary information
-        body (str/bytes): The request body containing multipart form data
-        
-    Returns:
-        dict: A dictionary of form fields and files
-    """
-    # Extract boundary from content type
-    boundary_match = re.search(r'boundary=([^;]+)', content_type)
-    if not boundary_match:
-        raise ValueError("No boundary found in Content-Type")
-    
-    boundary = boundary_match.group(1)
-    
-    # Ensure body is bytes
-    if isinstance(body, str):
-        if body.startswith("'") and body.endswith("'"):
-            body = body[1:-1]  # Remove surrounding quotes if present
-        
-        # Check if body is base64 encoded
-        try:
-            body = base64.b64decode(body)
-        except Exception:
-            body = body.encode('utf-8')
-    
-    # Split body by boundary
-    parts = body.split(f'--{boundary}'.encode('utf-8'))
-    
-    # Parse each part
-    result = {'fields': {}, 'files': {}}
-    
-    for part in parts:
-        if b'\r\n\r\n' not in part:
-            continue
-        
-        # Split headers and content
-        headers_raw, content = part.split(b'\r\n\r\n', 1)
-        headers = {}
-        
-        # Parse headers
-        for header_line in headers_raw.split(b'\r\n'):
-            if b':' in header_line:
-                header_name, header_value = header_line.split(b':', 1)
-                headers[header_name.strip().decode('utf-8').lower()] = header_value.strip().decode('utf-8')
-        
-        # Remove trailing boundary if present
-        if content.endswith(b'\r\n'):
-            content = content[:-2]
-        
-        # Check Content-Disposition for field name and filename
-        if 'content-disposition' in headers:
-            cd_parts = headers['content-disposition'].split(';')
-            
-            # Get field name
-            field_name = None
-            for part in cd_parts:
-                if 'name=' in part:
-                    field_name = part.split('=', 1)[1].strip('"\'')
-                    break
-            
-            if not field_name:
-                continue
-            
-            # Check if this is a file
-            filename = None
-            for part in cd_parts:
-                if 'filename=' in part:
-                    filename = part.split('=', 1)[1].strip('"\'')
-                    break
-            
-            if filename and filename != '':
-                # This is a file
-                content_type = headers.get('content-type', 'application/octet-stream')
-                result['files'][field_name] = {
-                    'filename': filename,
-                    'content_type': content_type,
-                    'content': content
-                }
-            else:
-                # This is a regular field
-                result['fields'][field_name] = content.decode('utf-8')
-    
-    return result
+# Set to "true" to reject edits without an If-Match header (428)
+REQUIRE_IF_MATCH = os.environ.get('REQUIRE_IF_MATCH', 'false').lower() == 'true'
+
+# AWS clients are created on first use (see cinedb_common.aws_clients)
+dynamodb = lazy_resource('dynamodb', AWS_REGION)
+table = lazy_table(DYNAMODB_TABLE, AWS_REGION)
+s3_client = lazy_client('s3', AWS_REGION)
 
-def upload_file_to_s3(file_data, movie_id, key_prefix=""):
+# Full-text search index, updated incrementally after every write
+search_store = shared_search_store(s3_client, SEARCH_INDEX_BUCKET)
+
+# Catalog version counter, bumped after every write so list/detail ETags change
+catalog_version = CatalogVersion(dynamodb)
+
+def upload_file_to_s3(file_data, movie_id):
     """
     Upload a file to S3 and return the URL
     
     Args:
-        file_data (dict): The file data containing content, filename, and content_type
+        file_data (dict): The parsed file part (filename, content_type and
+                          content, a seekable file object)
         movie_id (str): The ID of the movie to update
-        key_prefix (str): Optional prefix for the S3 key
         
     Returns:
         str: The URL of the uploaded file
     """
-    # Generate an S3 key using movie ID and preserving the file extension
+    # A new key per poster (as for direct uploads): process_poster renders
+    # its variants, and cached copies of the old poster never shadow it
     file_extension = os.path.splitext(file_data['filename'])[1]
-    s3_key = f"{key_prefix}{movie_id}{file_extension}"
+    s3_key = new_poster_key(movie_id, file_extension)
     
     # Upload the file
     s3_client.put_object(
@@ -134,6 +66,38 @@ def upload_file_to_s3(file_data, movie_id, key_prefix=""):
     # Return the S3 URL
     return f"https://{S3_BUCKET}.s3.amazonaws.com/{s3_key}"
 
+def assigned_values(expression_parts, attribute_names, attribute_values):
+    """
+    Map the attributes of 'name = :value' SET clauses to the values they set
+    
+    Args:
+        expression_parts (list): SET clauses such as 'title = :title' or '#year = :year'
+        attribute_names (dict): ExpressionAttributeNames
+        attribute_values (dict): ExpressionAttributeValues
+        
+    Returns:
+        dict: Attribute name to new value
+    """
+    assigned = {}
+    for part in expression_parts:
+        name, _, placeholder = (side.strip() for side in part.partition('='))
+        if placeholder in attribute_values:
+            assigned[attribute_names.get(name, name)] = attribute_values[placeholder]
+    return assigned
+
+def prefers_minimal(event):
+    """
+    Check for a 'Prefer: return=minimal' request header (RFC 7240)
+    
+    Args:
+        event (dict): The API Gateway event
+        
+    Returns:
+        bool: True if the client does not want the updated fields back
+    """
+    preferences = (get_header(event, 'Prefer') or '').lower().replace(' ', '').split(',')
+    return 'return=minimal' in preferences
+
 def lambda_handler(event, context):
     """
     Lambda handler function for updating an existing movie
@@ -152,7 +116,7 @@ def lambda_handler(event, context):
                 'statusCode': 200,
                 'headers': {
                     'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key',
+                    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,If-Match,Prefer',
                     'Access-Control-Allow-Methods': 'PUT,POST,OPTIONS'
                 },
                 'body': ''
@@ -180,15 +144,22 @@ def lambda_handler(event, context):
         
         # Handle multipart form data (for file uploads)
         elif 'multipart/form-data' in content_type:
-            # Get the body - might be in different formats depending on API Gateway configuration
-            body = event.get('body', '')
-            
-            # Check if body is base64 encoded (API Gateway setting)
-            if event.get('isBase64Encoded', False):
-                body = base64.b64decode(body)
-            
-            # Parse the multipart form data
-            form_data = parse_multipart_data(content_type, body)
+            # Parse the multipart form data in one pass; binary bodies arrive
+            # base64-encoded (isBase64Encoded) and are decoded incrementally
+            try:
+                form_data = parse_multipart_event(event, content_type)
+            except PayloadTooLargeError as e:
+                return {
+                    'statusCode': 413,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': str(e)})
+                }
+            except MultipartError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f'Invalid multipart body: {str(e)}'})
+                }
         
         else:
             return {
@@ -215,21 +186,20 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Movie ID is required'})
             }
         
-        # Check if the movie exists
+        # Optimistic locking: If-Match carries the version the client edited
         try:
-            response = table.get_item(Key={'id': movie_id})
-            if 'Item' not in response:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': f'Movie with ID {movie_id} not found'})
-                }
-            existing_movie = response['Item']
-        except ClientError as e:
+            expected_version = parse_if_match(get_header(event, 'If-Match'))
+        except PreconditionError as e:
             return {
-                'statusCode': 500,
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': str(e)})
+            }
+        if expected_version is None and REQUIRE_IF_MATCH:
+            return {
+                'statusCode': 428,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': f'Error checking movie existence: {str(e)}'})
+                'body': json.dumps({'error': 'If-Match header with the ETag of the movie is required'})
             }
         
         # Prepare update expression and attributes
@@ -287,10 +257,44 @@ def lambda_handler(event, context):
             update_expression_parts.append('poster = :poster')
             expression_attribute_values[':poster'] = form_data['fields']['poster_url']
         
+        # Key of a poster this request uploads itself
+        uploaded_poster_key = None
+        
+        # Poster already uploaded to S3 with a presigned upload for this movie
+        if form_data['fields'].get('poster_key'):
+            try:
+                upload = verify_upload(s3_client, S3_BUCKET, form_data['fields']['poster_key'], movie_id)
+            except PosterUploadError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': str(e)})
+                }
+            except ClientError as e:
+                print(f"Error checking poster upload: {str(e)}")
+                return {
+                    'statusCode': 500,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f'Error checking poster upload: {str(e)}'})
+                }
+            update_expression_parts.append('poster = :poster')
+            expression_attribute_values[':poster'] = upload['url']
+            
+            # The variants may already be rendered (process_poster could not
+            # attach them before the movie referenced the poster)
+            try:
+                variants = load_variants(s3_client, S3_BUCKET, movie_id, upload['key'])
+                if variants:
+                    update_expression_parts.append('posterVariants = :posterVariants')
+                    expression_attribute_values[':posterVariants'] = variants
+            except Exception as e:
+                print(f"Error reading poster variants: {str(e)}")
+        
         # Handle poster image update if provided
-        if 'poster' in form_data['files']:
+        elif 'poster' in form_data['files']:
             try:
                 poster_url = upload_file_to_s3(form_data['files']['poster'], movie_id)
+                uploaded_poster_key = key_from_url(poster_url)
                 update_expression_parts.append('poster = :poster')
                 expression_attribute_values[':poster'] = poster_url
             except Exception as e:
@@ -309,46 +313,170 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'No fields to update'})
             }
         
+        remove_attributes = []
+        
+        # Keep the browsing index keys in sync with a new genre; catalogKey is
+        # also added to movies created before the indexes existed. An edit
+        # that leaves the genre alone leaves the stored genreKey right
+        new_genre = form_data['fields'].get('genre')
+        keys = index_keys({'id': movie_id, 'genre': new_genre})
+        for key_name, key_value in keys.items():
+            update_expression_parts.append(f'{key_name} = :{key_name}')
+            expression_attribute_values[f':{key_name}'] = key_value
+        if new_genre and 'genreKey' not in keys:
+            remove_attributes.append('genreKey')
+        
         # Add updatedAt timestamp
         update_expression_parts.append('updatedAt = :updatedAt')
         expression_attribute_values[':updatedAt'] = datetime.now().isoformat()
         
+        # Everything this edit sets, by attribute name: the movie fields of
+        # the response (what ReturnValues UPDATED_NEW would send back)
+        changes = assigned_values(update_expression_parts, expression_attribute_names, expression_attribute_values)
+        
+        # Variants of the old poster no longer apply; process_poster attaches
+        # the new ones once they are rendered
+        if 'poster' in changes and 'posterVariants' not in changes:
+            remove_attributes.append('posterVariants')
+        
+        # One conditional write instead of get_item + update_item: the
+        # condition checks that the movie exists (and, with If-Match, that
+        # nobody else changed it) and the version is bumped in the same request
+        condition, version_set, version_names, version_values = version_condition(expected_version)
+        update_expression_parts.append(version_set)
+        expression_attribute_names.update(version_names)
+        expression_attribute_values.update(version_values)
+        
         # Construct the final update expression
         update_expression = 'SET ' + ', '.join(update_expression_parts)
+        if remove_attributes:
+            update_expression += ' REMOVE ' + ', '.join(remove_attributes)
+        
+        # The previous item is only needed to delete a replaced poster and to
+        # re-index changed search fields. Otherwise ask for the new version
+        # alone, or for nothing when If-Match already tells us what it is
+        needs_previous = 'poster' in changes or any(field in changes for field in INDEX_FIELDS)
+        if needs_previous:
+            return_values = 'ALL_OLD'
+        elif isinstance(expected_version, int):
+            return_values = 'NONE'
+        else:
+            return_values = 'UPDATED_NEW'
         
-        # Add ExpressionAttributeNames if needed (for reserved words like 'year')
         update_params = {
             'Key': {'id': movie_id},
             'UpdateExpression': update_expression,
+            'ConditionExpression': condition,
+            'ExpressionAttributeNames': expression_attribute_names,
             'ExpressionAttributeValues': expression_attribute_values,
-            'ReturnValues': 'ALL_NEW'
+            'ReturnValues': return_values,
+            # A failed condition returns the current item, so 404 and 412 can
+            # be told apart without another read
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
         }
         
-        if 'expression_attribute_names' in locals() and expression_attribute_names:
-            update_params['ExpressionAttributeNames'] = expression_attribute_names
-        
         # Update the item in DynamoDB
         try:
             response = table.update_item(**update_params)
-            updated_movie = response.get('Attributes', {})
         except ClientError as e:
-            print(f"Error updating movie: {str(e)}")
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                print(f"Error updating movie: {str(e)}")
+                return {
+                    'statusCode': 500,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f'Error updating movie: {str(e)}'})
+                }
+            
+            # The poster uploaded with this request belongs to an edit that
+            # did not happen
+            if uploaded_poster_key:
+                try:
+                    s3_client.delete_object(Bucket=S3_BUCKET, Key=uploaded_poster_key)
+                except ClientError as delete_error:
+                    print(f"Error deleting unused poster: {str(delete_error)}")
+            
+            current_version = failed_condition_version(e.response)
+            if current_version is None:
+                return {
+                    'statusCode': 404,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f'Movie with ID {movie_id} not found'})
+                }
             return {
-                'statusCode': 500,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': f'Error updating movie: {str(e)}'})
+                'statusCode': 412,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Expose-Headers': 'ETag',
+                    'ETag': version_etag(current_version)
+                },
+                'body': json.dumps({
+                    'error': 'The movie was changed by someone else. Reload it and apply your changes again',
+                    'version': current_version
+                })
             }
         
-        # Return success response with updated movie
+        previous_movie = response.get('Attributes', {}) if needs_previous else {}
+        if needs_previous:
+            new_version = movie_version(previous_movie) + 1
+        elif return_values == 'NONE':
+            new_version = expected_version + 1
+        else:
+            new_version = int(response['Attributes'][VERSION_ATTRIBUTE])
+        changes[VERSION_ATTRIBUTE] = new_version
+        
+        # Invalidate cached catalog listings (logged, never fails the write)
+        catalog_version.bump()
+        
+        # Remove the poster that was replaced (posters get a new key each time)
+        previous_key = key_from_url(previous_movie.get('poster'))
+        if previous_key and previous_key != key_from_url(changes.get('poster')):
+            try:
+                # Also covers '<movie id>.<ext>', the key posters were once
+                # overwritten under
+                if os.path.splitext(previous_key)[0] == movie_id or movie_id_from_key(previous_key) == movie_id:
+                    s3_client.delete_object(Bucket=S3_BUCKET, Key=previous_key)
+            except PosterUploadError:
+                pass
+            except ClientError as e:
+                print(f"Error deleting previous poster: {str(e)}")
+            
+            if previous_movie.get('posterVariants'):
+                try:
+                    delete_variants(s3_client, S3_BUCKET, previous_movie['posterVariants'])
+                except ClientError as e:
+                    print(f"Error deleting previous poster variants: {str(e)}")
+        
+        # Keep the search index in step when a searchable field changed; a
+        # failure here must not fail the write (scripts/build_search_index.py
+        # rebuilds it from the table)
+        if any(field in changes for field in INDEX_FIELDS):
+            updated_movie = {**previous_movie, **changes}
+            try:
+                search_store.add(updated_movie)
+            except Exception as e:
+                print(f"Error updating search index: {str(e)}")
+                emit_metric('SearchIndexUpdateFailed', Function='update_movie')
+        
+        headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag',
+            'ETag': version_etag(new_version)
+        }
+        
+        # Prefer: return=minimal skips the body; the ETag is all a client
+        # needs for its next edit
+        if prefers_minimal(event):
+            return {'statusCode': 204, 'headers': headers, 'body': ''}
+        
+        # Return success response with the updated fields
+        headers['Content-Type'] = 'application/json'
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': headers,
             'body': json.dumps({
                 'message': 'Movie updated successfully',
-                'movie': updated_movie
+                'movie': {'id': movie_id, **changes}
             }, default=lambda o: str(o) if isinstance(o, Decimal) else o)
         }
     
@@ -0,0 +1,37 @@
+#!/bin/bash
+# Build the deployment package for a Lambda function, bundling the shared
+# cinedb_common package next to lambda_function.py
+#
+# Usage: ./package-function.sh <function_name>
+# Example: ./package-function.sh get_all_movies
+#   -> lambda_functions/get_all_movies/function.zip
+
+set -e
+
+FUNCTION_NAME="$1"
+BACKEND_DIR="$(cd "$(dirname "$0")" && pwd)"
+FUNCTION_DIR="$BACKEND_DIR/lambda_functions/$FUNCTION_NAME"
+
+if [ -z "$FUNCTION_NAME" ] || [ ! -f "$FUNCTION_DIR/lambda_function.py" ]; then
+    echo "Usage: $0 <function_name>"
+    echo "Available functions:"
+    ls "$BACKEND_DIR/lambda_functions"
+    exit 1
+fi
+
+echo "📦 Packaging $FUNCTION_NAME..."
+rm -f "$FUNCTION_DIR/function.zip"
+
+# Handler code
+(cd "$FUNCTION_DIR" && zip -q function.zip lambda_function.py)
+
+# Shared helpers
+(cd "$BACKEND_DIR" && zip -q -r "$FUNCTION_DIR/function.zip" cinedb_common -x '*__pycache__*')
+
+# The router loads the API handlers from lambda_functions/<name>/lambda_function.py
+if [ "$FUNCTION_NAME" = "api_router" ]; then
+    (cd "$BACKEND_DIR" && zip -q "$FUNCTION_DIR/function.zip" \
+        lambda_functions/{add_movie,update_movie,delete_movie,get_all_movies,get_movie_by_id,get_movies_batch,search_movies,generate_presigned_url,chat_bedrock}/lambda_function.py)
+fi
+
+echo "✅ Deployment package created: $FUNCTION_DIR/function.zip"
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Add the browsing index keys to movies written before the GSIs existed
+
+GenreYearIndex, CatalogYearIndex and CatalogRatingIndex only see items that
+carry the key attributes computed by cinedb_common.movie_index.index_keys
+(genreKey, catalogKey). add_movie and update_movie maintain them on every
+write; this script brings the existing catalog up to date, and re-shards
+catalogKey after CATALOG_KEY_SHARDS changes. It is safe to run more than
+once: items whose keys are already correct are skipped.
+
+Movies saved by older versions of the Flask app keep `rating` as a string,
+which CatalogRatingIndex (a numeric sort key) rejects. The script converts
+those ratings to numbers in the same update, and reports and skips the ones
+that are not numbers, so they can be fixed by hand.
+
+Usage:
+    python backfill_index_keys.py [--table cinedb] [--region us-east-1] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.movie_index import index_keys, parse_rating  # noqa: E402
+from cinedb_common.parallel_scan import parallel_scan  # noqa: E402
+from cinedb_common.projection import build_projection  # noqa: E402
+
+
+def missing_keys(movie):
+    """Return the index key attributes that are absent or out of date"""
+    return {
+        name: value for name, value in index_keys(movie).items()
+        if movie.get(name) != value
+    }
+
+
+def pending_updates(movie):
+    """
+    Return the attributes to set on a movie
+
+    Returns:
+        dict: Missing or stale index keys, plus `rating` converted to a number
+              when it was stored as a string
+
+    Raises:
+        ValueError: If the movie has a string rating that is not a number
+    """
+    updates = missing_keys(movie)
+    if isinstance(movie.get('rating'), str):
+        rating = parse_rating(movie['rating'])
+        if rating is None:
+            raise ValueError(f"rating {movie['rating']!r} is not a number")
+        updates['rating'] = rating
+    return updates
+
+
+def backfill(table, dry_run=False):
+    """
+    Update every movie whose index keys or rating are missing or stale
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        dry_run (bool): Only count the movies that would be updated
+
+    Returns:
+        tuple: (scanned, updated, skipped) movie counts
+    """
+    from botocore.exceptions import ClientError
+
+    scanned = updated = skipped = 0
+    projection = build_projection(('id', 'genre', 'rating', 'genreKey', 'catalogKey'))
+    for movie in parallel_scan(table, **projection):
+        scanned += 1
+        try:
+            keys = pending_updates(movie)
+        except ValueError as e:
+            print(f"Skipping movie {movie['id']}: {e}")
+            skipped += 1
+            continue
+        if not keys:
+            continue
+        updated += 1
+        if dry_run:
+            continue
+
+        names = {f'#{name}': name for name in keys}
+        names['#id'] = 'id'
+        try:
+            table.update_item(
+                Key={'id': movie['id']},
+                UpdateExpression='SET ' + ', '.join(f'#{name} = :{name}' for name in keys),
+                # Do not recreate a movie that was deleted during the backfill
+                ConditionExpression='attribute_exists(#id)',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={f':{name}': value for name, value in keys.items()}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            updated -= 1
+
+    return scanned, updated, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE', 'cinedb'))
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'us-east-1'))
+    parser.add_argument('--dry-run', action='store_true', help='Report how many movies need keys without writing')
+    args = parser.parse_args()
+
+    import boto3
+
+    table = boto3.resource('dynamodb', region_name=args.region).Table(args.table)
+    scanned, updated, skipped = backfill(table, args.dry_run)
+    action = 'would be updated' if args.dry_run else 'updated'
+    print(f'{scanned} movies scanned, {updated} {action}, {skipped} skipped')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Render the poster variants of movies uploaded before process_poster existed
+
+New posters get their thumbnails and WebP/AVIF variants from the
+process_poster Lambda as soon as they land in S3. This script does the same
+for the existing catalog: it renders the variants of every movie whose poster
+is stored in the bucket but has no `posterVariants` yet, and records them on
+the movie. It is safe to run more than once; pass --force to re-render
+everything (e.g. after changing POSTER_WIDTHS or POSTER_FORMATS).
+
+Needs Pillow (pip install Pillow).
+
+Usage:
+    python build_poster_variants.py [--table cinedb] [--bucket cinedb-bucket-2025]
+                                    [--region us-east-1] [--force] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.catalog_version import CATALOG_VERSION_TABLE, CatalogVersion  # noqa: E402
+from cinedb_common.parallel_scan import parallel_scan  # noqa: E402
+from cinedb_common.poster_upload import key_from_url  # noqa: E402
+from cinedb_common.poster_variants import store_variants  # noqa: E402
+from cinedb_common.projection import build_projection  # noqa: E402
+
+
+def backfill(table, s3_client, bucket, force=False, dry_run=False):
+    """
+    Render and attach the variants of every poster that lacks them
+
+    Args:
+        table: A boto3 DynamoDB Table resource
+        s3_client: boto3 S3 client
+        bucket (str): Poster bucket
+        force (bool): Also re-render posters that already have variants
+        dry_run (bool): Only count the posters that would be rendered
+
+    Returns:
+        tuple: (scanned, rendered, source bytes, variant bytes)
+    """
+    from botocore.exceptions import ClientError
+
+    scanned = rendered = source_bytes = variant_bytes = 0
+    projection = build_projection(('id', 'poster', 'posterVariants'))
+    for movie in parallel_scan(table, **projection):
+        scanned += 1
+        key = key_from_url(movie.get('poster'))
+        if not key or (movie.get('posterVariants') and not force):
+            continue
+        if dry_run:
+            rendered += 1
+            continue
+
+        try:
+            data = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+            record = store_variants(s3_client, bucket, movie['id'], key, data)
+        except (ClientError, ValueError) as e:
+            print(f"Skipping {movie['id']} ({key}): {str(e)}")
+            continue
+
+        try:
+            table.update_item(
+                Key={'id': movie['id']},
+                UpdateExpression='SET posterVariants = :variants',
+                # Skip movies deleted or given a new poster in the meantime
+                ConditionExpression='poster = :poster',
+                ExpressionAttributeValues={':variants': record, ':poster': movie['poster']}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            continue
+
+        rendered += 1
+        source_bytes += len(data)
+        variant_bytes += record['bytes']
+
+    return scanned, rendered, source_bytes, variant_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE', 'cinedb'))
+    parser.add_argument('--bucket', default=os.environ.get('S3_BUCKET', 'cinedb-bucket-2025'))
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'us-east-1'))
+    parser.add_argument('--force', action='store_true', help='Re-render posters that already have variants')
+    parser.add_argument('--dry-run', action='store_true', help='Report how many posters need variants without writing')
+    parser.add_argument('--version-table', default=CATALOG_VERSION_TABLE,
+                        help='Catalog version table to bump afterwards (empty: none)')
+    args = parser.parse_args()
+
+    import boto3
+
+    dynamodb = boto3.resource('dynamodb', region_name=args.region)
+    table = dynamodb.Table(args.table)
+    s3_client = boto3.client('s3', region_name=args.region)
+    scanned, rendered, source_bytes, variant_bytes = backfill(
+        table, s3_client, args.bucket, args.force, args.dry_run
+    )
+    if rendered and not args.dry_run:
+        # Listings now carry the new srcsets
+        CatalogVersion(dynamodb, args.version_table).bump()
+    if args.dry_run:
+        print(f'{scanned} movies scanned, {rendered} posters would be rendered')
+        return
+    print(f'{scanned} movies scanned, {rendered} posters rendered '
+          f'({source_bytes / 1e6:.1f}MB of posters -> {variant_bytes / 1e6:.1f}MB of variants)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Rebuild the full-text search index from the movie table
+
+The search_movies function builds the index on its own the first time it runs,
+and add_movie, update_movie and delete_movie keep it up to date. Run this
+script to start over, e.g. after a bulk import that bypassed those functions
+or after an incremental update failed (the write functions log
+"Error updating search index" and count it in the SearchIndexUpdateFailed
+metric in that case).
+
+Usage:
+    python build_search_index.py [--table cinedb] [--bucket cinedb-bucket-2025]
+                                 [--region us-east-1] [--output index.bin]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.parallel_scan import parallel_scan  # noqa: E402
+from cinedb_common.projection import build_projection  # noqa: E402
+from cinedb_common.search_index import INDEX_FIELDS, REVISION_FIELDS, SearchIndex, SearchIndexStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE', 'cinedb'))
+    parser.add_argument('--bucket', default=os.environ.get('SEARCH_INDEX_BUCKET',
+                                                           os.environ.get('S3_BUCKET', 'cinedb-bucket-2025')))
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'us-east-1'))
+    parser.add_argument('--output', help='Write the artifact to this file instead of uploading it')
+    args = parser.parse_args()
+
+    import boto3
+
+    table = boto3.resource('dynamodb', region_name=args.region).Table(args.table)
+    start = time.perf_counter()
+    index = SearchIndex.build(parallel_scan(table, **build_projection(INDEX_FIELDS + REVISION_FIELDS)))
+    print(f'Indexed {len(index)} movies in {time.perf_counter() - start:.1f}s')
+
+    if args.output:
+        store = SearchIndexStore(local_path=args.output)
+        destination = args.output
+    else:
+        store = SearchIndexStore(boto3.client('s3', region_name=args.region), args.bucket)
+        destination = f's3://{args.bucket}/{store.key}'
+    store.save(index)
+    print(f'Saved search index to {destination}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Load movies from a CSV or NDJSON file into the catalog
+
+Rows are validated with the same field rules as add_movie (`title` and
+`year` required, numeric `year`, `duration` and `rating`) and written with
+concurrent 25-item BatchWriteItem requests (cinedb_common.bulk_import).
+Rejected rows are reported and skipped.
+
+CSV files need a header row; column names are the movie fields (id, title,
+year, duration, rating, genre, director, cast, synopsis, poster). NDJSON
+files hold one movie object per line. Either may be gzipped (.gz). Rows
+without an `id` get one derived from the file name and row number.
+
+Progress is checkpointed to <file>.checkpoint.json every few seconds. If the
+import stops (Ctrl-C, an error, throttling beyond the retries), running the
+same command again resumes after the last checkpointed row; pass --restart
+to start over. Run scripts/build_search_index.py afterwards to make the new
+movies searchable.
+
+Usage:
+    python bulk_import.py movies.csv [--table cinedb] [--region us-east-1]
+                          [--workers 8] [--format csv|ndjson]
+                          [--checkpoint path] [--restart] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.bulk_import import (  # noqa: E402
+    BULK_IMPORT_WORKERS, BulkImporter, FileCheckpointStore, ImportFormatError, detect_format, iter_rows, open_text
+)
+from cinedb_common.catalog_version import CATALOG_VERSION_TABLE, CatalogVersion  # noqa: E402
+
+
+def print_progress(stats):
+    print(f"{stats['rowsRead']} rows read, {stats['written']} written, {stats['rejected']} rejected "
+          f"- {stats['itemsPerSecond']} items/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file', help='CSV or NDJSON file (optionally .gz)')
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE', 'cinedb'))
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'us-east-1'))
+    parser.add_argument('--version-table', default=CATALOG_VERSION_TABLE,
+                        help='Catalog version table to bump after the import (empty: none)')
+    parser.add_argument('--workers', type=int, default=BULK_IMPORT_WORKERS,
+                        help='Concurrent BatchWriteItem requests')
+    parser.add_argument('--format', choices=('csv', 'ndjson'), help='Default: from the file extension')
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <file>.checkpoint.json)')
+    parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+    parser.add_argument('--dry-run', action='store_true', help='Validate the rows without writing')
+    args = parser.parse_args()
+
+    try:
+        file_format = args.format or detect_format(args.file)
+    except ImportFormatError as e:
+        parser.error(str(e))
+
+    checkpoint_store = FileCheckpointStore(args.checkpoint or f'{args.file}.checkpoint.json')
+    if args.restart and not args.dry_run:
+        checkpoint_store.clear()
+
+    table = catalog_version = None
+    if not args.dry_run:
+        import boto3
+
+        dynamodb = boto3.resource('dynamodb', region_name=args.region)
+        table = dynamodb.Table(args.table)
+        catalog_version = CatalogVersion(dynamodb, args.version_table)
+
+    importer = BulkImporter(
+        table, os.path.basename(args.file), workers=args.workers,
+        checkpoint_store=checkpoint_store, dry_run=args.dry_run, progress=print_progress
+    )
+    try:
+        with open(args.file, 'rb') as f:
+            report = importer.run(iter_rows(open_text(f, args.file), file_format))
+    finally:
+        # Cached catalog listings must not outlive the rows written
+        if catalog_version:
+            catalog_version.bump()
+
+    if report['resumedFrom']:
+        print(f"Resumed after row {report['resumedFrom']}")
+    for error in report['errors']:
+        print(f"Row {error['row']}: {error['error']}")
+    action = 'validated' if args.dry_run else 'written'
+    print(f"{report['rowsRead']} rows read, {report['written']} {action}, {report['rejected']} rejected "
+          f"in {report['seconds']}s ({report['itemsPerSecond']} items/s, "
+          f"{report['throttled']} throttled requests)")
+    if report['errors'] and report['rejected'] > len(report['errors']):
+        print(f"(first {len(report['errors'])} rejected rows shown)")
+    if not args.dry_run:
+        print(f"Checkpoint: {checkpoint_store.path} (row {report['rowsDone']})")
+
+
+if __name__ == '__main__':
+    main()
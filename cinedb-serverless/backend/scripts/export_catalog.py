@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Export the catalog to S3 as compressed NDJSON, CSV or Parquet files
+
+Runs the same export as the export_catalog Lambda from your machine: a
+segmented Scan, one worker per segment, each streaming its rows into
+size-rolled files with S3 multipart uploads, then a manifest listing the
+files. Prints progress while it runs and a presigned link to the manifest
+at the end. CSV and NDJSON exports can be loaded back with bulk_import.py.
+
+Parquet needs pyarrow (pip install pyarrow).
+
+Usage:
+    python export_catalog.py [--table cinedb] [--bucket cinedb-bucket-2025]
+                             [--region us-east-1] [--format ndjson|csv|parquet]
+                             [--compression gzip] [--fields id,title,year]
+                             [--segments 8]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cinedb_common.catalog_export import EXPORT_FIELDS, EXPORT_FORMATS, ExportError, export_catalog  # noqa: E402
+from cinedb_common.projection import InvalidFieldsError, parse_fields_param  # noqa: E402
+
+
+def print_progress(stats):
+    print(f"{stats['rows']} rows, {stats['files']} files done - {stats['rowsPerSecond']} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE', 'cinedb'))
+    parser.add_argument('--bucket', default=os.environ.get('S3_BUCKET', 'cinedb-bucket-2025'))
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'us-east-1'))
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+    parser.add_argument('--compression', help='gzip or none (NDJSON, CSV); zstd, snappy, gzip or none (Parquet)')
+    parser.add_argument('--fields', help=f"Comma-separated subset of: {', '.join(EXPORT_FIELDS)}")
+    parser.add_argument('--segments', type=int, default=8, help='Scan segments (one worker each)')
+    args = parser.parse_args()
+
+    import boto3
+
+    table = boto3.resource('dynamodb', region_name=args.region).Table(args.table)
+    s3_client = boto3.client('s3', region_name=args.region)
+    try:
+        fields = parse_fields_param({'fields': args.fields}, EXPORT_FIELDS)
+        manifest = export_catalog(
+            table, s3_client, args.bucket, args.format, args.compression, fields,
+            total_segments=args.segments, progress=print_progress
+        )
+    except (ExportError, InvalidFieldsError) as e:
+        parser.error(str(e))
+
+    for entry in manifest['files']:
+        print(json.dumps(entry))
+    print(f"{manifest['rows']} rows in {len(manifest['files'])} files, {manifest['bytes']} bytes, "
+          f"{manifest['seconds']}s ({manifest['rowsPerSecond']} rows/s)")
+    print(f"Manifest: s3://{args.bucket}/{manifest['manifestKey']}")
+    print(manifest['manifestUrl'])
+
+
+if __name__ == '__main__':
+    main()
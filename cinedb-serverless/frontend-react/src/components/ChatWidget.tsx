@@ -19,6 +19,8 @@ export const ChatWidget = () => {
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const API_URL = import.meta.env.VITE_API_BASE_URL || '';
+  // Streaming endpoint (see chat_bedrock README); replies arrive as they are generated
+  const CHAT_STREAM_URL = import.meta.env.VITE_CHAT_STREAM_URL || '';
 
   // Auto-scroll to bottom when messages change
   const scrollToBottom = () => {
@@ -29,6 +31,58 @@ export const ChatWidget = () => {
     scrollToBottom();
   }, [messages, loading]);
 
+  // Read the Server-Sent Events of the streaming endpoint, appending each
+  // piece of the reply to the last message as it arrives
+  const streamReply = async (userMessage: string) => {
+    const response = await fetch(CHAT_STREAM_URL, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        message: userMessage,
+        history: messages
+      })
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Chat stream failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let started = false;
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let end;
+      while ((end = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        const event = block.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] || '{}');
+
+        if (event === 'delta') {
+          if (!started) {
+            started = true;
+            setLoading(false);
+            setMessages(prev => [...prev, { role: 'assistant', content: data.text }]);
+          } else {
+            setMessages(prev => [
+              ...prev.slice(0, -1),
+              { role: 'assistant', content: prev[prev.length - 1].content + data.text }
+            ]);
+          }
+        } else if (event === 'error') {
+          throw new Error(data.error);
+        }
+      }
+    }
+    if (!started) {
+      throw new Error('Chat stream ended without a reply');
+    }
+  };
+
   const sendMessage = async () => {
     if (!input.trim() || loading) return;
 
@@ -38,6 +92,11 @@ export const ChatWidget = () => {
     setLoading(true);
 
     try {
+      if (CHAT_STREAM_URL) {
+        await streamReply(userMessage);
+        return;
+      }
+
       const response = await fetch(`${API_URL}/chat`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
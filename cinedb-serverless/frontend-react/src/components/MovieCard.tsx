@@ -7,23 +7,36 @@ interface MovieCardProps {
   rating: number | null;
   imageUrl?: string;
   poster?: string;
+  // Resized renditions from the API, when the poster has variants
+  posterThumbnail?: string;
+  posterSrcset?: Record<string, string>;
   genre?: string;
   synopsis?: string;
   onClick?: () => void;
 }
 
-export const MovieCard = ({ title, year, rating, imageUrl, poster, genre, synopsis, onClick }: MovieCardProps) => {
+// Rendered width of a card in the grid (2 to 6 columns, see MovieSection)
+const POSTER_SIZES = "(min-width: 1280px) 16vw, (min-width: 1024px) 20vw, (min-width: 768px) 25vw, (min-width: 640px) 33vw, 50vw";
+
+export const MovieCard = ({ title, year, rating, imageUrl, poster, posterThumbnail, posterSrcset, genre, synopsis, onClick }: MovieCardProps) => {
   // Use poster field from your backend, fallback to imageUrl
-  const posterUrl = poster || imageUrl || 'https://images.unsplash.com/photo-1536440136628-849c177e76a1?w=400&h=600&fit=crop';
+  const posterUrl = posterThumbnail || poster || imageUrl || 'https://images.unsplash.com/photo-1536440136628-849c177e76a1?w=400&h=600&fit=crop';
   
   return (
     <Card onClick={onClick} className="group relative overflow-hidden border-border/50 hover-lift cursor-pointer">
       <div className="aspect-[2/3] relative overflow-hidden">
-        <img 
-          src={posterUrl} 
-          alt={title}
-          className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
-        />
+        <picture>
+          {Object.entries(posterSrcset || {}).map(([type, srcSet]) => (
+            <source key={type} type={type} srcSet={srcSet} sizes={POSTER_SIZES} />
+          ))}
+          <img 
+            src={posterUrl} 
+            alt={title}
+            loading="lazy"
+            decoding="async"
+            className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
+          />
+        </picture>
         <div className="absolute inset-0 bg-gradient-to-t from-background via-background/20 to-transparent opacity-0 group-hover:opacity-100 transition-opacity duration-300">
           <div className="absolute inset-0 flex items-center justify-center">
             <div className="bg-primary/90 backdrop-blur-sm rounded-full p-4 transform scale-0 group-hover:scale-100 transition-transform duration-300">
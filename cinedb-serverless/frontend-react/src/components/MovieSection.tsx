@@ -8,6 +8,8 @@ interface Movie {
   year: string;
   rating: number;
   imageUrl: string;
+  posterThumbnail?: string;
+  posterSrcset?: Record<string, string>;
   genre: string;
 }
 
@@ -199,6 +199,12 @@ export const movieApi = {
     return apiClient.get<any>(`/movies/${id}`);
   },
 
+  // Get many movies by ID in one request (watchlists, carousels); results
+  // keep the order of `ids`, and unknown IDs are listed in `missing`
+  getMoviesByIds: async (ids: string[]) => {
+    return apiClient.post<any>('/movies/batch', { ids });
+  },
+
   // Create movie
   createMovie: async (movieData: any) => {
     return apiClient.post<any>('/movies', movieData);
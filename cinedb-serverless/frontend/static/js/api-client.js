@@ -48,6 +48,10 @@ async function fetchMovies() {
     }
 }
 
+// ETag (version) of each movie as last read or saved, sent back as If-Match
+// so a save fails instead of overwriting someone else's edit
+const movieVersions = new Map();
+
 // Function to fetch a single movie
 async function getMovie(id) {
     try {
@@ -57,13 +61,73 @@ async function getMovie(id) {
         if (!response.ok) {
             throw new Error(`HTTP error! Status: ${response.status}`);
         }
-        return response.json();
+        const movie = await response.json();
+        const etag = response.headers.get('ETag') ||
+            (movie.version !== undefined ? `"${movie.version}"` : null);
+        if (etag) {
+            movieVersions.set(id, etag);
+        }
+        return movie;
     } catch (error) {
         console.error('Error fetching movie:', error);
         throw error;
     }
 }
 
+// Function to fetch many movies by ID in one request (e.g. a watchlist).
+// Resolves to { movies, missing }: movies in the order of `ids`, and the IDs
+// that do not exist.
+async function getMoviesByIds(ids) {
+    try {
+        const response = await fetch(`${API_ENDPOINT}/movies/batch`, {
+            method: 'POST',
+            headers: { ...getHeaders(), 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ids })
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+        return response.json();
+    } catch (error) {
+        console.error('Error fetching movies:', error);
+        throw error;
+    }
+}
+
+// Function to upload a poster straight to S3 with a presigned POST policy.
+// Returns the object key to send as poster_key, or null when direct uploads
+// are not available (the poster is then sent with the form as before).
+async function uploadPosterDirect(posterFile, movieId) {
+    let upload;
+    try {
+        const response = await fetch(`${API_ENDPOINT}/presigned`, {
+            method: 'POST',
+            headers: { ...getHeaders(), 'Content-Type': 'application/json' },
+            body: JSON.stringify({ action: 'upload', contentType: posterFile.type, movieId: movieId })
+        });
+        if (!response.ok) {
+            return null;
+        }
+        upload = await response.json();
+    } catch (error) {
+        console.warn('Direct poster upload unavailable, sending the poster with the form:', error);
+        return null;
+    }
+    
+    // S3 expects the policy fields first and the file last
+    const formData = new FormData();
+    for (const [key, value] of Object.entries(upload.fields)) {
+        formData.append(key, value);
+    }
+    formData.append('file', posterFile);
+    
+    const response = await fetch(upload.url, { method: 'POST', body: formData });
+    if (!response.ok) {
+        throw new Error(`Poster upload failed! Status: ${response.status}`);
+    }
+    return upload.key;
+}
+
 // Function to add a movie (for admin use)
 async function addMovie(movieData, posterFile) {
     try {
@@ -77,9 +141,14 @@ async function addMovie(movieData, posterFile) {
             }
         }
         
-        // Add the poster file if provided
+        // Upload the poster straight to S3 when possible, otherwise send it with the form
         if (posterFile) {
-            formData.append('poster', posterFile);
+            const posterKey = await uploadPosterDirect(posterFile, movieData.id);
+            if (posterKey) {
+                formData.append('poster_key', posterKey);
+            } else {
+                formData.append('poster', posterFile);
+            }
         }
         
         // Headers for authentication (don't set Content-Type - browser will set it)
@@ -114,23 +183,41 @@ async function updateMovie(movieData, posterFile) {
             }
         }
         
-        // Add the poster file if provided
+        // Upload the poster straight to S3 when possible, otherwise send it with the form
         if (posterFile) {
-            formData.append('poster', posterFile);
+            const posterKey = await uploadPosterDirect(posterFile, movieData.id);
+            if (posterKey) {
+                formData.append('poster_key', posterKey);
+            } else {
+                formData.append('poster', posterFile);
+            }
         }
         
         // Headers for authentication (don't set Content-Type - browser will set it)
         const headers = getHeaders();
         
+        // Only save over the version this page loaded
+        const etag = movieVersions.get(movieData.id);
+        if (etag) {
+            headers['If-Match'] = etag;
+        }
+        
         const response = await fetch(`${API_ENDPOINT}/movies/${movieData.id}`, {
             method: 'PUT',
             headers: headers,
             body: formData
         });
         
+        if (response.status === 412) {
+            throw new Error('This movie was changed by someone else. Reload the page and apply your changes again.');
+        }
         if (!response.ok) {
             throw new Error(`HTTP error! Status: ${response.status}`);
         }
+        const newEtag = response.headers.get('ETag');
+        if (newEtag) {
+            movieVersions.set(movieData.id, newEtag);
+        }
         return response.json();
     } catch (error) {
         console.error('Error updating movie:', error);
@@ -134,6 +134,21 @@ app.get('/movies', (req, res) => {
   res.json(movies);
 });
 
+// POST a list of IDs - fetch many movies at once (same shape as the
+// get_movies_batch Lambda: requested order, unknown IDs in `missing`)
+app.post('/movies/batch', (req, res) => {
+  const ids = req.body && req.body.ids;
+  if (!Array.isArray(ids) || ids.length === 0) {
+    return res.status(400).json({ error: "Request body must contain an 'ids' list" });
+  }
+  const uniqueIds = [...new Set(ids)];
+  const found = uniqueIds.map(id => movies.find(m => m.id === id));
+  res.json({
+    movies: found.filter(Boolean),
+    missing: uniqueIds.filter((id, i) => !found[i])
+  });
+});
+
 // GET a specific movie
 app.get('/movies/:id', (req, res) => {
   const movie = movies.find(m => m.id === req.params.id);
@@ -0,0 +1,83 @@
+"""
+Gunicorn settings for the CineDB Flask app
+
+gunicorn reads this file from the working directory, so the systemd unit
+written by user-data.sh and the CloudFormation template picks it up without
+changes; run.sh passes it explicitly. It also puts
+cinedb-serverless/backend on the import path: the app uses the same
+cinedb_common helpers as the Lambda functions.
+
+Every page waits on DynamoDB and S3, so a worker spends most of a request
+idle. With sync workers (gunicorn's default) each process serves one
+request at a time, and a slow poster upload blocks it completely. gthread
+workers serve GUNICORN_THREADS requests per process; all threads share the
+process's AWS clients (cinedb_common/aws_clients.py), whose connection pools are sized
+below so the threads and the parallel scan never wait for a connection.
+
+Configuration:
+- GUNICORN_WORKER_CLASS: gthread, gevent (needs `pip install gevent`) or sync (default: gthread)
+- GUNICORN_WORKERS: Worker processes (default: 2 per CPU)
+- GUNICORN_THREADS: Request threads per gthread worker (default: 8)
+- GUNICORN_WORKER_CONNECTIONS: Concurrent requests per gevent worker (default: 100)
+- GUNICORN_PRELOAD: Import the app once in the master before forking the workers (default: true)
+- GUNICORN_BIND: Listen address (default: 0.0.0.0:8080)
+- GUNICORN_TIMEOUT: Seconds before a silent worker is restarted (default: 60)
+- GUNICORN_KEEPALIVE: Seconds an idle client connection is kept open; keep it above the
+  load balancer's idle timeout (60s in FullAppCfn.yaml) so the ALB never reuses a closed one (default: 65)
+"""
+
+import multiprocessing
+import os
+import time
+
+from dotenv import load_dotenv
+
+# The app reads app/.env when it is imported; the settings below may live there too
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', '.env'))
+
+# cinedb_common, shared with the Lambda functions
+pythonpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cinedb-serverless', 'backend')
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before boto3, urllib3 and ssl are imported, which with preload_app
+    # happens in the master, before gunicorn's gevent worker would patch them
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2)))
+# gunicorn switches sync workers to gthread when threads > 1
+threads = int(os.getenv('GUNICORN_THREADS', '8')) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '100'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '65'))
+
+# Fetching the Flask secret and importing boto3 then happen once instead of
+# once per worker. AWS clients are not built until a worker's first request,
+# and cinedb_common/aws_clients.py drops any a forked worker inherits.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Requests one worker runs at once, each of which may call AWS
+if worker_class == 'gthread':
+    concurrency = threads
+elif worker_class == 'gevent':
+    concurrency = worker_connections
+else:
+    concurrency = 1
+
+# A request that lists the catalog also runs SCAN_SEGMENTS scan threads
+os.environ.setdefault(
+    'AWS_MAX_POOL_CONNECTIONS',
+    str(concurrency + int(os.getenv('SCAN_SEGMENTS', '4')))
+)
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    # With preload_app this is just the fork; without it, also the app import
+    worker.log.info('Worker %s ready in %.0fms', worker.pid, (time.perf_counter() - worker.forked_at) * 1000)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Load test for the CineDB Flask app
+
+Keeps --concurrency keep-alive connections busy requesting each of --paths
+in turn for --duration seconds, then prints throughput and latency
+percentiles per path. Only the standard library is needed, so it runs from
+any machine that can reach the app.
+
+--slow-uploads opens connections that post a poster to /add a few bytes at a
+time, like users on slow links. A sync worker is blocked by each of them for
+the whole upload; a gthread worker only loses one thread.
+
+Usage:
+    python loadtest.py [--url http://127.0.0.1:8080] [--paths / /admin]
+                       [--concurrency 16] [--duration 30] [--slow-uploads 0]
+"""
+
+import argparse
+import http.client
+import json
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(math.ceil(p / 100 * len(sorted_values))) - 1)]
+
+
+class Client(threading.Thread):
+    """
+    One keep-alive connection requesting paths in turn until stop is set
+
+    Args:
+        host (str): Host name
+        port (int): Port
+        paths (list): Paths to request, starting at offset
+        offset (int): Index of the first path, so clients do not move in lockstep
+        stop (threading.Event): Set when the test is over
+        warmup_until (float): perf_counter time before which results are discarded
+    """
+
+    def __init__(self, host, port, paths, offset, stop, warmup_until):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.paths = paths
+        self.offset = offset
+        self.stop = stop
+        self.warmup_until = warmup_until
+        self.results = []
+        self.errors = 0
+        self.connections = 0
+
+    def connect(self):
+        self.connections += 1
+        return http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def run(self):
+        connection = self.connect()
+        i = self.offset
+        while not self.stop.is_set():
+            path = self.paths[i % len(self.paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.will_close:
+                    connection.close()
+                    connection = self.connect()
+            except (OSError, http.client.HTTPException):
+                status = None
+                connection.close()
+                connection = self.connect()
+            end = time.perf_counter()
+            if start < self.warmup_until:
+                continue
+            if status is None or status >= 500:
+                self.errors += 1
+            else:
+                self.results.append((path, end - start))
+        connection.close()
+
+
+class SlowUpload(threading.Thread):
+    """
+    Post a poster to /add at bytes_per_second until stop is set
+
+    Args:
+        host (str): Host name
+        port (int): Port
+        stop (threading.Event): Set when the test is over
+        bytes_per_second (int): Upload speed
+    """
+
+    BOUNDARY = 'cinedb-loadtest'
+
+    def __init__(self, host, port, stop, bytes_per_second=64):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.stop = stop
+        self.bytes_per_second = bytes_per_second
+
+    def run(self):
+        # Large enough that the upload never finishes during the test
+        size = 10 * 1024 * 1024
+        head = (f'--{self.BOUNDARY}\r\nContent-Disposition: form-data; name="poster"; filename="poster.jpg"\r\n'
+                'Content-Type: image/jpeg\r\n\r\n').encode()
+        while not self.stop.is_set():
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=5)
+            try:
+                connection.putrequest('POST', '/add')
+                connection.putheader('Content-Type', f'multipart/form-data; boundary={self.BOUNDARY}')
+                connection.putheader('Content-Length', str(len(head) + size))
+                connection.endheaders(head)
+                while not self.stop.wait(1):
+                    connection.send(b'\xff' * self.bytes_per_second)
+            except (OSError, http.client.HTTPException):
+                # The server gave up on the upload (worker timeout); start another one
+                time.sleep(0.1)
+            finally:
+                connection.close()
+
+
+def run(url, paths, concurrency, duration, warmup, slow_uploads):
+    """
+    Run one load test
+
+    Args:
+        url (str): Base URL of the app
+        paths (list): Paths to request
+        concurrency (int): Concurrent keep-alive connections
+        duration (float): Seconds to measure, after the warmup
+        warmup (float): Seconds of load before measuring
+        slow_uploads (int): Concurrent slow poster uploads
+
+    Returns:
+        dict: Requests, errors, RPS and latency percentiles (ms) per path and in total
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    stop = threading.Event()
+
+    uploads = [SlowUpload(host, port, stop) for _ in range(slow_uploads)]
+    for upload in uploads:
+        upload.start()
+
+    start = time.perf_counter()
+    clients = [Client(host, port, paths, i, stop, start + warmup) for i in range(concurrency)]
+    for client in clients:
+        client.start()
+    time.sleep(warmup + duration)
+    stop.set()
+    for thread in clients + uploads:
+        thread.join()
+    elapsed = time.perf_counter() - start - warmup
+
+    report = {}
+    for path in list(paths) + [None]:
+        latencies = sorted(seconds * 1000 for client in clients for p, seconds in client.results
+                           if path is None or p == path)
+        report[path or 'total'] = {
+            'requests': len(latencies),
+            'rps': len(latencies) / elapsed,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99)
+        }
+    report['total']['errors'] = sum(client.errors for client in clients)
+    report['total']['connections'] = sum(client.connections for client in clients)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--paths', nargs='+', default=['/', '/admin'])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--slow-uploads', type=int, default=0)
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    report = run(args.url, args.paths, args.concurrency, args.duration, args.warmup, args.slow_uploads)
+
+    print(f'{args.concurrency} connections, {args.slow_uploads} slow uploads, {args.duration:g}s')
+    header = f"{'path':>10} {'requests':>9} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}"
+    print(header)
+    print('-' * len(header))
+    for path, result in report.items():
+        if not result['requests']:
+            # Every request was still waiting when the test ended
+            print(f"{path:>10} {0:>9} {0:>8.1f} {'-':>9} {'-':>9} {'-':>9}")
+            continue
+        print(f"{path:>10} {result['requests']:>9} {result['rps']:>8.1f} {result['p50']:>7.1f}ms "
+              f"{result['p95']:>7.1f}ms {result['p99']:>7.1f}ms")
+    print(f"errors: {report['total']['errors']}, connections opened: {report['total']['connections']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
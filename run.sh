@@ -6,4 +6,5 @@
 export FLASK_APP=app
 export FLASK_ENV=production
 
-exec gunicorn -b 0.0.0.0:8080 app:app
+# Workers, threads and keep-alive are set in gunicorn.conf.py (GUNICORN_* variables)
+exec gunicorn -c gunicorn.conf.py app:app
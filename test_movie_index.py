@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the sharded catalog queries behind the movie filters
+
+Covers cinedb_common.movie_index: query_page walked across cursor hops on the
+catalog-wide indexes, checked against query_all and the index order.
+"""
+
+import os
+import random
+import sys
+from decimal import Decimal
+
+import pytest
+
+# The shared helpers live with the Lambda functions
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'cinedb-serverless', 'backend'))
+
+from cinedb_common import movie_index  # noqa: E402
+from cinedb_common.pagination import decode_cursor, encode_cursor  # noqa: E402
+
+FILTERS = [
+    {'yearFrom': '1960'},
+    {'yearFrom': '1980', 'yearTo': '1999'},
+    {'minRating': '5'},
+    {'yearFrom': '1990', 'minRating': '7'},
+]
+
+
+class FakeIndexTable:
+    """
+    In-memory stand-in for Table.query on the movie GSIs
+
+    Honours the partition key, the sort key bounds of the key condition,
+    Limit (counted before the rating filter, as DynamoDB does),
+    ExclusiveStartKey and ScanIndexForward.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = 0
+
+    def query(self, IndexName, KeyConditionExpression, ExpressionAttributeValues, ExpressionAttributeNames=None,
+              ScanIndexForward=True, Limit=None, ExclusiveStartKey=None, FilterExpression=None):
+        self.calls += 1
+        values = ExpressionAttributeValues
+        sort_key = movie_index.SORT_KEYS[IndexName]
+        partition = 'genreKey' if IndexName == movie_index.GENRE_INDEX else 'catalogKey'
+
+        def in_key_range(item):
+            if sort_key == 'year':
+                return (values.get(':yearFrom', item['year']) <= item['year'] <= values.get(':yearTo', item['year']))
+            return item['rating'] >= values.get(':minRating', item['rating'])
+
+        rows = sorted(
+            (item for item in self.items if item.get(partition) == values[f':{partition}'] and in_key_range(item)),
+            key=lambda item: (item[sort_key], item['id']), reverse=not ScanIndexForward
+        )
+        if ExclusiveStartKey:
+            start = (ExclusiveStartKey[sort_key], ExclusiveStartKey['id'])
+            after = (lambda position: position > start) if ScanIndexForward else (lambda position: position < start)
+            rows = [row for row in rows if after((row[sort_key], row['id']))]
+
+        evaluated = rows[:Limit] if Limit else rows
+        response = {'Items': [
+            dict(item) for item in evaluated
+            if not FilterExpression or item['rating'] >= values[':minRating']
+        ]}
+        if Limit and len(rows) > Limit:
+            last = evaluated[-1]
+            response['LastEvaluatedKey'] = {'id': last['id'], partition: last[partition], sort_key: last[sort_key]}
+        return response
+
+
+@pytest.fixture(scope='module')
+def table():
+    rng = random.Random(7)
+    items = []
+    for number in range(300):
+        movie = {
+            'id': f'movie-{number}',
+            'year': rng.randint(1950, 2020),
+            'rating': Decimal(rng.randint(0, 100)) / 10,
+            'genre': 'Drama'
+        }
+        movie.update(movie_index.index_keys(movie))
+        items.append(movie)
+    # Enough movies that every shard has some
+    assert len({item['catalogKey'] for item in items}) == movie_index.CATALOG_KEY_SHARDS
+    return FakeIndexTable(items)
+
+
+@pytest.fixture(autouse=True)
+def cursor_secret(monkeypatch):
+    monkeypatch.setattr('cinedb_common.pagination.CURSOR_SECRET', 'test-secret-' + 'x' * 40)
+
+
+def walk_pages(table, filters, limit):
+    """Read every page through query_page, round-tripping each cursor"""
+    params = movie_index.plan_query(filters)
+    scope = movie_index.cursor_scope(filters)
+    items, key, pages = [], None, 0
+    while True:
+        page, key = movie_index.query_page(table, limit, key, **params)
+        assert len(page) <= limit
+        items.extend(page)
+        pages += 1
+        cursor = encode_cursor(key, scope)
+        if cursor is None:
+            return items, pages
+        key = decode_cursor(cursor, scope)
+
+
+def assert_index_order(items, params):
+    values = [item[movie_index.SORT_KEYS[params['IndexName']]] for item in items]
+    assert values == sorted(values, reverse=not params.get('ScanIndexForward', True))
+
+
+@pytest.mark.parametrize('query', FILTERS)
+@pytest.mark.parametrize('limit', [1, 3, 10, 64, 1000])
+def test_query_page_across_cursor_hops(table, query, limit):
+    filters = movie_index.parse_movie_filters(query)
+    params = movie_index.plan_query(filters)
+    expected = list(movie_index.query_all(table, **params))
+    assert expected
+
+    items, pages = walk_pages(table, filters, limit)
+
+    ids = [item['id'] for item in items]
+    assert len(ids) == len(set(ids)), 'an item was repeated across pages'
+    assert sorted(ids) == sorted(item['id'] for item in expected), 'an item was skipped'
+    assert_index_order(items, params)
+    if limit == 1:
+        assert pages >= len(expected)
+
+
+def test_query_all_matches_the_filters(table):
+    filters = movie_index.parse_movie_filters({'yearFrom': '1990', 'minRating': '7'})
+    params = movie_index.plan_query(filters)
+    found = list(movie_index.query_all(table, **params))
+    expected = [item for item in table.items if item['year'] >= 1990 and item['rating'] >= 7]
+    assert sorted(item['id'] for item in found) == sorted(item['id'] for item in expected)
+    assert_index_order(found, params)
+
+
+@pytest.mark.parametrize('key', [
+    {f'{movie_index.CATALOG_KEY_SHARDS}:done': 'true'},
+    {'id': 'movie-1', 'catalogKey': 'movie#0', 'rating': Decimal('5')},
+    {'x:id': 'movie-1'},
+    {'0:': 'movie-1'},
+])
+def test_query_page_rejects_keys_from_another_shard_count(table, key):
+    params = movie_index.plan_query(movie_index.parse_movie_filters({'minRating': '5'}))
+    with pytest.raises(ValueError):
+        movie_index.query_page(table, 5, key, **params)
+
+
+def test_cursor_scope_includes_the_shard_count():
+    filters = movie_index.parse_movie_filters({'minRating': '5'})
+    assert movie_index.cursor_scope(filters) == f'{movie_index.RATING_INDEX}/{movie_index.CATALOG_KEY_SHARDS}'
+    genre_filters = movie_index.parse_movie_filters({'genre': 'Drama'})
+    assert movie_index.cursor_scope(genre_filters) == movie_index.GENRE_INDEX
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the multipart/form-data parsers behind the poster uploads
+
+Covers cinedb_common.multipart: the in-memory parser, the incremental
+MultipartParser fed at every chunk boundary, base64 API Gateway bodies and
+the size limits.
+"""
+
+import base64
+import os
+import sys
+
+import pytest
+
+# The shared helpers live with the Lambda functions
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'cinedb-serverless', 'backend'))
+
+from cinedb_common.multipart import (  # noqa: E402
+    MultipartError, MultipartParser, PayloadTooLargeError, get_boundary, iter_base64_chunks,
+    parse_multipart, parse_multipart_event
+)
+
+BOUNDARY = '----cinedbTestBoundary7MA4YWxk'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+
+# Bytes that look like the start of a delimiter inside the poster
+POSTER = b'\x89PNG\r\n\x1a\n' + b'\r\n--' + BOUNDARY[:10].encode() + bytes(range(256)) * 4
+
+
+def build_body(fields=(), files=(), boundary=BOUNDARY):
+    """Encode (name, value) fields and (name, filename, type, bytes) files"""
+    body = b''
+    for name, value in fields:
+        body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                 f'{value}\r\n').encode('utf-8')
+    for name, filename, content_type, content in files:
+        body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                 f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n').encode('utf-8')
+        body += content + b'\r\n'
+    return body + f'--{boundary}--\r\n'.encode('utf-8')
+
+
+BODY = build_body(
+    fields=[('title', 'Amélie'), ('year', '2001'), ('synopsis', 'Line one\r\nLine two')],
+    files=[('poster', 'amelie.png', 'image/png', POSTER)]
+)
+
+
+def feed_in_chunks(body, chunk_size, **limits):
+    parser = MultipartParser(get_boundary(CONTENT_TYPE), **limits)
+    for start in range(0, len(body), chunk_size):
+        parser.feed(body[start:start + chunk_size])
+    return parser.close()
+
+
+def assert_expected_form(form):
+    assert form['fields'] == {'title': 'Amélie', 'year': '2001', 'synopsis': 'Line one\r\nLine two'}
+    poster = form['files']['poster']
+    assert poster['filename'] == 'amelie.png'
+    assert poster['content_type'] == 'image/png'
+    assert poster['size'] == len(POSTER)
+    assert poster['content'].read() == POSTER
+
+
+def test_get_boundary():
+    assert get_boundary(CONTENT_TYPE) == BOUNDARY.encode()
+    assert get_boundary('multipart/form-data; boundary="a b"; charset=utf-8') == b'a b'
+    with pytest.raises(MultipartError):
+        get_boundary('multipart/form-data')
+
+
+def test_parse_multipart_in_memory():
+    assert_expected_form(parse_multipart(CONTENT_TYPE, BODY))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 16, len(BOUNDARY) + 3, 64, 1000, len(BODY)])
+def test_incremental_parser_at_every_chunk_boundary(chunk_size):
+    assert_expected_form(feed_in_chunks(BODY, chunk_size))
+
+
+def test_incremental_parser_spools_large_files():
+    form = feed_in_chunks(BODY, 100, spool_threshold=64)
+    assert form['files']['poster']['content'].read() == POSTER
+
+
+def test_empty_file_input_is_skipped():
+    body = build_body(fields=[('title', 'x')], files=[('poster', '', 'application/octet-stream', b'')])
+    for form in (parse_multipart(CONTENT_TYPE, body), feed_in_chunks(body, 5)):
+        assert form['files'] == {}
+        assert form['fields'] == {'title': 'x'}
+
+
+def test_missing_closing_boundary():
+    truncated = BODY[:-len(BOUNDARY) - 8]
+    with pytest.raises(MultipartError):
+        parse_multipart(CONTENT_TYPE, truncated)
+    with pytest.raises(MultipartError):
+        feed_in_chunks(truncated, 10)
+
+
+def test_file_size_limit():
+    with pytest.raises(PayloadTooLargeError):
+        parse_multipart(CONTENT_TYPE, BODY, max_file_size=len(POSTER) - 1)
+    with pytest.raises(PayloadTooLargeError):
+        feed_in_chunks(BODY, 13, max_file_size=len(POSTER) - 1)
+    assert feed_in_chunks(BODY, 13, max_file_size=len(POSTER))['files']['poster']['size'] == len(POSTER)
+
+
+def test_file_size_limit_is_enforced_before_the_part_ends():
+    parser = MultipartParser(get_boundary(CONTENT_TYPE), max_file_size=100)
+    head = BODY[:BODY.index(POSTER)]
+    parser.feed(head)
+    with pytest.raises(PayloadTooLargeError):
+        # The closing delimiter never arrives: the limit alone stops the part
+        for _ in range(10):
+            parser.feed(b'x' * 64)
+
+
+def test_field_size_limit():
+    body = build_body(fields=[('synopsis', 'x' * 100)])
+    with pytest.raises(PayloadTooLargeError):
+        parse_multipart(CONTENT_TYPE, body, max_field_size=99)
+    with pytest.raises(PayloadTooLargeError):
+        feed_in_chunks(body, 7, max_field_size=99)
+
+
+def test_too_many_parts():
+    body = build_body(fields=[(f'f{i}', 'v') for i in range(5)])
+    with pytest.raises(MultipartError):
+        parse_multipart(CONTENT_TYPE, body, max_parts=4)
+    with pytest.raises(MultipartError):
+        feed_in_chunks(body, 9, max_parts=4)
+
+
+def test_iter_base64_chunks():
+    data = bytes(range(256)) * 10
+    text = base64.b64encode(data).decode()
+    assert b''.join(iter_base64_chunks(text, chunk_size=8)) == data
+    # Line breaks, as some clients wrap base64 at 76 characters
+    wrapped = '\n'.join(text[i:i + 76] for i in range(0, len(text), 76))
+    assert b''.join(iter_base64_chunks(wrapped, chunk_size=12)) == data
+    with pytest.raises(MultipartError):
+        list(iter_base64_chunks('not base64!'))
+
+
+def test_parse_multipart_event_base64_body():
+    event = {'body': base64.b64encode(BODY).decode(), 'isBase64Encoded': True}
+    assert_expected_form(parse_multipart_event(event, CONTENT_TYPE))
+
+
+def test_parse_multipart_event_plain_body():
+    event = {'body': BODY, 'isBase64Encoded': False}
+    assert_expected_form(parse_multipart_event(event, CONTENT_TYPE))
+
+
+def test_parse_multipart_event_body_size_limit():
+    encoded = {'body': base64.b64encode(BODY).decode(), 'isBase64Encoded': True}
+    with pytest.raises(PayloadTooLargeError):
+        parse_multipart_event(encoded, CONTENT_TYPE, max_body_size=len(BODY) // 2)
+    with pytest.raises(PayloadTooLargeError):
+        parse_multipart_event({'body': BODY}, CONTENT_TYPE, max_body_size=len(BODY) - 1)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for the signed pagination cursors of get_all_movies
+
+Covers cinedb_common.pagination: the cursor round-trip, the signature and
+scope checks, and the `limit`/`cursor` query parameters.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+# The shared helpers live with the Lambda functions
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'cinedb-serverless', 'backend'))
+
+from cinedb_common import pagination  # noqa: E402
+from cinedb_common.pagination import (  # noqa: E402
+    CursorSecretMissingError, InvalidCursorError, decode_cursor, encode_cursor, is_paginated_request,
+    parse_page_params
+)
+
+SCOPE = 'CatalogYearIndex/8'
+
+# A sharded query_page key: strings, numbers and the done markers
+KEY = {
+    '0:id': 'a1', '0:catalogKey': 'movie#0', '0:year': Decimal('1999'),
+    '3:done': 'true', '5:rating': Decimal('7.5'), '6:poster': b'\x00\xffbinary'
+}
+
+
+@pytest.fixture(autouse=True)
+def cursor_secret(monkeypatch):
+    monkeypatch.setattr(pagination, 'CURSOR_SECRET', 'test-secret-' + 'x' * 40)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def test_round_trip_keeps_types():
+    cursor = encode_cursor(KEY, SCOPE)
+    decoded = decode_cursor(cursor, SCOPE)
+    assert decoded == KEY
+    assert isinstance(decoded['0:year'], Decimal)
+    assert isinstance(decoded['6:poster'], bytes)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(KEY, SCOPE)
+    assert set(cursor) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.')
+
+
+def test_last_page_has_no_cursor():
+    assert encode_cursor(None, SCOPE) is None
+    assert encode_cursor({}, SCOPE) is None
+
+
+def test_cursor_from_another_scope_is_rejected():
+    cursor = encode_cursor(KEY, SCOPE)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, 'CatalogYearIndex/4')
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, '')
+
+
+def test_edited_payload_is_rejected():
+    payload, signature = encode_cursor({'id': 'a1'}, SCOPE).split('.')
+    edited = _b64(_unb64(payload).replace(b'a1', b'b2'))
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(f'{edited}.{signature}', SCOPE)
+
+
+def test_forged_cursor_is_rejected():
+    # Signed with the table name, the key cursors used to be signed with when CURSOR_SECRET was unset
+    payload = json.dumps({'id': {'S': 'a1'}}, separators=(',', ':'), sort_keys=True).encode()
+    signature = hmac.new(b'cinedb', SCOPE.encode() + b'\x00' + payload, hashlib.sha256).digest()[:16]
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(f'{_b64(payload)}.{_b64(signature)}', SCOPE)
+
+
+@pytest.mark.parametrize('cursor', [
+    '',
+    'no-signature',
+    'bad base64!.also bad!',
+    _b64(b'{"id":{"S":"a1"}}'),
+    _b64(b'{"id":{"S":"a1"}}') + '.',
+    _b64(b'{"id":{"S":"a1"}}') + '.' + _b64(b'\x00' * 16),
+])
+def test_malformed_or_unsigned_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, SCOPE)
+
+
+def test_validly_signed_but_malformed_key_is_rejected():
+    for payload in (b'[]', b'{}', b'{"id":{"X":"a1"}}', b'{"year":{"N":"not a number"}}',
+                    b'{"id":{"S":"a","N":"1"}}', b'{"id":{"S":1}}', b'not json'):
+        cursor = f'{_b64(payload)}.{_b64(pagination._sign(payload, SCOPE))}'
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, SCOPE)
+
+
+def test_secret_rotation_invalidates_cursors(monkeypatch):
+    cursor = encode_cursor(KEY, SCOPE)
+    monkeypatch.setattr(pagination, 'CURSOR_SECRET', 'rotated')
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, SCOPE)
+
+
+def test_missing_secret_fails_closed(monkeypatch):
+    cursor = encode_cursor(KEY, SCOPE)
+    monkeypatch.setattr(pagination, 'CURSOR_SECRET', '')
+    with pytest.raises(CursorSecretMissingError):
+        encode_cursor(KEY, SCOPE)
+    with pytest.raises(CursorSecretMissingError):
+        decode_cursor(cursor, SCOPE)
+    # Checked before any page is read, also without a cursor
+    with pytest.raises(CursorSecretMissingError):
+        parse_page_params({'limit': '10'}, SCOPE)
+
+
+def test_parse_page_params():
+    assert parse_page_params(None) == (pagination.DEFAULT_PAGE_SIZE, None)
+    assert parse_page_params({'limit': '25'}) == (25, None)
+    assert parse_page_params({'limit': str(pagination.MAX_PAGE_SIZE + 1)})[0] == pagination.MAX_PAGE_SIZE
+    cursor = encode_cursor(KEY, SCOPE)
+    assert parse_page_params({'limit': '5', 'cursor': cursor}, SCOPE) == (5, KEY)
+
+
+@pytest.mark.parametrize('limit', ['0', '-3', 'ten', '2.5'])
+def test_parse_page_params_rejects_bad_limits(limit):
+    with pytest.raises(ValueError):
+        parse_page_params({'limit': limit})
+
+
+def test_parse_page_params_rejects_bad_cursor():
+    with pytest.raises(InvalidCursorError):
+        parse_page_params({'cursor': encode_cursor(KEY, SCOPE)}, 'GenreYearIndex')
+
+
+def test_is_paginated_request():
+    assert not is_paginated_request(None)
+    assert not is_paginated_request({'genre': 'drama'})
+    assert is_paginated_request({'limit': '10'})
+    assert is_paginated_request({'cursor': 'abc'})